@@ -0,0 +1,196 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import db, SoilAnalysis
+
+# session.info keys for cache changes that wait for the transaction to commit
+PENDING_PUTS_KEY = 'pending_rendered_analyses'
+PENDING_DISCARDS_KEY = 'pending_discarded_analyses'
+
+class RenderedAnalysis(NamedTuple):
+    user_id: int
+    etag: str
+    body: bytes
+
+class RenderedAnalysisCache:
+    """
+    Bounded LRU of rendered analysis detail responses, keyed by analysis id
+
+    Analyses never change once written, so the JSON body rendered for an id
+    stays valid until the analysis is deleted and is stored with a strong
+    ETag (a digest of the bytes). Entries evicted from memory are spilled to ``spill_dir`` when one
+    is given, up to ``max_spilled`` files, and promoted back on their next
+    read. Each process spills into its own subdirectory, emptied on startup
+    since ids may be reused after the database is recreated.
+    """
+
+    def __init__(self, max_entries: int = 2048, spill_dir: Optional[str] = None, max_spilled: int = 20000):
+        self.max_entries = max_entries
+        self.spill_dir = os.path.join(spill_dir, str(os.getpid())) if spill_dir else None
+        self.max_spilled = max_spilled
+        self._entries: 'OrderedDict[int, RenderedAnalysis]' = OrderedDict()
+        self._spilled: 'OrderedDict[int, None]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()[:32]
+
+    def get(self, analysis_id: int) -> Optional[RenderedAnalysis]:
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry is not None:
+                self._entries.move_to_end(analysis_id)
+                self.hits += 1
+                return entry
+            spilled = analysis_id in self._spilled
+
+        entry = self._read_spilled(analysis_id) if spilled else None
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+        self.put(analysis_id, entry.user_id, entry.body)
+        return entry
+
+    def put(self, analysis_id: int, user_id: int, body: bytes) -> RenderedAnalysis:
+        entry = RenderedAnalysis(user_id, self.etag_for(body), body)
+        evicted = []
+        with self._lock:
+            self._entries[analysis_id] = entry
+            self._entries.move_to_end(analysis_id)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+
+        if self.spill_dir:
+            for evicted_id, evicted_entry in evicted:
+                self._spill(evicted_id, evicted_entry)
+        return entry
+
+    def discard(self, analysis_ids: Iterable[int]):
+        dropped = []
+        with self._lock:
+            for analysis_id in analysis_ids:
+                self._entries.pop(analysis_id, None)
+                if analysis_id in self._spilled:
+                    del self._spilled[analysis_id]
+                    dropped.append(analysis_id)
+        for dropped_id in dropped:
+            try:
+                os.remove(self._path(dropped_id))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'spilled': len(self._spilled),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses
+            }
+
+    def _path(self, analysis_id: int) -> str:
+        return os.path.join(self.spill_dir, f'{analysis_id}.json')
+
+    def _spill(self, analysis_id: int, entry: RenderedAnalysis):
+        # Owner on the first line, then the body exactly as served
+        path = self._path(analysis_id)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(f'{entry.user_id}\n'.encode())
+            f.write(entry.body)
+        os.replace(tmp_path, path)
+
+        dropped = []
+        with self._lock:
+            self._spilled[analysis_id] = None
+            self._spilled.move_to_end(analysis_id)
+            while len(self._spilled) > self.max_spilled:
+                dropped.append(self._spilled.popitem(last=False)[0])
+        for dropped_id in dropped:
+            try:
+                os.remove(self._path(dropped_id))
+            except FileNotFoundError:
+                pass
+
+    def _read_spilled(self, analysis_id: int) -> Optional[RenderedAnalysis]:
+        try:
+            with open(self._path(analysis_id), 'rb') as f:
+                user_id = int(f.readline())
+                body = f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+        return RenderedAnalysis(user_id, self.etag_for(body), body)
+
+def init_app(app):
+    """
+    Create the cache unless ANALYSIS_CACHE_ENTRIES is 0
+    """
+    max_entries = app.config.get('ANALYSIS_CACHE_ENTRIES', 2048)
+    if max_entries <= 0:
+        return
+    app.extensions['analysis_cache'] = RenderedAnalysisCache(
+        max_entries=max_entries,
+        spill_dir=app.config.get('ANALYSIS_CACHE_SPILL_DIR'),
+        max_spilled=app.config.get('ANALYSIS_CACHE_SPILL_ENTRIES', 20000)
+    )
+
+def get_cache() -> Optional[RenderedAnalysisCache]:
+    return current_app.extensions.get('analysis_cache')
+
+def put_on_commit(analysis_id: int, user_id: int, body: bytes):
+    """
+    Cache a rendered analysis once the current transaction commits
+
+    Ids of rolled-back inserts can be handed out again, so nothing is cached
+    before the row is durable.
+    """
+    cache = get_cache()
+    if cache is not None:
+        db.session.info.setdefault(PENDING_PUTS_KEY, []).append((cache, analysis_id, user_id, body))
+
+@event.listens_for(SoilAnalysis, 'after_delete')
+def _discard_on_commit(mapper, connection, target):
+    # Fires for ORM deletes, including a user's analyses deleted by cascade
+    cache = current_app.extensions.get('analysis_cache')
+    session = object_session(target)
+    if cache is not None and session is not None:
+        session.info.setdefault(PENDING_DISCARDS_KEY, []).append((cache, target.id))
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    for cache, analysis_id, user_id, body in session.info.pop(PENDING_PUTS_KEY, ()):
+        cache.put(analysis_id, user_id, body)
+    for cache, analysis_id in session.info.pop(PENDING_DISCARDS_KEY, ()):
+        cache.discard([analysis_id])
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    session.info.pop(PENDING_PUTS_KEY, None)
+    session.info.pop(PENDING_DISCARDS_KEY, None)
+
+def render_analysis(analysis: dict) -> bytes:
+    """
+    The detail endpoint's JSON body for an analysis dict, byte for byte
+    """
+    return current_app.json.response({'analysis': analysis}).get_data()
@@ -4,9 +4,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-import joblib
-import numpy as np
-import os
+from ml_predictor import SoilFertilityPredictor
 
 app = Flask(__name__)
 
@@ -63,139 +61,6 @@ class ChatMessage(db.Model):
     response = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-# ML Model Class (placeholder for your actual model)
-class SoilFertilityPredictor:
-    def __init__(self):
-        # Load your trained ML model here
-        # self.model = joblib.load('path/to/your/model.pkl')
-        self.model = None  # Placeholder
-    
-    def predict_fertility(self, soil_data):
-        """
-        Predict soil fertility using ML model
-        Replace this with your actual ML model prediction
-        """
-        # Extract features for ML model
-        features = np.array([[
-            soil_data['nitrogen'],
-            soil_data['phosphorus'],
-            soil_data['potassium'],
-            soil_data['ph'],
-            soil_data['organic_matter'],
-            soil_data['moisture'],
-            soil_data['temperature']
-        ]])
-        
-        # If you have a trained model, use it like this:
-        # prediction = self.model.predict(features)[0]
-        # probability = self.model.predict_proba(features)[0]
-        
-        # For now, using rule-based logic (replace with your ML model)
-        return self._rule_based_prediction(soil_data)
-    
-    def _rule_based_prediction(self, data):
-        """
-        Rule-based prediction logic (replace with ML model)
-        """
-        score = 0
-        reasons = []
-        fertilizers = []
-        crops = []
-        improvements = []
-        
-        # Nitrogen analysis
-        if data['nitrogen'] < 20:
-            reasons.append('Low nitrogen levels detected - affects plant growth and leaf development')
-            fertilizers.extend(['Urea (46-0-0)', 'Ammonium Sulfate (21-0-0)'])
-            improvements.append('Apply nitrogen-rich fertilizers during growing season')
-            score += 10
-        elif data['nitrogen'] > 50:
-            reasons.append('Optimal nitrogen levels support healthy plant growth')
-            score += 30
-        else:
-            reasons.append('Moderate nitrogen levels - adequate for most crops')
-            score += 20
-        
-        # Phosphorus analysis
-        if data['phosphorus'] < 15:
-            reasons.append('Phosphorus deficiency can limit root development and flowering')
-            fertilizers.extend(['Triple Superphosphate (0-46-0)', 'Bone Meal (4-12-0)'])
-            improvements.append('Increase phosphorus content for better root systems')
-            score += 10
-        elif data['phosphorus'] > 30:
-            reasons.append('Good phosphorus availability promotes strong root development')
-            score += 25
-        else:
-            reasons.append('Adequate phosphorus levels for normal plant development')
-            score += 20
-        
-        # Potassium analysis
-        if data['potassium'] < 100:
-            reasons.append('Low potassium affects disease resistance and water regulation')
-            fertilizers.extend(['Muriate of Potash (0-0-60)', 'Potassium Sulfate (0-0-50)'])
-            improvements.append('Apply potassium fertilizers to improve plant stress tolerance')
-            score += 10
-        elif data['potassium'] > 200:
-            reasons.append('Excellent potassium levels enhance disease resistance')
-            score += 25
-        else:
-            reasons.append('Moderate potassium availability supports plant health')
-            score += 20
-        
-        # pH analysis
-        if data['ph'] < 6.0 or data['ph'] > 8.0:
-            reasons.append('pH levels outside optimal range affect nutrient availability')
-            if data['ph'] < 6.0:
-                improvements.append('Apply agricultural lime to increase pH')
-                fertilizers.append('Dolomitic Lime')
-            else:
-                improvements.append('Apply elemental sulfur to decrease pH')
-                fertilizers.append('Elemental Sulfur')
-            score += 5
-        else:
-            reasons.append('pH levels within optimal range for nutrient uptake')
-            score += 20
-        
-        # Organic matter analysis
-        if data['organic_matter'] < 2:
-            reasons.append('Low organic matter reduces soil structure and water retention')
-            improvements.append('Add compost, manure, or organic fertilizers')
-            fertilizers.extend(['Compost', 'Well-aged Manure'])
-            score += 5
-        elif data['organic_matter'] > 4:
-            reasons.append('Rich organic matter content improves soil health')
-            score += 20
-        else:
-            reasons.append('Adequate organic matter supports soil biology')
-            score += 15
-        
-        # Crop recommendations based on conditions
-        if score > 80:
-            crops.extend(['Corn', 'Soybeans', 'Wheat', 'Tomatoes', 'Peppers', 'Cucumbers'])
-        elif score > 60:
-            crops.extend(['Beans', 'Carrots', 'Lettuce', 'Spinach', 'Radishes', 'Onions'])
-        else:
-            crops.extend(['Clover', 'Alfalfa', 'Buckwheat', 'Rye Grass', 'Cover Crops'])
-        
-        # Determine fertility level
-        if score > 80:
-            fertility_level = 'High'
-        elif score > 60:
-            fertility_level = 'Medium'
-        else:
-            fertility_level = 'Low'
-        
-        return {
-            'fertility_level': fertility_level,
-            'score': min(score, 100),
-            'reasons': reasons,
-            'recommendations': {
-                'fertilizers': list(set(fertilizers)),
-                'crops': crops,
-                'improvements': improvements
-            }
-        }
-
 # Initialize ML predictor
 predictor = SoilFertilityPredictor()
 
@@ -0,0 +1,262 @@
+import numpy as np
+from typing import Any, Dict
+
+class CompiledForest:
+    """
+    Array-backed tree ensemble that scores samples with pure NumPy
+
+    Every node of every tree lives in one set of flat arrays indexed by a
+    global node id. Leaves point back at themselves, so evaluation simply
+    walks all (sample, tree) pairs down ``max_depth`` levels at once.
+
+    Random forests average per-leaf class distributions. Boosted ensembles
+    (``link='softmax'``) instead store per-class raw scores in the leaves,
+    which are summed onto ``base_score`` and passed through a softmax.
+
+    A NaN feature value follows its node's ``missing_left`` flag, which
+    boosted ensembles export from sklearn; without flags every NaN goes left.
+    """
+
+    # Rows scored per pass; keeps temporaries at a few MB for 100 trees
+    chunk_size = 4096
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes,
+                 max_depth, feature_importances=None, input_dtype='float32', link=None, base_score=None,
+                 missing_left=None):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.classes_ = np.asarray(classes)
+        self.max_depth = int(max_depth)
+        self.input_dtype = np.dtype(str(input_dtype))
+        self.n_estimators = len(self.roots)
+        self.link = None if link is None else str(link)
+        self.base_score = None if base_score is None else np.asarray(base_score, dtype=np.float64)
+        self.missing_left = (np.ones(len(self.feature), dtype=bool) if missing_left is None
+                             else np.asarray(missing_left, dtype=bool))
+        # Only pay for the NaN check when some node sends missing values right
+        self.missing_right = None if self.missing_left.all() else ~self.missing_left
+        # Interleaved (left, right) pairs: the child of node n is
+        # children[2 * n + went_right], a single gather per level
+        self.children = np.stack([self.left, self.right], axis=1).ravel()
+        if feature_importances is not None:
+            self.feature_importances_ = np.asarray(feature_importances, dtype=np.float64)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Class probabilities for each row of X from the leaves it reaches
+        """
+        # Forests exported straight from sklearn compare float32 inputs, as
+        # sklearn does, so split decisions are identical to the estimator
+        X = np.asarray(X, dtype=self.input_dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.shape[0] <= self.chunk_size:
+            return self._predict_proba_chunk(X)
+
+        # Bound the (rows x trees) working arrays for very large batches
+        return np.concatenate([
+            self._predict_proba_chunk(X[start:start + self.chunk_size])
+            for start in range(0, X.shape[0], self.chunk_size)
+        ])
+
+    def _predict_proba_chunk(self, X: np.ndarray) -> np.ndarray:
+        flat = np.ascontiguousarray(X).ravel()
+        offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_estimators))
+        for _ in range(self.max_depth):
+            x = flat[offsets + self.feature[nodes]]
+            went_right = x > self.threshold[nodes]
+            if self.missing_right is not None:
+                went_right |= np.isnan(x) & self.missing_right[nodes]
+            nodes = self.children[2 * nodes + went_right]
+
+        if self.link == 'softmax':
+            scores = self.value[nodes].sum(axis=1) + self.base_score
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            return scores / scores.sum(axis=1, keepdims=True)
+        return self.value[nodes].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predict the most probable class for each row of X
+        """
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Plain (pickle-free) arrays describing the forest
+        """
+        arrays = {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'left': self.left,
+            'right': self.right,
+            'value': self.value,
+            'roots': self.roots,
+            'classes': self.classes_.astype(str),
+            'max_depth': np.array(self.max_depth),
+            'input_dtype': np.array(self.input_dtype.name),
+        }
+        if hasattr(self, 'feature_importances_'):
+            arrays['feature_importances'] = self.feature_importances_
+        if self.link is not None:
+            arrays['link'] = np.array(self.link)
+            arrays['base_score'] = self.base_score
+        if self.missing_right is not None:
+            arrays['missing_left'] = self.missing_left
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays) -> 'CompiledForest':
+        """
+        Rebuild a forest from ``to_arrays`` output or an opened .npz file
+        """
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            left=arrays['left'],
+            right=arrays['right'],
+            value=arrays['value'],
+            roots=arrays['roots'],
+            classes=arrays['classes'],
+            max_depth=arrays['max_depth'],
+            feature_importances=arrays['feature_importances'] if 'feature_importances' in arrays else None,
+            input_dtype=arrays['input_dtype'] if 'input_dtype' in arrays else 'float32',
+            link=arrays['link'] if 'link' in arrays else None,
+            base_score=arrays['base_score'] if 'base_score' in arrays else None,
+            missing_left=arrays['missing_left'] if 'missing_left' in arrays else None
+        )
+
+    def save(self, path: str):
+        """
+        Save the compiled arrays to an uncompressed .npz file
+        """
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledForest':
+        """
+        Load a forest written by ``save`` (no pickle, no sklearn)
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays(data)
+
+def compile_forest(model: Any, class_names=None) -> CompiledForest:
+    """
+    Export a fitted sklearn tree classifier or forest of trees to flat arrays
+
+    Pass ``class_names`` when the model was fit on integer class codes, to
+    serve the names instead of the codes.
+    """
+    estimators = model.estimators_ if hasattr(model, 'estimators_') else [model]
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left < 0
+
+        # Leaves loop back onto themselves and test feature 0, which keeps
+        # the evaluator branch-free once a sample has reached its leaf
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+        # Normalise per-node class weights into probabilities, as sklearn
+        # does in DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        values.append(value / totals)
+
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=roots,
+        classes=model.classes_ if class_names is None else np.asarray(class_names)[model.classes_],
+        max_depth=max_depth,
+        feature_importances=getattr(model, 'feature_importances_', None)
+    )
+
+def compile_gradient_boosting(model: Any, class_names=None) -> CompiledForest:
+    """
+    Export a fitted HistGradientBoostingClassifier to flat arrays
+
+    Each boosting iteration fits one regression tree per class (a single
+    tree for two classes); a leaf's value goes into its class's slot of the
+    node value vector, so the evaluator can sum all trees at once. For two
+    classes the single logit goes into the second slot, and a softmax over
+    ``(0, logit)`` reproduces sklearn's sigmoid.
+    """
+    n_classes = len(model.classes_)
+    n_per_iteration = model.n_trees_per_iteration_
+
+    features, thresholds, lefts, rights, values, roots, missing_left = [], [], [], [], [], [], []
+    importances = np.zeros(model.n_features_in_)
+    max_depth = 0
+    offset = 0
+    for iteration in model._predictors:
+        for slot, predictor in enumerate(iteration):
+            nodes = predictor.nodes
+            node_ids = np.arange(len(nodes))
+            is_leaf = nodes['is_leaf'].astype(bool)
+            if nodes['is_categorical'].any():
+                raise ValueError('Categorical splits are not supported')
+
+            features.append(np.where(is_leaf, 0, nodes['feature_idx']))
+            thresholds.append(np.where(is_leaf, 0.0, nodes['num_threshold']))
+            lefts.append(np.where(is_leaf, node_ids, nodes['left']) + offset)
+            rights.append(np.where(is_leaf, node_ids, nodes['right']) + offset)
+            missing_left.append(nodes['missing_go_to_left'].astype(bool) | is_leaf)
+
+            value = np.zeros((len(nodes), n_classes))
+            value[:, slot if n_per_iteration > 1 else 1] = np.where(is_leaf, nodes['value'], 0.0)
+            values.append(value)
+
+            np.add.at(importances, nodes['feature_idx'][~is_leaf], nodes['gain'][~is_leaf])
+            roots.append(offset)
+            max_depth = max(max_depth, int(nodes['depth'].max()))
+            offset += len(nodes)
+
+    base_score = np.zeros(n_classes)
+    baseline = np.asarray(model._baseline_prediction, dtype=np.float64).ravel()
+    if n_per_iteration > 1:
+        base_score[:] = baseline
+    else:
+        base_score[1] = baseline[0]
+
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=roots,
+        classes=model.classes_ if class_names is None else np.asarray(class_names)[model.classes_],
+        max_depth=max_depth,
+        feature_importances=importances / importances.sum() if importances.sum() > 0 else None,
+        # sklearn bins and splits on float64 inputs
+        input_dtype='float64',
+        link='softmax',
+        base_score=base_score,
+        missing_left=np.concatenate(missing_left)
+    )
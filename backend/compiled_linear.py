@@ -0,0 +1,107 @@
+import numpy as np
+from typing import Any, Dict
+
+class CompiledLinear:
+    """
+    Multinomial logistic model over a piecewise-linear feature expansion
+
+    Each raw feature ``x`` is expanded to ``x`` plus one hinge
+    ``max(0, x - knot)`` per knot, which lets a linear model follow the
+    banded responses soil readings have (e.g. pH only hurts outside its
+    optimal range). Expanded features are standardized with the training
+    mean and scale, then scored with one weight row per class and a softmax.
+    """
+
+    def __init__(self, knots, mean, scale, coef, intercept, classes, feature_importances=None):
+        self.knots = np.asarray(knots, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.input_dtype = np.dtype('float64')
+        if feature_importances is not None:
+            self.feature_importances_ = np.asarray(feature_importances, dtype=np.float64)
+
+    @property
+    def n_features(self) -> int:
+        return self.knots.shape[0]
+
+    def expand(self, X) -> np.ndarray:
+        """
+        Raw features followed by their hinge terms, standardized
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        hinges = np.maximum(X[:, :, None] - self.knots[None, :, :], 0.0).reshape(X.shape[0], -1)
+        return (np.hstack([X, hinges]) - self.mean) / self.scale
+
+    def predict_proba(self, X) -> np.ndarray:
+        scores = self.expand(X) @ self.coef.T + self.intercept
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {
+            'knots': self.knots,
+            'mean': self.mean,
+            'scale': self.scale,
+            'coef': self.coef,
+            'intercept': self.intercept,
+            'classes': self.classes_.astype(str),
+        }
+        if hasattr(self, 'feature_importances_'):
+            arrays['feature_importances'] = self.feature_importances_
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays) -> 'CompiledLinear':
+        return cls(
+            knots=arrays['knots'],
+            mean=arrays['mean'],
+            scale=arrays['scale'],
+            coef=arrays['coef'],
+            intercept=arrays['intercept'],
+            classes=arrays['classes'],
+            feature_importances=arrays['feature_importances'] if 'feature_importances' in arrays else None
+        )
+
+def hinge_knots(X, n_knots: int = 4) -> np.ndarray:
+    """
+    Evenly spaced interior quantiles of every feature, shape (n_features, n_knots)
+    """
+    quantiles = np.linspace(0, 1, n_knots + 2)[1:-1]
+    return np.quantile(np.asarray(X, dtype=np.float64), quantiles, axis=0).T
+
+def compile_linear(model: Any, knots: np.ndarray, mean: np.ndarray, scale: np.ndarray,
+                   class_names=None) -> CompiledLinear:
+    """
+    Export a LogisticRegression fitted on ``CompiledLinear.expand`` output
+
+    Two-class models have a single weight row; it is paired with a zero row
+    so the softmax reproduces sklearn's sigmoid.
+    """
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    intercept = np.asarray(model.intercept_, dtype=np.float64)
+    if coef.shape[0] == 1:
+        coef = np.vstack([np.zeros_like(coef), coef])
+        intercept = np.concatenate([[0.0], intercept])
+
+    # Importance of a raw feature: weight magnitude over it and its hinges
+    n_features = knots.shape[0]
+    weight = np.abs(coef).sum(axis=0)
+    per_feature = weight[:n_features] + weight[n_features:].reshape(n_features, -1).sum(axis=1)
+
+    return CompiledLinear(
+        knots=knots,
+        mean=mean,
+        scale=scale,
+        coef=coef,
+        intercept=intercept,
+        classes=model.classes_ if class_names is None else np.asarray(class_names)[model.classes_],
+        feature_importances=per_feature / per_feature.sum() if per_feature.sum() > 0 else None
+    )
@@ -8,14 +8,99 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     
+    # Engine tuning by name (see storage.py); unset picks 'sqlite' for SQLite
+    # URIs and 'server' otherwise, 'basic' keeps SQLAlchemy's defaults.
+    # Pragmas run on every new SQLite connection: WAL lets history reads
+    # proceed while analyses are written, and synchronous=NORMAL syncs only
+    # at checkpoints, so a power loss can drop the last commits
+    STORAGE_PROFILE = os.environ.get('STORAGE_PROFILE')
+    STORAGE_PROFILES = {
+        'basic': {},
+        'sqlite': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,          # ms to wait for a lock instead of failing
+                'cache_size': -64000,          # KiB (64 MB) of page cache per connection
+                'mmap_size': 268435456,        # bytes read through a 256 MB memory map
+                'temp_store': 'MEMORY'
+            }
+        },
+        'sqlite_durable': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'FULL',
+                'busy_timeout': 5000,
+                'cache_size': -64000,
+                'mmap_size': 268435456
+            }
+        },
+        'server': {
+            'engine_options': {
+                'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+                'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+                'pool_recycle': 1800,          # seconds; stays under typical server idle timeouts
+                'pool_pre_ping': True
+            }
+        }
+    }
+    
+    # ML inference micro-batching: concurrent requests wait up to this many
+    # milliseconds to share one model call (0 disables micro-batching)
+    ML_BATCH_WINDOW_MS = float(os.environ.get('ML_BATCH_WINDOW_MS', 0))
+    ML_BATCH_MAX_SIZE = int(os.environ.get('ML_BATCH_MAX_SIZE', 64))
+    
+    # Score in this many worker processes fed through shared memory (0 scores
+    # in the request thread); each slot carries up to ML_WORKER_SLOT_ROWS rows
+    ML_WORKER_PROCESSES = int(os.environ.get('ML_WORKER_PROCESSES', 0))
+    ML_WORKER_SLOT_ROWS = int(os.environ.get('ML_WORKER_SLOT_ROWS', 256))
+    
+    # Versioned model bundles; the ACTIVE pointer is polled every
+    # MODEL_WATCH_INTERVAL seconds (0, the default outside production,
+    # disables watching)
+    MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR') or 'models/registry'
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+    # Required in the X-Admin-Token header of model admin requests (unset disables them)
+    MODEL_ADMIN_TOKEN = os.environ.get('MODEL_ADMIN_TOKEN')
+    
+    # Keep per-user analysis counts in user_statistics, updated in the same
+    # transaction as each insert, and serve /statistics from it
+    USER_STATS_TABLE = bool(int(os.environ.get('USER_STATS_TABLE', 0)))
+    
+    # Write-behind persistence of analyses and chat messages: 'off' commits in
+    # each request, 'group' waits for a shared batch commit, 'async' returns
+    # once queued. Batches close at WRITE_BEHIND_BATCH_SIZE rows or after
+    # WRITE_BEHIND_MAX_DELAY_MS; at most WRITE_BEHIND_MAX_PENDING submissions
+    # wait before requests fall back to committing inline
+    WRITE_BEHIND_MODE = os.environ.get('WRITE_BEHIND_MODE', 'off')
+    WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 256))
+    WRITE_BEHIND_MAX_DELAY_MS = float(os.environ.get('WRITE_BEHIND_MAX_DELAY_MS', 20))
+    WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 10000))
+    # Async-mode rows whose insert failed, kept for `flask --app run replay-write-behind`
+    WRITE_BEHIND_DEAD_LETTER_PATH = (os.environ.get('WRITE_BEHIND_DEAD_LETTER_PATH')
+                                     or 'data/write_behind_dead_letters.jsonl')
+    
+    # Rendered /analysis/<id> responses kept in memory (0 disables the cache);
+    # with a spill directory, evicted ones move to disk, up to SPILL_ENTRIES
+    ANALYSIS_CACHE_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_ENTRIES', 2048))
+    ANALYSIS_CACHE_SPILL_DIR = os.environ.get('ANALYSIS_CACHE_SPILL_DIR')
+    ANALYSIS_CACHE_SPILL_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_SPILL_ENTRIES', 20000))
+    
 class DevelopmentConfig(Config):
     DEBUG = True
     
 class ProductionConfig(Config):
     DEBUG = False
+    ML_BATCH_WINDOW_MS = float(os.environ.get('ML_BATCH_WINDOW_MS', 2))
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5))
+    
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
@@ -0,0 +1,231 @@
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+import soil_rules
+
+N_FEATURES = len(soil_rules.FEATURES)
+
+# Room for class probabilities in each output slot; our models have three
+MAX_CLASSES = 8
+
+# Loaded models kept per worker: the active one and the one a reload replaced
+MAX_WORKER_MODELS = 2
+
+def _slot_views(buffer, n_slots: int, slot_rows: int):
+    """
+    Input (rows x features) and output (rows x classes) arrays over a shared block
+    """
+    inputs = np.ndarray((n_slots, slot_rows, N_FEATURES), dtype=np.float64, buffer=buffer)
+    outputs = np.ndarray(
+        (n_slots, slot_rows, MAX_CLASSES), dtype=np.float64, buffer=buffer, offset=inputs.nbytes
+    )
+    return inputs, outputs
+
+def _worker_main(shm_name: str, n_slots: int, slot_rows: int, loader: Callable,
+                 tasks, results):
+    """
+    Worker process loop: score slots in place until told to stop
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    inputs, outputs = _slot_views(shm.buf, n_slots, slot_rows)
+
+    # Bundles are memory-mapped, so loading a version in every worker still
+    # keeps a single copy of the model in physical memory. A path can be
+    # retrained in place, so models are keyed by path and version
+    models: 'OrderedDict[tuple, Any]' = OrderedDict()
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            slot, n_rows, source, version = task
+            try:
+                key = (source, version)
+                model = models.get(key)
+                if model is None:
+                    model = loader(source)
+                    loaded_version = getattr(model, 'version', None)
+                    if version is not None and loaded_version != version:
+                        raise ValueError(f'{source} now holds version {loaded_version}, not {version}')
+                    models[key] = model
+                    while len(models) > MAX_WORKER_MODELS:
+                        models.popitem(last=False)
+                models.move_to_end(key)
+                probabilities = model.predict_proba(inputs[slot, :n_rows])
+                outputs[slot, :n_rows, :probabilities.shape[1]] = probabilities
+                results.put((slot, probabilities.shape[1], None))
+            except Exception as e:
+                results.put((slot, 0, f'{type(e).__name__}: {e}'))
+    finally:
+        del inputs, outputs
+        shm.close()
+
+class InferencePool:
+    """
+    Persistent worker processes scoring requests through shared memory
+
+    A single shared-memory block is split into ``n_slots`` fixed slots, each
+    with room for ``slot_rows`` feature rows and their class probabilities.
+    Requests copy their rows into a free slot and send only the slot index
+    over the task queue, so feature data is never pickled. Each worker runs
+    its own interpreter, which lets CPU-bound scoring use every core instead
+    of sharing one GIL with the request threads.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], n_workers: int = None, slot_rows: int = 256,
+                 n_slots: int = None, start_method: str = 'spawn', timeout: float = 30.0):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.slot_rows = slot_rows
+        self.n_slots = n_slots or 2 * self.n_workers
+        self.timeout = timeout
+
+        size = self.n_slots * slot_rows * (N_FEATURES + MAX_CLASSES) * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._inputs, self._outputs = _slot_views(self._shm.buf, self.n_slots, slot_rows)
+
+        # Slots cycle through this ring: taken before writing, returned after reading
+        self._free_slots: 'queue.Queue[int]' = queue.Queue()
+        for slot in range(self.n_slots):
+            self._free_slots.put(slot)
+        self._pending: Dict[int, Future] = {}
+        self._slot_lock = threading.Lock()
+
+        context = multiprocessing.get_context(start_method)
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._workers = [
+            context.Process(
+                target=_worker_main, name=f'inference-worker-{index}', daemon=True,
+                args=(self._shm.name, self.n_slots, slot_rows, loader, self._tasks, self._results)
+            )
+            for index in range(self.n_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, name='inference-pool-results', daemon=True)
+        self._collector.start()
+        atexit.register(self.close)
+
+    def predict_proba(self, raw: np.ndarray, source: str, version: str = None) -> np.ndarray:
+        """
+        Class probabilities for a raw feature matrix using the model at ``source``
+
+        With ``version``, workers fail the request rather than score with a
+        different model found at that path.
+        """
+        if self._closed:
+            raise RuntimeError('Inference pool is closed')
+
+        raw = np.asarray(raw, dtype=np.float64)
+        probabilities = None
+
+        # Keep as many chunks in flight as there are free slots, so large
+        # requests fan out across workers
+        in_flight = deque()
+        try:
+            for start in range(0, len(raw), self.slot_rows):
+                stop = min(start + self.slot_rows, len(raw))
+                if in_flight and self._free_slots.empty():
+                    probabilities = self._gather(in_flight.popleft(), probabilities, len(raw))
+                slot = self._free_slots.get(timeout=self.timeout)
+                in_flight.append((slot, start, stop, self._dispatch(slot, raw[start:stop], source, version)))
+
+            while in_flight:
+                probabilities = self._gather(in_flight.popleft(), probabilities, len(raw))
+            return probabilities
+        finally:
+            with self._slot_lock:
+                for slot, _, _, future in in_flight:
+                    if future.done():
+                        self._free_slots.put(slot)
+                    else:
+                        # The worker may still write to it; the collector
+                        # returns the slot once that answer arrives
+                        future.abandoned = True
+
+    def close(self):
+        """
+        Stop the workers and release the shared memory block
+        """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=1.0)
+            if worker.is_alive():
+                worker.terminate()
+        self._results.put(None)
+        self._collector.join(timeout=1.0)
+
+        del self._inputs, self._outputs
+        self._shm.close()
+        self._shm.unlink()
+
+    def stats(self) -> dict:
+        return {
+            'workers': sum(worker.is_alive() for worker in self._workers),
+            'slots': self.n_slots,
+            'slot_rows': self.slot_rows,
+            'free_slots': self._free_slots.qsize()
+        }
+
+    def _gather(self, chunk, probabilities, n_rows: int) -> np.ndarray:
+        """
+        Wait for one dispatched chunk, copy its output and free its slot
+        """
+        slot, start, stop, future = chunk
+        try:
+            n_classes = future.result(timeout=self.timeout)
+        except BaseException:
+            with self._slot_lock:
+                if future.done():
+                    self._free_slots.put(slot)
+                else:
+                    future.abandoned = True
+            raise
+
+        if probabilities is None:
+            probabilities = np.empty((n_rows, n_classes))
+        probabilities[start:stop] = self._outputs[slot, :stop - start, :n_classes]
+        self._free_slots.put(slot)
+        return probabilities
+
+    def _dispatch(self, slot: int, rows: np.ndarray, source: str, version: str) -> Future:
+        future = Future()
+        self._pending[slot] = future
+        self._inputs[slot, :len(rows)] = rows
+        self._tasks.put((slot, len(rows), source, version))
+        return future
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            slot, n_classes, error = message
+            with self._slot_lock:
+                future = self._pending.pop(slot, None)
+                if future is None:
+                    continue
+                if error:
+                    future.set_exception(RuntimeError(f'Inference worker failed: {error}'))
+                else:
+                    future.set_result(n_classes)
+                if getattr(future, 'abandoned', False):
+                    self._free_slots.put(slot)
@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List
+
+import numpy as np
+
+class _PendingRequest:
+    __slots__ = ('rows', 'context', 'enqueued_at', 'future', 'claimed')
+
+    def __init__(self, rows: np.ndarray, context: Any):
+        self.rows = rows
+        self.context = context
+        self.enqueued_at = time.perf_counter()
+        self.future = Future()
+        self.claimed = False
+
+class MicroBatchScheduler:
+    """
+    Coalesce concurrent small inference requests into batched model calls
+
+    A background thread takes the first pending request and keeps collecting
+    until ``max_batch_size`` rows are queued, ``max_wait_ms`` has passed since
+    the first one arrived, or no new request shows up for ``max_idle_ms``.
+    The idle cut-off means a lone request is dispatched almost immediately
+    instead of sitting out the whole window. Callers also enforce a hard
+    ceiling: a request still queued after ``max_latency_ms`` is pulled back
+    and run inline by its caller.
+
+    Each request may carry a ``context`` (for example the model snapshot it
+    must be scored with); a batch only ever shares a call between requests
+    with the same context.
+    """
+
+    def __init__(self, predict_batch: Callable[[np.ndarray, Any], List[Any]], max_batch_size: int = 64,
+                 max_wait_ms: float = 2.0, max_idle_ms: float = 0.25, max_latency_ms: float = 50.0):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_idle = min(max_idle_ms, max_wait_ms) / 1000.0
+        self.max_latency = max_latency_ms / 1000.0
+
+        self.batches = 0
+        self.batched_rows = 0
+        self.inline_fallbacks = 0
+
+        self._queue: 'queue.Queue[_PendingRequest]' = queue.Queue()
+        self._claim_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._worker.start()
+
+    def submit(self, rows: np.ndarray, context: Any = None) -> List[Any]:
+        """
+        Queue rows for the next batch and block until their results are ready
+        """
+        if self._stopped.is_set():
+            return self.predict_batch(rows, context)
+
+        request = _PendingRequest(rows, context)
+        self._queue.put(request)
+
+        try:
+            # Waiting past the ceiling means the worker is busy or stuck
+            return request.future.result(timeout=self.max_latency)
+        except FutureTimeoutError:
+            pass
+
+        if self._claim(request):
+            self.inline_fallbacks += 1
+            return self.predict_batch(rows, context)
+
+        # Already part of a running batch; it will finish shortly
+        return request.future.result()
+
+    def stop(self):
+        """
+        Stop the worker thread; later submissions run inline
+        """
+        self._stopped.set()
+        self._queue.put(None)
+        self._worker.join(timeout=1.0)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'batched_rows': self.batched_rows,
+            'inline_fallbacks': self.inline_fallbacks,
+            'pending': self._queue.qsize()
+        }
+
+    def _claim(self, request: _PendingRequest) -> bool:
+        with self._claim_lock:
+            if request.claimed:
+                return False
+            request.claimed = True
+            return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            rows = len(first.rows)
+            deadline = first.enqueued_at + self.max_wait
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=min(remaining, self.max_idle))
+                except queue.Empty:
+                    break  # Nobody else is coming; don't hold the batch back
+                if request is None:
+                    self._stopped.set()
+                    break
+                batch.append(request)
+                rows += len(request.rows)
+
+            self._execute(batch)
+
+    def _execute(self, batch: List[_PendingRequest]):
+        # Skip requests whose callers already gave up and ran them inline
+        batch = [request for request in batch if self._claim(request)]
+
+        groups = {}
+        for request in batch:
+            groups.setdefault(id(request.context), []).append(request)
+
+        for group in groups.values():
+            try:
+                results = self.predict_batch(
+                    np.concatenate([request.rows for request in group]), group[0].context
+                )
+            except Exception as e:
+                for request in group:
+                    request.future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_rows += len(results)
+
+            offset = 0
+            for request in group:
+                request.future.set_result(results[offset:offset + len(request.rows)])
+                offset += len(request.rows)
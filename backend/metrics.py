@@ -0,0 +1,259 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds in seconds; covers sub-millisecond model stages up to slow commits
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class _Metric:
+    """
+    A named metric family with one child per combination of label values
+    """
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def collect(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._sample_lines(values, child))
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._children.clear()
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    class _Child:
+        __slots__ = ('value', 'lock')
+
+        def __init__(self):
+            self.value = 0.0
+            self.lock = threading.Lock()
+
+        def inc(self, amount: float = 1.0):
+            with self.lock:
+                self.value += amount
+
+    def _new_child(self):
+        return self._Child()
+
+    def _sample_lines(self, values, child):
+        return [f'{self.name}{_format_labels(self.label_names, values)} {child.value:g}']
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram in the Prometheus style
+    """
+    kind = 'histogram'
+
+    class _Child:
+        __slots__ = ('buckets', 'counts', 'sum', 'count', 'lock')
+
+        def __init__(self, buckets):
+            self.buckets = buckets
+            self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+            self.sum = 0.0
+            self.count = 0
+            self.lock = threading.Lock()
+
+        def observe(self, value: float):
+            index = bisect_left(self.buckets, value)
+            with self.lock:
+                self.counts[index] += 1
+                self.sum += value
+                self.count += 1
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return self._Child(self.buckets)
+
+    def _sample_lines(self, values, child):
+        with child.lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            le = '+Inf' if bound == float('inf') else f'{bound:g}'
+            labels = _format_labels(self.label_names, values, f'le="{le}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.label_names, values)
+        lines.append(f'{self.name}_sum{labels} {total:.9g}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+class StatsCollector:
+    """
+    Counters and gauges read from a component's ``stats()`` dict when scraped
+
+    The prediction cache, micro-batch scheduler and write-behind queue keep
+    their own counts; this publishes them without double bookkeeping.
+    ``stats`` returns None while the component is switched off, and its
+    families are then left out. ``fields`` maps stats keys to
+    ``(kind, name, documentation)``.
+    """
+
+    def __init__(self, stats: Callable[[], Optional[Dict[str, Any]]],
+                 fields: Dict[str, Tuple[str, str, str]]):
+        self.stats = stats
+        self.fields = fields
+
+    def collect(self) -> List[str]:
+        values = self.stats()
+        if values is None:
+            return []
+        lines = []
+        for key, (kind, name, documentation) in self.fields.items():
+            lines.extend([f'# HELP {name} {documentation}', f'# TYPE {name} {kind}', f'{name} {values[key]:g}'])
+        return lines
+
+STAGE_SECONDS = Histogram(
+    'soilsense_stage_duration_seconds',
+    'Time spent in each stage of request handling and inference',
+    ('stage',)
+)
+REQUEST_SECONDS = Histogram(
+    'soilsense_http_request_duration_seconds',
+    'HTTP request latency by endpoint',
+    ('endpoint', 'method')
+)
+REQUESTS_TOTAL = Counter(
+    'soilsense_http_requests_total',
+    'HTTP requests by endpoint and status code',
+    ('endpoint', 'method', 'status')
+)
+REQUEST_ERRORS_TOTAL = Counter(
+    'soilsense_http_request_errors_total',
+    'HTTP requests answered with a 5xx status, by endpoint',
+    ('endpoint', 'method')
+)
+
+ALL_METRICS = [STAGE_SECONDS, REQUEST_SECONDS, REQUESTS_TOTAL, REQUEST_ERRORS_TOTAL]
+
+PREDICTION_CACHE_FIELDS = {
+    'hits': ('counter', 'soilsense_prediction_cache_hits_total', 'Predictions served from the cache'),
+    'misses': ('counter', 'soilsense_prediction_cache_misses_total', 'Cacheable predictions not found in the cache'),
+    'evictions': ('counter', 'soilsense_prediction_cache_evictions_total', 'Cached predictions evicted to make room'),
+    'size': ('gauge', 'soilsense_prediction_cache_entries', 'Predictions currently cached')
+}
+SCHEDULER_FIELDS = {
+    'batches': ('counter', 'soilsense_inference_batches_total', 'Micro-batched model calls'),
+    'batched_rows': ('counter', 'soilsense_inference_batched_rows_total', 'Rows scored in micro-batches'),
+    'inline_fallbacks': ('counter', 'soilsense_inference_inline_fallbacks_total',
+                         'Requests run inline after waiting past the latency ceiling'),
+    'pending': ('gauge', 'soilsense_inference_pending_requests', 'Requests waiting for the next micro-batch')
+}
+WRITE_BEHIND_FIELDS = {
+    'batches': ('counter', 'soilsense_write_behind_batches_total', 'Write-behind batch commits'),
+    'flushed_rows': ('counter', 'soilsense_write_behind_flushed_rows_total', 'Rows committed by the write-behind queue'),
+    'inline_writes': ('counter', 'soilsense_write_behind_inline_writes_total',
+                      'Submissions written inline because the queue was full or closed'),
+    'failed_rows': ('counter', 'soilsense_write_behind_failed_rows_total', 'Queued rows whose insert failed'),
+    'dead_lettered_rows': ('counter', 'soilsense_write_behind_dead_lettered_rows_total',
+                           'Failed async rows kept in the dead-letter file for replay'),
+    'pending': ('gauge', 'soilsense_write_behind_queue_depth', 'Submissions waiting to be written')
+}
+
+# Named so that a component set up again (e.g. by a new app) replaces its collector
+_STATS_COLLECTORS: Dict[str, StatsCollector] = {}
+
+def register_stats(name: str, stats: Callable[[], Optional[Dict[str, Any]]],
+                   fields: Dict[str, Tuple[str, str, str]]):
+    """
+    Publish ``stats()`` under ``fields`` at /api/metrics, replacing any earlier ``name``
+    """
+    _STATS_COLLECTORS[name] = StatsCollector(stats, fields)
+
+class timed:
+    """
+    Context manager recording the duration of a stage in STAGE_SECONDS
+
+        with timed('db_commit'):
+            db.session.commit()
+    """
+    __slots__ = ('child', 'start')
+
+    def __init__(self, stage: str):
+        self.child = STAGE_SECONDS.labels(stage)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+def render_metrics() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.collect())
+    for collector in list(_STATS_COLLECTORS.values()):
+        lines.extend(collector.collect())
+    return '\n'.join(lines) + '\n'
+
+def reset_metrics():
+    for metric in ALL_METRICS:
+        metric.reset()
+
+def init_app(app):
+    """
+    Time every request and serve the metrics at /api/metrics
+    """
+    # Imported here so the predictor can record stages without Flask
+    from flask import Response, g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started_at = g.pop('request_started_at', None)
+        if started_at is not None:
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_SECONDS.labels(endpoint, request.method).observe(time.perf_counter() - started_at)
+            REQUESTS_TOTAL.labels(endpoint, request.method, str(response.status_code)).inc()
+            if response.status_code >= 500:
+                REQUEST_ERRORS_TOTAL.labels(endpoint, request.method).inc()
+        return response
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for SoilFertilityPredictor with a baseline regression check
+
+    python ml_model/benchmark.py --output benchmark.json
+    python ml_model/benchmark.py --save-baseline ml_model/benchmark_baseline.json
+    python ml_model/benchmark.py --compare ml_model/benchmark_baseline.json --tolerance 0.2
+
+Every metric is "lower is better" (time or bytes). In compare mode the script
+exits with status 1 when any metric exceeds its baseline by more than the
+tolerance, or when a baseline metric was not measured at all (for example
+the ML metrics without a trained model); ``--allow-missing`` turns the
+latter into a warning. ml_model/benchmark_baseline.json is the committed
+baseline; re-record it on the machine that runs the comparison.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+# Make the backend package importable when run as ml_model/benchmark.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml_predictor import SoilFertilityPredictor, read_model
+import soil_rules
+
+FEATURES = soil_rules.FEATURES
+
+DEFAULT_MODEL_PATH = 'models/soil_fertility_model.npz'
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_TOLERANCE = 0.25
+
+def make_samples(n, seed=0):
+    """
+    Realistic soil readings spread over all three fertility bands
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal([30, 25, 200, 6.5, 3.5, 50, 22], [15, 10, 80, 1.2, 1.5, 20, 8], size=(n, 7))
+    X = np.clip(X, [0, 0, 0, 3, 0, 0, -10], [200, 200, 1000, 10, 20, 100, 50])
+    return [dict(zip(FEATURES, map(float, row))) for row in X]
+
+def quiet_predictor(*args, **kwargs):
+    """
+    Build a predictor without its load messages cluttering the report
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return SoilFertilityPredictor(*args, **kwargs)
+
+def measure(fn, repeat=7, number=1, warmup=1):
+    """
+    Median wall time of ``number`` calls to ``fn`` over ``repeat`` runs, in seconds per call
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings)
+
+def allocated_bytes(fn):
+    """
+    Bytes still held by Python allocations made by ``fn`` (memory-mapped data excluded)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, after - before
+
+def run_benchmarks(model_path=DEFAULT_MODEL_PATH, batch_size=1000, quick=False):
+    """
+    Run every benchmark and return {metric: {'value', 'unit'}}
+    """
+    repeat = 3 if quick else 7
+    single_number = 50 if quick else 300
+    samples = make_samples(batch_size)
+    single = samples[0]
+    metrics = {}
+
+    def record(name, value, unit):
+        metrics[name] = {'value': value, 'unit': unit}
+
+    # Rule-based path (no model loaded); the cache is off so every call scores
+    rules = quiet_predictor(os.path.join(os.path.dirname(model_path) or '.', '__no_model__.npz'),
+                            cache_size=0)
+    record('rules_single_row', measure(lambda: rules.predict_fertility(single), repeat, single_number) * 1e6, 'us')
+    record('rules_batch', measure(lambda: rules.predict_fertility_batch(samples), repeat) * 1e3, 'ms')
+
+    if not os.path.exists(model_path):
+        print(f"No model at {model_path}; skipping ML benchmarks")
+        return metrics
+
+    # Cold load: bundle read, and full predictor construction including rule tables
+    record('cold_model_load', measure(lambda: read_model(model_path), repeat, warmup=0) * 1e3, 'ms')
+    record('cold_predictor_init',
+           measure(lambda: quiet_predictor(model_path, cache_size=0), repeat, warmup=0) * 1e3, 'ms')
+
+    predictor, footprint = allocated_bytes(lambda: quiet_predictor(model_path, cache_size=0))
+    record('predictor_heap_bytes', footprint, 'bytes')
+    model = predictor.model
+    if hasattr(model, 'to_arrays'):
+        record('model_array_bytes', sum(np.asarray(a).nbytes for a in model.to_arrays().values()), 'bytes')
+
+    # ML path
+    record('ml_single_row', measure(lambda: predictor.predict_fertility(single), repeat, single_number) * 1e6, 'us')
+    record('ml_batch', measure(lambda: predictor.predict_fertility_batch(samples), repeat) * 1e3, 'ms')
+
+    raw = soil_rules.feature_matrix(samples)
+    loaded = predictor.active
+    record('ml_predict_proba_batch', measure(lambda: loaded.predict_proba(raw), repeat) * 1e3, 'ms')
+
+    # Explanation and recommendation generation for a scored batch
+    probabilities = loaded.predict_proba(raw)
+    best = probabilities.argmax(axis=1)
+    predictions = np.asarray(model.classes_)[best]
+    confidences = probabilities[np.arange(len(raw)), best]
+
+    def explain():
+        full_codes, scored_codes = predictor.rules.codes(raw)
+        words = soil_rules.confidence_levels(confidences)
+        for full_code, scored_code, prediction, confidence, word in zip(
+            full_codes.tolist(), scored_codes.tolist(), predictions, confidences, words
+        ):
+            predictor._build_ml_result(loaded, full_code, scored_code, prediction, float(confidence), word)
+
+    record('explanations_batch', measure(explain, repeat) * 1e3, 'ms')
+
+    # Repeated readings served from the prediction cache, which only holds
+    # readings at instrument resolution
+    cached = quiet_predictor(model_path)
+    reading = dict(zip(FEATURES, cached.cache.quantize(soil_rules.feature_matrix([single]))[0].tolist()))
+    record('ml_single_row_cached', measure(lambda: cached.predict_fertility(reading), repeat, single_number) * 1e6, 'us')
+
+    return metrics
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Return (metric, baseline, current, ratio) for every metric that regressed
+
+    A metric regresses when it grows past ``baseline * (1 + tolerance)``;
+    a baseline entry may carry its own ``tolerance``. Metrics missing on
+    either side are skipped here; see ``missing_metrics``.
+    """
+    regressions = []
+    for name, base in baseline.get('metrics', {}).items():
+        if name not in current.get('metrics', {}):
+            continue
+        base_value = base['value']
+        value = current['metrics'][name]['value']
+        limit = base_value * (1 + base.get('tolerance', tolerance))
+        if value > limit:
+            ratio = value / base_value if base_value else float('inf')
+            regressions.append((name, base_value, value, ratio))
+    return regressions
+
+def missing_metrics(current, baseline):
+    """
+    Baseline metrics the current run did not measure
+    """
+    measured = current.get('metrics', {})
+    return [name for name in baseline.get('metrics', {}) if name not in measured]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark SoilFertilityPredictor')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Model bundle to benchmark')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--quick', action='store_true', help='Fewer repetitions')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--save-baseline', help='Write results as the baseline for later comparisons')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE_PATH,
+                        help='Baseline JSON file to compare against (default: the committed baseline)')
+    parser.add_argument('--allow-missing', action='store_true',
+                        help='Only warn when baseline metrics were not measured')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed relative slowdown before a metric counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = {
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'batch_size': args.batch_size,
+        'metrics': run_benchmarks(args.model, args.batch_size, args.quick)
+    }
+
+    print(f"\n{'metric':<28}{'value':>14}  unit")
+    for name, metric in results['metrics'].items():
+        print(f"{name:<28}{metric['value']:>14.2f}  {metric['unit']}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failed = False
+        missing = missing_metrics(results, baseline)
+        if missing:
+            marker = '⚠️' if args.allow_missing else '❌'
+            print(f"\n{marker} {len(missing)} baseline metric(s) were not measured: {', '.join(missing)}")
+            failed = not args.allow_missing
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metric(s) regressed past tolerance:")
+            for name, base_value, value, ratio in regressions:
+                print(f"  {name}: {base_value:.2f} -> {value:.2f} ({ratio:.2f}x)")
+            failed = True
+
+        if failed:
+            return 1
+        print("\n✅ No regressions against baseline")
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
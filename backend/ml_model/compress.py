@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Shrink a trained forest within an accuracy-loss budget
+
+    python ml_model/compress.py --budget 0.01
+    python ml_model/compress.py --budget 0.005 --distill --publish
+
+The compiled evaluator walks every tree ``max_depth`` levels for every row,
+so serving cost is roughly ``n_estimators * max_depth``. Candidates trade
+that cost against accuracy:
+
+- depth pruning: every node in a compiled forest keeps its class
+  distribution, so cutting a tree at depth ``d`` turns the nodes there
+  into leaves without refitting
+- estimator selection: trees are added greedily by how much they improve
+  the ensemble on selection rows the forest was not fitted on (half of the
+  held-out split, kept apart from the rows accuracy is measured on), and
+  the ensemble is cut at each prefix
+- distillation (optional): small forests and single trees fitted to the
+  full forest's predictions on the training rows
+
+The cheapest candidate whose held-out accuracy is within ``budget`` of the
+original's is saved as an ordinary model bundle, so SoilFertilityPredictor
+serves it unchanged.
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Make the backend package importable when run as ml_model/compress.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_forest import CompiledForest, compile_forest
+from model_bundle import load_bundle, save_bundle
+from model_registry import ModelRegistry
+from ml_model.dataset import DEFAULT_DATASET_PATH, materialize_synthetic
+from ml_model.search import measure_serving_cost
+
+# Fraction of the held-out rows used to rank trees; the rest measure accuracy
+SELECTION_FRACTION = 0.5
+
+# Row caps that keep the per-tree probability arrays small on large datasets
+MAX_SELECTION_ROWS = 5000
+MAX_EVAL_ROWS = 20000
+
+# Student models tried by distillation: (n_estimators, max_depth)
+DISTILL_STUDENTS = [(1, 4), (1, 6), (1, 8), (5, 6), (10, 6), (10, 8), (20, 8)]
+
+def serving_cost(forest: CompiledForest) -> int:
+    """
+    Node visits per row in the compiled evaluator
+    """
+    return forest.n_estimators * forest.max_depth
+
+def tree_probabilities_by_depth(forest: CompiledForest, X) -> Iterator[np.ndarray]:
+    """
+    Per-tree class distributions with every tree cut at each depth
+
+    Yields one (n_rows, n_estimators, n_classes) array per depth from 0 to
+    ``max_depth``: what each tree predicts when pruned to that depth.
+    """
+    X = np.asarray(X, dtype=forest.input_dtype)
+    flat = np.ascontiguousarray(X).ravel()
+    offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+    nodes = np.broadcast_to(forest.roots, (X.shape[0], forest.n_estimators))
+
+    yield forest.value[nodes]
+    for _ in range(forest.max_depth):
+        went_right = flat[offsets + forest.feature[nodes]] > forest.threshold[nodes]
+        nodes = forest.children[2 * nodes + went_right]
+        yield forest.value[nodes]
+
+def greedy_tree_order(probabilities: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Order trees so that every prefix is a strong sub-ensemble on (rows, y)
+
+    ``probabilities`` is (n_rows, n_estimators, n_classes). At each step the
+    tree that most improves ensemble accuracy is added, ties going to the
+    tree with the higher probability on the true class.
+    """
+    n_rows, n_trees, _ = probabilities.shape
+    rows = np.arange(n_rows)
+    true_class = probabilities[rows, :, y]
+
+    total = np.zeros(probabilities[:, 0].shape)
+    remaining = list(range(n_trees))
+    order = []
+    while remaining:
+        trial = total[:, None, :] + probabilities[:, remaining]
+        accuracy = (trial.argmax(axis=2) == y[:, None]).mean(axis=0)
+        margin = true_class[:, remaining].mean(axis=0)
+        best = remaining[int(np.lexsort((-margin, -accuracy))[0])]
+        order.append(best)
+        remaining.remove(best)
+        total += probabilities[:, best]
+    return np.array(order)
+
+def prefix_accuracies(probabilities: np.ndarray, order: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Accuracy of the ensemble made of the first k trees of ``order``, for every k
+    """
+    running = np.cumsum(probabilities[:, order], axis=1)
+    return (running.argmax(axis=2) == y[:, None]).mean(axis=0)
+
+def prune_forest(forest: CompiledForest, trees=None, max_depth: Optional[int] = None) -> CompiledForest:
+    """
+    Keep only ``trees`` (all by default), each cut at ``max_depth``
+
+    Nodes past the cut, and trees not kept, are removed from the arrays.
+    """
+    trees = range(forest.n_estimators) if trees is None else trees
+    limit = forest.max_depth if max_depth is None else max_depth
+    is_leaf = forest.left == np.arange(forest.n_nodes)
+
+    kept, depths, roots = [], [], []
+    for tree in trees:
+        roots.append(len(kept))
+        queue = [(int(forest.roots[tree]), 0)]
+        for node, depth in queue:
+            kept.append(node)
+            depths.append(depth)
+            if not is_leaf[node] and depth < limit:
+                queue.append((int(forest.left[node]), depth + 1))
+                queue.append((int(forest.right[node]), depth + 1))
+
+    kept = np.array(kept, dtype=np.intp)
+    depths = np.array(depths)
+    new_ids = np.arange(len(kept))
+    leaf = is_leaf[kept] | (depths == limit)
+
+    # Old node ids are unique within the kept set, so map them with a lookup table
+    remap = np.full(forest.n_nodes, -1, dtype=np.intp)
+    remap[kept] = new_ids
+
+    arrays = forest.to_arrays()
+    arrays.update({
+        'feature': np.where(leaf, 0, forest.feature[kept]),
+        'threshold': np.where(leaf, 0.0, forest.threshold[kept]),
+        'left': np.where(leaf, new_ids, remap[forest.left[kept]]),
+        'right': np.where(leaf, new_ids, remap[forest.right[kept]]),
+        'value': forest.value[kept],
+        'roots': np.array(roots, dtype=np.intp),
+        'max_depth': np.array(int(depths.max()) if len(depths) else 0)
+    })
+    return CompiledForest.from_arrays(arrays)
+
+def selection_candidates(forest: CompiledForest, X_val, y_val, X_test, y_test) -> List[Dict[str, Any]]:
+    """
+    Every (depth, number of trees) cut of the forest with its held-out accuracy
+    """
+    levels = zip(tree_probabilities_by_depth(forest, X_val), tree_probabilities_by_depth(forest, X_test))
+
+    candidates = []
+    for depth, (val_probabilities, test_probabilities) in enumerate(levels):
+        if depth == 0:
+            continue
+        order = greedy_tree_order(val_probabilities, y_val)
+        accuracies = prefix_accuracies(test_probabilities, order, y_test)
+        for k, accuracy in enumerate(accuracies, 1):
+            candidates.append({
+                'method': 'prune',
+                'trees': order[:k],
+                'depth': depth,
+                'cost': k * depth,
+                'accuracy': float(accuracy)
+            })
+    return candidates
+
+def distill_candidates(forest: CompiledForest, X_train, X_test, y_test,
+                       students=DISTILL_STUDENTS) -> List[Dict[str, Any]]:
+    """
+    Small forests fitted to the teacher forest's predicted classes
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    # Fit on class codes, so compile_forest can map them back to names
+    teacher_labels = forest.predict_proba(X_train).argmax(axis=1)
+
+    candidates = []
+    for n_estimators, max_depth in students:
+        if n_estimators == 1:
+            model = DecisionTreeClassifier(max_depth=max_depth, random_state=42)
+        else:
+            model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                           random_state=42, n_jobs=1)
+        model.fit(X_train, teacher_labels)
+        student = compile_forest(model, class_names=forest.classes_)
+        candidates.append({
+            'method': 'distill',
+            'forest': student,
+            'params': {'n_estimators': n_estimators, 'max_depth': max_depth},
+            'cost': serving_cost(student),
+            'accuracy': float((student.predict(X_test) == forest.classes_[y_test]).mean())
+        })
+    return candidates
+
+def compress_forest(forest: CompiledForest, X_train, X_val, y_val, X_test, y_test,
+                    budget: float = 0.01, distill: bool = False) -> Dict[str, Any]:
+    """
+    Cheapest pruned or distilled forest within ``budget`` of the original's test accuracy
+
+    Trees are ranked on ``X_val`` and accuracy is measured on up to
+    ``MAX_EVAL_ROWS`` of ``X_test``; neither may overlap the rows the forest
+    was fitted on, or selection favours trees that memorised them.
+    ``X_train`` is only used to fit distilled students. ``y_val`` and
+    ``y_test`` are class codes indexing ``forest.classes_``. Returns the
+    chosen forest with a summary of the choice.
+    """
+    if forest.link is not None:
+        raise ValueError('Only forests that average class distributions can be compressed')
+
+    X_test, y_test = np.asarray(X_test[:MAX_EVAL_ROWS]), np.asarray(y_test[:MAX_EVAL_ROWS])
+    baseline = float((forest.predict_proba(X_test).argmax(axis=1) == y_test).mean())
+
+    X_val, y_val = np.asarray(X_val[:MAX_SELECTION_ROWS]), np.asarray(y_val[:MAX_SELECTION_ROWS])
+
+    candidates = selection_candidates(forest, X_val, y_val, X_test, y_test)
+    if distill:
+        candidates.extend(distill_candidates(forest, X_train, X_test, y_test))
+
+    # The full-depth, all-trees cut is the original itself, so something always qualifies
+    affordable = [c for c in candidates if baseline - c['accuracy'] <= budget]
+    best = min(affordable, key=lambda c: (c['cost'], -c['accuracy']))
+    if best['cost'] >= serving_cost(forest):
+        return {'forest': forest, 'method': 'none', 'baseline_accuracy': baseline,
+                'accuracy': baseline, 'budget': budget}
+
+    if best['method'] == 'prune':
+        compact = prune_forest(forest, best['trees'], best['depth'])
+        details = {'n_estimators': len(best['trees']), 'max_depth': best['depth']}
+    else:
+        compact = best['forest']
+        details = best['params']
+
+    return {'forest': compact, 'method': best['method'], 'baseline_accuracy': baseline,
+            'accuracy': best['accuracy'], 'budget': budget, **details}
+
+def compression_report(original: CompiledForest, compact: CompiledForest, X) -> Dict[str, Any]:
+    """
+    Size and latency of both forests, and the factors gained
+    """
+    before = measure_serving_cost(original, X)
+    after = measure_serving_cost(compact, X)
+    return {
+        'before': before,
+        'after': after,
+        'size_reduction': before['model_bytes'] / max(after['model_bytes'], 1),
+        'speedup': before['latency_us'] / max(after['latency_us'], 1e-9),
+        'batch_speedup': before['batch_latency_us_per_row'] / max(after['batch_latency_us_per_row'], 1e-9)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compress a trained soil model')
+    parser.add_argument('--model', default='models/soil_fertility_model.npz')
+    parser.add_argument('--output', default='models/soil_fertility_model_compact.npz')
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH)
+    parser.add_argument('--samples', type=int, default=5000, help='Synthetic rows to materialize if needed')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--budget', type=float, default=0.01, help='Allowed held-out accuracy loss (absolute)')
+    parser.add_argument('--distill', action='store_true', help='Also try distilled students')
+    parser.add_argument('--publish', action='store_true', help='Publish the compact model to the registry')
+    args = parser.parse_args(argv)
+
+    bundle = load_bundle(args.model, mmap=False)
+    if bundle.family not in ('random_forest', 'decision_tree'):
+        print(f"Compression supports forests, not {bundle.family} models")
+        return 1
+    dataset = materialize_synthetic(args.dataset, args.samples, args.seed)
+    if list(bundle.model.classes_) != dataset.classes:
+        print(f"Model classes {list(bundle.model.classes_)} do not match the dataset's {dataset.classes}")
+        return 1
+
+    # The same split train_model.py fits on, so both halves of the test rows are unseen
+    X_train, X_held_out, _, y_held_out = dataset.split(test_fraction=0.2)
+    n_val = max(1, int(len(X_held_out) * SELECTION_FRACTION))
+    X_val, X_test = X_held_out[:n_val], X_held_out[n_val:]
+    y_val, y_test = y_held_out[:n_val], y_held_out[n_val:]
+    result = compress_forest(bundle.model, X_train, X_val, y_val, X_test, y_test, args.budget, args.distill)
+    compact = result.pop('forest')
+
+    report = compression_report(bundle.model, compact, np.asarray(X_test[:1000]))
+    print(f"Method: {result['method']}")
+    print(f"Accuracy: {result['baseline_accuracy']:.4f} -> {result['accuracy']:.4f} "
+          f"(budget {args.budget:.4f})")
+    print(f"Trees x depth: {bundle.model.n_estimators}x{bundle.model.max_depth} -> "
+          f"{compact.n_estimators}x{compact.max_depth}")
+    print(f"Size: {report['before']['model_bytes'] / 1024:.0f}KiB -> "
+          f"{report['after']['model_bytes'] / 1024:.0f}KiB ({report['size_reduction']:.1f}x smaller)")
+    print(f"Latency: {report['before']['latency_us']:.0f}us -> {report['after']['latency_us']:.0f}us "
+          f"({report['speedup']:.1f}x single row, {report['batch_speedup']:.1f}x batched)")
+
+    if result['method'] == 'none':
+        print("No smaller model fits the budget; nothing saved")
+        return 0
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    metadata = {key: value for key, value in bundle.metadata.items()
+                if key not in ('model_version', 'created_at')}
+    metadata['accuracy'] = result['accuracy']
+    metadata['compression'] = {
+        'compressed_from': bundle.version,
+        'method': result['method'],
+        'budget': args.budget,
+        'baseline_accuracy': result['baseline_accuracy'],
+        'accuracy': result['accuracy'],
+        'speedup': report['speedup'],
+        'size_reduction': report['size_reduction']
+    }
+    compact_bundle = save_bundle(args.output, compact, bundle.feature_names, metadata=metadata)
+    print(f"Saved {args.output} (model version {compact_bundle.version})")
+
+    if args.publish:
+        ModelRegistry('models/registry').publish(args.output)
+        print(f"Published {compact_bundle.version} as the active model")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+On-disk training datasets read through memory-mapping
+
+A dataset is a directory of raw column files plus ``meta.json``:
+
+    features.f32    float32 (n_rows, 7), row-major so sklearn can fit on it in place
+    label.i1        int8 class codes into meta['classes']
+    <column>.f64    any extra float64 column (e.g. fertility_score)
+
+Rows are appended in chunks, and ``meta.json`` is rewritten atomically after
+each batch of writes. It is the commit point: readers only see ``n_rows``
+rows, and bytes past that (from an interrupted write) are truncated on the
+next append. Dataset size is bounded by disk, not RAM.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ml_model.synthetic_data import FEATURE_COLUMNS, DEFAULT_CHUNK_SIZE, iter_synthetic_soil_chunks
+
+DATASET_FORMAT_VERSION = 1
+DEFAULT_DATASET_PATH = 'data/soil_dataset'
+
+# Sorted, so codes line up with the class order sklearn uses for the names
+CLASSES = ['High', 'Low', 'Medium']
+
+FEATURES_FILE = 'features.f32'
+LABEL_FILE = 'label.i1'
+META_FILE = 'meta.json'
+
+# Subdirectory holding materialized train/test splits, and the rows gathered per read
+SPLITS_DIR = 'splits'
+SPLIT_CHUNK_ROWS = 65536
+
+class SoilDataset:
+    """
+    Read-only, memory-mapped view of a materialized dataset
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version', 0) > DATASET_FORMAT_VERSION:
+            raise ValueError(f'Dataset format {self.meta["format_version"]} is newer than supported')
+
+        self.n_rows = self.meta['n_rows']
+        self.feature_columns = self.meta['feature_columns']
+        self.classes = self.meta['classes']
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def features(self) -> np.ndarray:
+        return self._map(FEATURES_FILE, np.float32, (len(self.feature_columns),))
+
+    @property
+    def labels(self) -> np.ndarray:
+        """
+        Class codes; index ``classes`` to get the names
+        """
+        return self._map(LABEL_FILE, np.int8)
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.meta.get('extra_columns', []):
+            raise KeyError(name)
+        return self._map(f'{name}.f64', np.float64)
+
+    def label_names(self, labels: Optional[np.ndarray] = None) -> np.ndarray:
+        labels = self.labels if labels is None else labels
+        return np.asarray(self.classes, dtype=object)[labels]
+
+    def split(self, test_fraction: float = 0.2,
+              seed: int = 42) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Stratified random train/test split, the same for a given ``seed``
+
+        Each class gives up ``test_fraction`` of its rows, so collected data
+        written in arrival order is not split by time. The chosen rows are
+        gathered once, a chunk at a time, into contiguous files under
+        ``splits/`` (see ``materialize_split``), and returned as memory-mapped
+        views of those: neither side is held in RAM, and every process using
+        the same split shares its pages.
+        """
+        path = self.materialize_split(test_fraction, seed)
+        train = SoilDataset(os.path.join(path, 'train'))
+        test = SoilDataset(os.path.join(path, 'test'))
+        return train.features, test.features, train.labels, test.labels
+
+    def split_indices(self, test_fraction: float = 0.2, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sorted train and test row indices for ``split``, memory-mapped from disk
+        """
+        path = self.materialize_split(test_fraction, seed)
+        return (np.load(os.path.join(path, 'train_rows.npy'), mmap_mode='r'),
+                np.load(os.path.join(path, 'test_rows.npy'), mmap_mode='r'))
+
+    def materialize_split(self, test_fraction: float = 0.2, seed: int = 42,
+                          chunk_rows: int = SPLIT_CHUNK_ROWS) -> str:
+        """
+        Write a split's row indices and gathered rows unless they are already on disk
+
+        The split is keyed by the dataset's row count and last commit, so
+        appending rows or regenerating the dataset writes a fresh one. It is
+        built in a temporary directory and renamed into place, so concurrent
+        callers never read a partial split. Returns the split's directory.
+        """
+        splits_dir = os.path.join(self.path, SPLITS_DIR)
+        path = os.path.join(splits_dir, f'{test_fraction:g}-{seed}')
+        source = {'n_rows': self.n_rows, 'updated_at': self.meta.get('updated_at')}
+        if _split_source(path) == source:
+            return path
+
+        rng = np.random.default_rng(seed)
+        features, labels = self.features, self.labels
+        is_test = np.zeros(self.n_rows, dtype=bool)
+        for code in np.unique(labels):
+            rows = np.flatnonzero(labels == code)
+            is_test[rng.choice(rows, int(round(len(rows) * test_fraction)), replace=False)] = True
+
+        os.makedirs(splits_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(dir=splits_dir, prefix='.split-')
+        for name, rows in (('train', np.flatnonzero(~is_test)), ('test', np.flatnonzero(is_test))):
+            np.save(os.path.join(tmp_path, f'{name}_rows.npy'), rows)
+            with DatasetWriter(os.path.join(tmp_path, name), metadata={
+                'feature_columns': self.feature_columns, 'classes': self.classes
+            }) as writer:
+                # Sorted indices, so each chunk is read in one forward pass over the map
+                for start in range(0, len(rows), chunk_rows):
+                    chunk = rows[start:start + chunk_rows]
+                    writer.write_arrays(features[chunk], labels[chunk])
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump({'source': source, 'test_fraction': test_fraction, 'seed': seed}, f, indent=2)
+
+        if _split_source(path) != source:
+            shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process published the same split first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        return path
+
+    def _map(self, filename: str, dtype, tail: Tuple[int, ...] = ()) -> np.ndarray:
+        if self.n_rows == 0:
+            return np.empty((0,) + tail, dtype=dtype)
+        return np.memmap(os.path.join(self.path, filename), dtype=dtype, mode='r',
+                         shape=(self.n_rows,) + tail)
+
+def _split_source(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            return json.load(f).get('source')
+    except (FileNotFoundError, ValueError):
+        return None
+
+class DatasetWriter:
+    """
+    Append chunks of samples to a dataset directory
+    """
+
+    def __init__(self, path: str, append: bool = False, extra_columns: Iterable[str] = (),
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        if append and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {
+                'format_version': DATASET_FORMAT_VERSION,
+                'n_rows': 0,
+                'feature_columns': list(FEATURE_COLUMNS),
+                'classes': list(CLASSES),
+                'extra_columns': list(extra_columns),
+                'created_at': datetime.utcnow().isoformat()
+            }
+        self.meta.update(metadata or {})
+
+        # Drop anything past the committed row count, e.g. from a crashed append
+        self._files = {}
+        for filename, row_bytes in self._layout():
+            file_path = os.path.join(path, filename)
+            f = open(file_path, 'r+b' if os.path.exists(file_path) else 'w+b')
+            f.truncate(self.meta['n_rows'] * row_bytes)
+            f.seek(0, os.SEEK_END)
+            self._files[filename] = f
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        # Rows written before a failure stay uncommitted and are discarded
+        self.close(commit=exc_type is None)
+        return False
+
+    def write(self, chunk: pd.DataFrame):
+        """
+        Append rows holding the feature columns, ``fertility_level`` and any extra columns
+        """
+        labels = pd.Categorical(chunk['fertility_level'], categories=self.meta['classes'])
+        if (labels.codes < 0).any():
+            raise ValueError(f'Unknown fertility level in {set(chunk["fertility_level"])}')
+
+        self.write_arrays(
+            chunk[self.meta['feature_columns']].to_numpy(np.float32), labels.codes,
+            {name: chunk[name].to_numpy(np.float64) for name in self.meta['extra_columns']}
+        )
+
+    def write_arrays(self, features: np.ndarray, labels: np.ndarray,
+                     extra: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Append rows already encoded as a feature matrix and class codes
+        """
+        extra = extra or {}
+        self._files[FEATURES_FILE].write(np.ascontiguousarray(features, dtype=np.float32).tobytes())
+        self._files[LABEL_FILE].write(np.asarray(labels, dtype=np.int8).tobytes())
+        for name in self.meta['extra_columns']:
+            self._files[f'{name}.f64'].write(np.asarray(extra[name], dtype=np.float64).tobytes())
+        self.meta['n_rows'] += len(labels)
+
+    def commit(self):
+        """
+        Flush data, then publish the new row count
+        """
+        for f in self._files.values():
+            f.flush()
+            os.fsync(f.fileno())
+        self.meta['updated_at'] = datetime.utcnow().isoformat()
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.meta-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def close(self, commit: bool = True):
+        if not self._files:
+            return
+        if commit:
+            self.commit()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def _layout(self) -> List[Tuple[str, int]]:
+        layout = [(FEATURES_FILE, 4 * len(self.meta['feature_columns'])), (LABEL_FILE, 1)]
+        layout.extend((f'{name}.f64', 8) for name in self.meta['extra_columns'])
+        return layout
+
+def materialize_synthetic(path: str = DEFAULT_DATASET_PATH, n_samples: int = 5000, seed: int = 42,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> SoilDataset:
+    """
+    Write the synthetic dataset to ``path`` unless an identical one is already there
+    """
+    source = {'type': 'synthetic', 'n_samples': n_samples, 'seed': seed}
+    try:
+        existing = SoilDataset(path)
+        if existing.meta.get('source') == source and existing.n_rows == n_samples:
+            return existing
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    with DatasetWriter(path, extra_columns=['fertility_score'], metadata={'source': source}) as writer:
+        for chunk in iter_synthetic_soil_chunks(n_samples, chunk_size, seed):
+            writer.write(chunk)
+    return SoilDataset(path)
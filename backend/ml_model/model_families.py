@@ -0,0 +1,118 @@
+"""
+Model families that can be trained, compiled and served from a bundle
+
+Every family is fitted with sklearn and exported to a pickle-free compiled
+evaluator, so the serving cost measured here is the cost production pays:
+
+- ``random_forest``: the existing averaged forest
+- ``gradient_boosting``: HistGradientBoosting, compiled to summed trees and a softmax
+- ``linear``: multinomial logistic regression on hinge-expanded features
+- ``decision_tree``: one shallow tree
+"""
+
+import io
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from compiled_forest import compile_forest, compile_gradient_boosting
+from compiled_linear import CompiledLinear, compile_linear, hinge_knots
+from ml_model.search import measure_serving_cost
+
+FAMILY_PARAMS = {
+    'random_forest': {'n_estimators': 100, 'max_depth': 10, 'min_samples_split': 5, 'min_samples_leaf': 2},
+    'gradient_boosting': {'max_iter': 100, 'max_depth': 6, 'learning_rate': 0.1},
+    'linear': {'n_knots': 4, 'C': 1.0},
+    'decision_tree': {'max_depth': 6, 'min_samples_leaf': 5}
+}
+
+# Rows used to place the linear model's hinge knots
+KNOT_SAMPLE_ROWS = 100_000
+
+def fit_random_forest(X, y, class_names, params: Dict[str, Any]):
+    from sklearn.ensemble import RandomForestClassifier
+
+    model = RandomForestClassifier(**params, random_state=42, class_weight='balanced')
+    return compile_forest(model.fit(X, y), class_names=class_names)
+
+def fit_gradient_boosting(X, y, class_names, params: Dict[str, Any]):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    model = HistGradientBoostingClassifier(**params, random_state=42, class_weight='balanced')
+    return compile_gradient_boosting(model.fit(X, y), class_names=class_names)
+
+def fit_linear(X, y, class_names, params: Dict[str, Any]):
+    from sklearn.linear_model import LogisticRegression
+
+    params = dict(params)
+    knots = hinge_knots(X[:KNOT_SAMPLE_ROWS], params.pop('n_knots'))
+
+    # Expand once without standardizing to learn the standardization
+    n_columns = X.shape[1] * (knots.shape[1] + 1)
+    raw = CompiledLinear(knots, np.zeros(n_columns), np.ones(n_columns), np.zeros((1, n_columns)), [0.0], [0])
+    Z = raw.expand(X)
+    mean, scale = Z.mean(axis=0), Z.std(axis=0)
+    scale[scale == 0] = 1.0
+
+    model = LogisticRegression(**params, max_iter=1000, class_weight='balanced')
+    model.fit((Z - mean) / scale, y)
+    return compile_linear(model, knots, mean, scale, class_names=class_names)
+
+def fit_decision_tree(X, y, class_names, params: Dict[str, Any]):
+    from sklearn.tree import DecisionTreeClassifier
+
+    model = DecisionTreeClassifier(**params, random_state=42, class_weight='balanced')
+    return compile_forest(model.fit(X, y), class_names=class_names)
+
+FAMILY_TRAINERS: Dict[str, Callable] = {
+    'random_forest': fit_random_forest,
+    'gradient_boosting': fit_gradient_boosting,
+    'linear': fit_linear,
+    'decision_tree': fit_decision_tree
+}
+
+def serialized_bytes(model) -> int:
+    """
+    Size of the model's arrays as written to an (uncompressed) bundle
+    """
+    buffer = io.BytesIO()
+    np.savez(buffer, **model.to_arrays())
+    return buffer.getbuffer().nbytes
+
+def evaluate_family(family: str, X_train, y_train, X_test, y_test, class_names,
+                    params: Optional[Dict[str, Any]] = None, model=None) -> Dict[str, Any]:
+    """
+    Train one family (unless ``model`` is given) and measure it on the held-out rows
+    """
+    params = {**FAMILY_PARAMS[family], **(params or {})}
+
+    started = time.perf_counter()
+    if model is None:
+        model = FAMILY_TRAINERS[family](X_train, y_train, class_names, params)
+    train_seconds = time.perf_counter() - started
+
+    X_test = np.asarray(X_test)
+    accuracy = float((model.predict(X_test) == np.asarray(class_names)[y_test]).mean())
+    cost = measure_serving_cost(model, X_test[:1000])
+
+    return {
+        'family': family,
+        'params': params,
+        'model': model,
+        'accuracy': accuracy,
+        'train_seconds': train_seconds,
+        'latency_us': cost['latency_us'],
+        'batch_rows_per_second': 1e6 / max(cost['batch_latency_us_per_row'], 1e-9),
+        'serialized_bytes': serialized_bytes(model)
+    }
+
+def select_family(results: List[Dict[str, Any]], accuracy_target: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Fastest single-row model meeting ``accuracy_target``, else the most accurate
+    """
+    if accuracy_target is not None:
+        qualifying = [result for result in results if result['accuracy'] >= accuracy_target]
+        if qualifying:
+            return min(qualifying, key=lambda result: result['latency_us'])
+    return max(results, key=lambda result: result['accuracy'])
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Incremental retraining from stored SoilAnalysis rows
+
+    python ml_model/retrain.py                      # warm start: add trees for new rows
+    python ml_model/retrain.py --mode window        # refit on the most recent rows
+
+Each run streams only analyses whose lab result was recorded after the
+dataset's mark out of ``soil_analyses`` (``yield_per`` chunks, selected
+columns only) and appends them to the on-disk field dataset; the mark is
+committed together with the rows. Rows are labelled with the lab-confirmed
+``lab_fertility_level``, never with ``fertility_level``: that is the
+predictor's own output (rule fallbacks included), and learning from it
+would only reinforce the model's mistakes. Analyses without a lab result
+are not used, and a corrected result is appended as a new row. Training
+then touches only new data:
+
+- ``warm_start`` grows the checkpointed forest with extra trees fitted on
+  the new rows plus a replay sample of older rows, dropping the oldest
+  trees beyond ``max_trees``
+- ``window`` refits from scratch on the last ``window_rows`` rows
+
+The result is compiled, saved as a bundle and published to the registry,
+where running servers pick it up.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Make the backend package importable when run as ml_model/retrain.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_forest import compile_forest
+from model_bundle import save_bundle
+from model_registry import ModelRegistry
+from ml_model.dataset import DatasetWriter, SoilDataset, materialize_synthetic, DEFAULT_DATASET_PATH
+from ml_model.synthetic_data import FEATURE_COLUMNS
+
+FIELD_DATASET_PATH = 'data/field_dataset'
+CHECKPOINT_PATH = 'models/retrain_checkpoint.pkl'
+BUNDLE_PATH = 'models/retrained_model.npz'
+
+FIELD_SOURCE = {'type': 'soil_analyses', 'label': 'lab_fertility_level'}
+
+BASE_PARAMS = {
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2
+}
+
+def ingest_new_rows(session, dataset_path: str = FIELD_DATASET_PATH, chunk_size: int = 1000) -> int:
+    """
+    Append analyses with lab results recorded after the mark to the field dataset
+
+    The mark is the (lab_confirmed_at, id) of the last ingested row.
+    """
+    from models import SoilAnalysis
+    from sqlalchemy import select, tuple_
+
+    columns = [getattr(SoilAnalysis, name) for name in FEATURE_COLUMNS]
+    mark = None
+    try:
+        meta = SoilDataset(dataset_path).meta
+        if meta.get('source') != FIELD_SOURCE:
+            raise ValueError(f'{dataset_path} was not built from lab results; '
+                             f'remove it to rebuild the field dataset')
+        mark = meta.get('lab_mark')
+    except FileNotFoundError:
+        pass
+
+    stmt = select(SoilAnalysis.id, SoilAnalysis.lab_confirmed_at, *columns, SoilAnalysis.lab_fertility_level)
+    stmt = stmt.where(SoilAnalysis.lab_fertility_level.is_not(None))
+    if mark:
+        confirmed_at, last_id = mark
+        stmt = stmt.where(tuple_(SoilAnalysis.lab_confirmed_at, SoilAnalysis.id)
+                          > tuple_(datetime.fromisoformat(confirmed_at), last_id))
+    stmt = stmt.order_by(SoilAnalysis.lab_confirmed_at, SoilAnalysis.id).execution_options(yield_per=chunk_size)
+
+    ingested = 0
+    with DatasetWriter(dataset_path, append=True, metadata={'source': FIELD_SOURCE}) as writer:
+        for partition in session.execute(stmt).partitions():
+            chunk = pd.DataFrame(partition, columns=['id', 'lab_confirmed_at'] + FEATURE_COLUMNS + ['fertility_level'])
+            writer.write(chunk)
+
+            # Rows and the mark become visible together
+            last = chunk.iloc[-1]
+            writer.meta['lab_mark'] = [last['lab_confirmed_at'].isoformat(), int(last['id'])]
+            writer.commit()
+            ingested += len(chunk)
+    return ingested
+
+def base_dataset(path: str = DEFAULT_DATASET_PATH) -> SoilDataset:
+    """
+    The synthetic baseline, materialized only if nothing is there yet
+
+    An existing dataset is reused as is, whatever size or seed it was
+    built with, rather than regenerated with this module's defaults.
+    """
+    try:
+        return SoilDataset(path)
+    except FileNotFoundError:
+        return materialize_synthetic(path)
+
+def load_checkpoint(path: str = CHECKPOINT_PATH) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+def save_checkpoint(checkpoint: Dict[str, Any], path: str = CHECKPOINT_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    joblib.dump(checkpoint, tmp_path)
+    os.replace(tmp_path, path)
+
+def _new_forest(n_estimators: int):
+    from sklearn.ensemble import RandomForestClassifier
+
+    return RandomForestClassifier(
+        n_estimators=n_estimators, random_state=42, class_weight='balanced', **BASE_PARAMS
+    )
+
+def _replay_sample(X: np.ndarray, y: np.ndarray, n: int, seed: int):
+    """
+    Up to ``n`` older rows, including at least one of every class present
+    """
+    rng = np.random.default_rng(seed)
+    picks = [rng.choice(np.flatnonzero(y == label)) for label in np.unique(y)]
+    if n > len(picks):
+        picks.extend(rng.choice(len(y), size=min(n, len(y)) - len(picks), replace=False))
+    picks = np.unique(picks)
+    return np.asarray(X[picks]), np.asarray(y[picks])
+
+def warm_start_update(field: SoilDataset, checkpoint: Optional[Dict[str, Any]], trees_per_run: int = 10,
+                      max_trees: int = 300, replay_fraction: float = 1.0,
+                      base_dataset_path: str = DEFAULT_DATASET_PATH) -> Dict[str, Any]:
+    """
+    Add ``trees_per_run`` trees fitted on rows the forest has not seen yet
+    """
+    base = base_dataset(base_dataset_path)
+    if checkpoint is None:
+        # Start from the synthetic baseline so early runs have a full forest
+        model = _new_forest(100).fit(base.features, base.labels)
+        checkpoint = {'model': model, 'trained_rows': 0}
+
+    model = checkpoint['model']
+    start = checkpoint['trained_rows']
+    X_new, y_new = field.features[start:], field.labels[start:]
+
+    # Mix in older rows so the new trees do not forget what came before
+    X_old, y_old = (field.features[:start], field.labels[:start]) if start else (base.features, base.labels)
+    X_replay, y_replay = _replay_sample(X_old, y_old, int(len(X_new) * replay_fraction), seed=start)
+    X_fit = [X_new, X_replay]
+    y_fit = [y_new, y_replay]
+
+    # sklearn requires every warm-start fit to see all of the forest's classes;
+    # borrow baseline rows for any class the field data has not produced yet
+    missing = np.setdiff1d(model.classes_, np.concatenate(y_fit))
+    if len(missing):
+        rows = np.flatnonzero(np.isin(base.labels, missing))
+        X_fit.append(np.asarray(base.features[rows[:len(missing) * 20]]))
+        y_fit.append(np.asarray(base.labels[rows[:len(missing) * 20]]))
+    X_fit, y_fit = np.concatenate(X_fit), np.concatenate(y_fit)
+
+    # Prequential check: how the current model did on the rows it is about to learn
+    accuracy_before = float((model.predict(X_new) == y_new).mean())
+
+    # Balance the new trees on the rows they are fitted on; the 'balanced'
+    # preset is not meant for warm-start fits on changing data
+    counts = np.bincount(y_fit, minlength=len(model.classes_))[model.classes_]
+    class_weight = {label: len(y_fit) / (len(counts) * count) for label, count in zip(model.classes_, counts)}
+    model.set_params(warm_start=True, class_weight=class_weight,
+                     n_estimators=len(model.estimators_) + trees_per_run)
+    model.fit(X_fit, y_fit)
+
+    # Keep the newest trees so the forest, and serving cost, stay bounded
+    if len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.n_estimators = max_trees
+
+    return {'model': model, 'trained_rows': field.n_rows, 'accuracy_before': accuracy_before,
+            'fitted_rows': len(y_fit)}
+
+def window_refit(field: SoilDataset, checkpoint: Optional[Dict[str, Any]], window_rows: int = 50000,
+                 n_estimators: int = 100) -> Dict[str, Any]:
+    """
+    Refit a fresh forest on the most recent ``window_rows`` rows
+    """
+    X, y = field.features[-window_rows:], field.labels[-window_rows:]
+
+    accuracy_before = None
+    if checkpoint is not None and checkpoint['trained_rows'] < field.n_rows:
+        start = checkpoint['trained_rows']
+        accuracy_before = float((checkpoint['model'].predict(field.features[start:]) == field.labels[start:]).mean())
+
+    model = _new_forest(n_estimators).fit(X, y)
+    return {'model': model, 'trained_rows': field.n_rows, 'accuracy_before': accuracy_before,
+            'fitted_rows': len(y)}
+
+def retrain(session, mode: str = 'warm_start', dataset_path: str = FIELD_DATASET_PATH,
+            checkpoint_path: str = CHECKPOINT_PATH, bundle_path: str = BUNDLE_PATH,
+            registry_root: Optional[str] = 'models/registry', chunk_size: int = 1000,
+            min_new_rows: int = 1, **options) -> Dict[str, Any]:
+    """
+    Ingest new rows and update the model; returns a summary of the run
+    """
+    ingested = ingest_new_rows(session, dataset_path, chunk_size)
+    field = SoilDataset(dataset_path)
+    checkpoint = load_checkpoint(checkpoint_path)
+
+    trained_rows = checkpoint['trained_rows'] if checkpoint else 0
+    new_rows = field.n_rows - trained_rows
+    summary = {'mode': mode, 'ingested': ingested, 'new_rows': new_rows, 'total_rows': field.n_rows}
+    if new_rows < min_new_rows:
+        summary['skipped'] = True
+        return summary
+
+    if mode == 'warm_start':
+        result = warm_start_update(field, checkpoint, **options)
+    elif mode == 'window':
+        result = window_refit(field, checkpoint, **options)
+    else:
+        raise ValueError(f'Unknown retraining mode: {mode}')
+
+    model = result['model']
+    save_checkpoint({'model': model, 'trained_rows': result['trained_rows'],
+                     'updated_at': datetime.utcnow().isoformat()}, checkpoint_path)
+
+    os.makedirs(os.path.dirname(bundle_path) or '.', exist_ok=True)
+    bundle = save_bundle(bundle_path, compile_forest(model, class_names=field.classes), field.feature_columns,
+                         metadata={'retrain_mode': mode, 'trained_rows': result['trained_rows'],
+                                   'accuracy_before': result['accuracy_before']})
+    if registry_root:
+        ModelRegistry(registry_root).publish(bundle_path)
+
+    summary.update({
+        'fitted_rows': result['fitted_rows'],
+        'accuracy_before': result['accuracy_before'],
+        'n_estimators': len(model.estimators_),
+        'model_version': bundle.version
+    })
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Retrain the soil model from stored analyses')
+    parser.add_argument('--mode', choices=['warm_start', 'window'], default='warm_start')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per yield_per chunk')
+    parser.add_argument('--min-new-rows', type=int, default=100, help='Skip training below this many new rows')
+    parser.add_argument('--trees-per-run', type=int, default=10)
+    parser.add_argument('--max-trees', type=int, default=300)
+    parser.add_argument('--window-rows', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    if args.mode == 'warm_start':
+        options = {'trees_per_run': args.trees_per_run, 'max_trees': args.max_trees}
+    else:
+        options = {'window_rows': args.window_rows}
+
+    from run import create_app
+    from models import db
+
+    app = create_app()
+    with app.app_context():
+        summary = retrain(db.session, args.mode, chunk_size=args.chunk_size,
+                          min_new_rows=args.min_new_rows, **options)
+
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
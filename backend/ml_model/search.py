@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Parallel RandomForest hyperparameter search with an accuracy/latency Pareto front
+
+    python ml_model/search.py --workers 4 --output search_results.json
+    python ml_model/search.py --n-iter 20 --budget-us 150 --train
+
+Trials run in a process pool. The parent writes the stratified train/test
+split to disk once (``SoilDataset.materialize_split``) and every worker
+memory-maps the same files, so split data is shared through the page cache
+rather than copied into each process. Cross-validation folds are contiguous
+blocks of the split's training rows. Only the array a fold's model is fit
+on, the rows outside its block, is built in RAM, and it is dropped before
+the next fold; held-out rows never reach its bootstraps, split thresholds,
+leaf-size limits or class weights. Each trial's final forest is fit on the
+memory-mapped training rows directly, then compiled and timed in the
+parent, one trial at a time, so latency is measured on an otherwise idle
+serving path.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Make the backend package importable when run as ml_model/search.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_forest import CompiledForest, compile_forest
+from ml_model.dataset import DEFAULT_DATASET_PATH, SoilDataset, materialize_synthetic
+from ml_model.train_model import DEFAULT_MODEL_PARAMS
+
+DEFAULT_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [6, 8, 10, 14],
+    'min_samples_leaf': [1, 2, 5],
+    'max_features': ['sqrt', None]
+}
+
+TEST_FRACTION = 0.2
+
+# Set in each worker by _init_worker; _split holds memory-mapped views, not copies
+_dataset = None
+_split = None
+
+def _init_worker(dataset_path: str):
+    global _dataset, _split
+    _dataset = SoilDataset(dataset_path)
+    _split = _dataset.split(TEST_FRACTION)
+
+def fold_bounds(n_rows: int, n_folds: int) -> List[tuple]:
+    edges = np.linspace(0, n_rows, n_folds + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+def fold_training_rows(X: np.ndarray, y: np.ndarray, start: int, stop: int):
+    """
+    The rows outside ``[start, stop)``, gathered into one contiguous array
+    """
+    return np.concatenate([X[:start], X[stop:]]), np.concatenate([y[:start], y[stop:]])
+
+def _fit(params: Dict[str, Any], X: np.ndarray, y: np.ndarray):
+    from sklearn.ensemble import RandomForestClassifier
+
+    # The same estimator settings train_model.py fits with
+    model = RandomForestClassifier(**params, random_state=42, class_weight='balanced', n_jobs=1)
+    return model.fit(X, y)
+
+def run_trial(params: Dict[str, Any], n_folds: int = 5) -> Dict[str, Any]:
+    """
+    Cross-validate one configuration, then fit it on all training rows
+
+    Settings the grid leaves out take train_model.py's defaults, and the
+    trial reports the full set, so ``--train`` fits exactly what was measured.
+    """
+    params = {**DEFAULT_MODEL_PARAMS, **params}
+    X_train, X_test, y_train, y_test = _split
+
+    started = time.perf_counter()
+    fold_scores = []
+    for start, stop in fold_bounds(len(X_train), n_folds):
+        # sklearn needs one array, so this fold's training rows are the only copy
+        model = _fit(params, *fold_training_rows(X_train, y_train, start, stop))
+        fold_scores.append(float((model.predict(X_train[start:stop]) == y_train[start:stop]).mean()))
+        del model
+
+    model = _fit(params, X_train, y_train)
+    forest = compile_forest(model, class_names=_dataset.classes)
+
+    return {
+        'params': params,
+        'cv_accuracy': float(np.mean(fold_scores)),
+        'cv_std': float(np.std(fold_scores)),
+        'test_accuracy': float((model.predict(X_test) == y_test).mean()),
+        'train_seconds': time.perf_counter() - started,
+        'forest': forest.to_arrays()
+    }
+
+def measure_serving_cost(model, X: np.ndarray, repeat: int = 5) -> Dict[str, float]:
+    """
+    Single-row and per-row batch latency of a compiled model, and its size
+    """
+    single = X[:1]
+    model.predict_proba(single)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(20):
+            model.predict_proba(single)
+        timings.append((time.perf_counter() - start) / 20)
+    single_us = float(np.median(timings) * 1e6)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        timings.append((time.perf_counter() - start) / len(X))
+    batch_us = float(np.median(timings) * 1e6)
+
+    return {
+        'latency_us': single_us,
+        'batch_latency_us_per_row': batch_us,
+        'model_bytes': int(sum(np.asarray(a).nbytes for a in model.to_arrays().values())),
+        'n_nodes': getattr(model, 'n_nodes', 0)
+    }
+
+def pareto_front(trials: List[Dict[str, Any]], accuracy_key: str = 'cv_accuracy',
+                 latency_key: str = 'latency_us') -> List[Dict[str, Any]]:
+    """
+    Trials not beaten on both accuracy and latency by any other trial, fastest first
+    """
+    front = []
+    best_accuracy = -1.0
+    for trial in sorted(trials, key=lambda t: (t[latency_key], -t[accuracy_key])):
+        if trial[accuracy_key] > best_accuracy:
+            front.append(trial)
+            best_accuracy = trial[accuracy_key]
+    return front
+
+def best_within_budget(front: List[Dict[str, Any]], budget_us: float):
+    affordable = [trial for trial in front if trial['latency_us'] <= budget_us]
+    return affordable[-1] if affordable else None
+
+def candidate_params(grid: Dict[str, list], n_iter: int = None, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    The full grid, or ``n_iter`` configurations sampled from it without replacement
+    """
+    names = sorted(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    if n_iter and n_iter < len(combos):
+        combos = random.Random(seed).sample(combos, n_iter)
+    return combos
+
+def run_search(dataset_path: str, candidates: List[Dict[str, Any]], n_folds: int = 5,
+               workers: int = None) -> List[Dict[str, Any]]:
+    dataset = SoilDataset(dataset_path)
+    # Written to disk here, before the workers start, so they only map it
+    _, X_test, _, _ = dataset.split(TEST_FRACTION)
+    X_latency = np.asarray(X_test[:1000])
+
+    trials = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(dataset_path,)) as pool:
+        futures = [pool.submit(run_trial, params, n_folds) for params in candidates]
+        for index, future in enumerate(futures, 1):
+            trial = future.result()
+            forest = CompiledForest.from_arrays(trial.pop('forest'))
+            trial.update(measure_serving_cost(forest, X_latency))
+            trials.append(trial)
+            print(f"[{index}/{len(candidates)}] {trial['params']} "
+                  f"cv={trial['cv_accuracy']:.4f} latency={trial['latency_us']:.0f}us "
+                  f"size={trial['model_bytes'] / 1024:.0f}KiB")
+    return trials
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='RandomForest hyperparameter search')
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH)
+    parser.add_argument('--samples', type=int, default=5000, help='Synthetic rows to materialize if needed')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--n-iter', type=int, help='Sample this many configurations instead of the full grid')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per core)')
+    parser.add_argument('--output', default='search_results.json')
+    parser.add_argument('--budget-us', type=float, help='Single-row latency budget for the recommended model')
+    parser.add_argument('--train', action='store_true',
+                        help='Train and publish the recommended configuration')
+    args = parser.parse_args(argv)
+
+    materialize_synthetic(args.dataset, args.samples, args.seed)
+    candidates = candidate_params(DEFAULT_GRID, args.n_iter, args.seed)
+    print(f"Evaluating {len(candidates)} configurations with {args.folds}-fold CV...")
+
+    trials = run_search(args.dataset, candidates, args.folds, args.workers)
+    front = pareto_front(trials)
+
+    print("\nAccuracy/latency Pareto front:")
+    for trial in front:
+        print(f"  {trial['latency_us']:8.0f}us  cv={trial['cv_accuracy']:.4f}  "
+              f"test={trial['test_accuracy']:.4f}  {trial['params']}")
+
+    recommended = best_within_budget(front, args.budget_us) if args.budget_us else front[-1]
+    with open(args.output, 'w') as f:
+        json.dump({'trials': trials, 'pareto_front': front, 'recommended': recommended}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if recommended is None:
+        print(f"No configuration fits a {args.budget_us}us budget")
+        return 1
+
+    print(f"Recommended: {recommended['params']}")
+    if args.train:
+        from ml_model.train_model import train_soil_fertility_model
+        train_soil_fertility_model(args.dataset, args.samples, args.seed, model_params=recommended['params'])
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Vectorized synthetic soil fertility data
+
+Rows are produced column-wise in fixed-size chunks, so datasets of any size
+can be generated in bounded memory. The random stream is consumed exactly as
+the original per-row generator did (seven feature draws, then one noise
+draw per row), so a given seed yields the same rows whatever the chunk size.
+"""
+
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['nitrogen', 'phosphorus', 'potassium', 'ph',
+                   'organic_matter', 'moisture', 'temperature']
+COLUMNS = FEATURE_COLUMNS + ['fertility_score', 'fertility_level']
+
+# Per-feature normal distributions, followed by the score noise
+MEANS = np.array([30, 25, 200, 6.5, 3.5, 50, 22, 0], dtype=np.float64)
+STDS = np.array([15, 10, 80, 1.2, 1.5, 20, 8, 3], dtype=np.float64)
+
+# Realistic ranges each reading is clipped to
+LOWER = np.array([0, 0, 0, 3, 0, 0, -5], dtype=np.float64)
+UPPER = np.array([100, 100, 500, 9, 10, 100, 45], dtype=np.float64)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+def fertility_scores(X: np.ndarray, noise: np.ndarray) -> np.ndarray:
+    """
+    Soil-science fertility score (0-100) for every row of a clipped feature matrix
+    """
+    nitrogen, phosphorus, potassium, ph, organic_matter, moisture = X[:, :6].T
+
+    # Nitrogen contribution (0-25 points)
+    score = np.select(
+        [nitrogen < 15, nitrogen < 40],
+        [nitrogen * 0.8, 12 + (nitrogen - 15) * 0.5], 25.0
+    )
+    # Phosphorus contribution (0-20 points)
+    score = score + np.select(
+        [phosphorus < 10, phosphorus < 30],
+        [phosphorus * 1.0, 10 + (phosphorus - 10) * 0.5], 20.0
+    )
+    # Potassium contribution (0-20 points)
+    score = score + np.select(
+        [potassium < 100, potassium < 250],
+        [potassium * 0.1, 10 + (potassium - 100) * 0.067], 20.0
+    )
+    # pH contribution (0-15 points)
+    score = score + np.select(
+        [(ph >= 6.0) & (ph <= 7.5), ((ph >= 5.5) & (ph < 6.0)) | ((ph > 7.5) & (ph <= 8.0))],
+        [15.0, 10.0], 5.0
+    )
+    # Organic matter contribution (0-15 points)
+    score = score + np.select(
+        [organic_matter < 2, organic_matter < 5],
+        [organic_matter * 3, 6 + (organic_matter - 2) * 3], 15.0
+    )
+    # Moisture contribution (0-5 points)
+    score = score + np.select(
+        [(moisture >= 30) & (moisture <= 70), ((moisture >= 20) & (moisture < 30)) | ((moisture > 70) & (moisture <= 80))],
+        [5.0, 3.0], 1.0
+    )
+
+    # Add some randomness
+    return np.clip(score + noise, 0, 100)
+
+def fertility_levels(scores: np.ndarray) -> np.ndarray:
+    """
+    Classify scores: >= 75 High, >= 50 Medium, otherwise Low
+    """
+    return np.array(['Low', 'Medium', 'High'], dtype=object)[
+        np.digitize(scores, [50, 75])
+    ]
+
+def iter_synthetic_soil_chunks(n_samples: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                               seed: int = 42) -> Iterator[pd.DataFrame]:
+    """
+    Yield the dataset as DataFrames of at most ``chunk_size`` rows
+    """
+    rng = np.random.RandomState(seed)
+    for start in range(0, n_samples, chunk_size):
+        n = min(chunk_size, n_samples - start)
+
+        # One row of draws per sample, in the original draw order
+        draws = MEANS + STDS * rng.standard_normal((n, len(MEANS)))
+        X = np.clip(draws[:, :7], LOWER, UPPER)
+        scores = fertility_scores(X, draws[:, 7])
+
+        chunk = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+        chunk['fertility_score'] = scores
+        chunk['fertility_level'] = fertility_levels(scores)
+        chunk.index = pd.RangeIndex(start, start + n)
+        yield chunk
+
+def generate_synthetic_soil_data(n_samples: int = 5000, seed: int = 42,
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Generate synthetic soil fertility data for training
+    In production, replace this with your actual soil dataset
+    """
+    chunks = list(iter_synthetic_soil_chunks(n_samples, chunk_size, seed))
+    if not chunks:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(chunks)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Stream synthetic soil data to CSV')
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--output', default='synthetic_soil_data.csv')
+    args = parser.parse_args()
+
+    for index, chunk in enumerate(iter_synthetic_soil_chunks(args.rows, args.chunk_size, args.seed)):
+        chunk.to_csv(args.output, mode='w' if index == 0 else 'a', header=index == 0, index=False)
+    print(f"Wrote {args.rows} rows to {args.output}")
@@ -1,7 +1,12 @@
-import joblib
+import os
+import sys
 import numpy as np
 import pandas as pd
+
+# Make the backend package importable when run as ml_model/test_model.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ml_predictor import SoilFertilityPredictor
+from model_bundle import load_bundle
 
 def test_trained_model():
     """
@@ -10,7 +15,7 @@ def test_trained_model():
     print("Testing trained ML model...")
     
     # Initialize predictor with trained model
-    predictor = SoilFertilityPredictor('models/soil_fertility_model.pkl')
+    predictor = SoilFertilityPredictor('models/soil_fertility_model.npz')
     
     # Test cases with different soil conditions
     test_cases = [
@@ -110,16 +115,22 @@ def test_trained_model():
 
 def load_and_inspect_model():
     """
-    Load and inspect the trained model
+    Load and inspect the trained model bundle
     """
     try:
-        print("Loading trained model...")
-        model = joblib.load('models/soil_fertility_model.pkl')
-        scaler = joblib.load('models/soil_fertility_scaler.pkl')
-        feature_names = joblib.load('models/feature_names.pkl')
+        print("Loading trained model bundle...")
+        if not os.path.exists('models/soil_fertility_model.npz'):
+            raise FileNotFoundError('models/soil_fertility_model.npz')
+        bundle = load_bundle('models/soil_fertility_model.npz')
+        model = bundle.model
+        feature_names = bundle.feature_names
         
         print(f"Model type: {type(model).__name__}")
-        print(f"Model parameters: {model.get_params()}")
+        print(f"Model family: {bundle.family}")
+        print(f"Model version: {bundle.version}")
+        print(f"Model metadata: {bundle.metadata}")
+        if hasattr(model, 'n_estimators'):
+            print(f"Number of trees: {model.n_estimators} ({model.n_nodes} nodes)")
         print(f"Feature names: {feature_names}")
         print(f"Number of features: {len(feature_names)}")
         
@@ -145,5 +156,6 @@ def load_and_inspect_model():
         return False
 
 if __name__ == "__main__":
-    if load_and_inspect_model():
-        test_trained_model()
\ No newline at end of file
+    if not load_and_inspect_model():
+        sys.exit(1)
+    test_trained_model()
\ No newline at end of file
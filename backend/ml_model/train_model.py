@@ -1,177 +1,80 @@
 import pandas as pd
-import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.model_selection import cross_val_score
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import joblib
 import os
+import sys
+import time
 
-# Create models directory if it doesn't exist
-os.makedirs('models', exist_ok=True)
+# Make the backend package importable when run as ml_model/train_model.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_forest import compile_forest
+from model_bundle import save_bundle
+from model_registry import ModelRegistry
+from ml_model.dataset import DEFAULT_DATASET_PATH, materialize_synthetic
 
-def generate_synthetic_soil_data(n_samples=5000):
-    """
-    Generate synthetic soil fertility data for training
-    In production, replace this with your actual soil dataset
-    """
-    np.random.seed(42)
-    
-    data = []
-    
-    for _ in range(n_samples):
-        # Generate correlated soil parameters
-        nitrogen = np.random.normal(30, 15)  # ppm
-        phosphorus = np.random.normal(25, 10)  # ppm
-        potassium = np.random.normal(200, 80)  # ppm
-        ph = np.random.normal(6.5, 1.2)  # pH scale
-        organic_matter = np.random.normal(3.5, 1.5)  # percentage
-        moisture = np.random.normal(50, 20)  # percentage
-        temperature = np.random.normal(22, 8)  # Celsius
-        
-        # Ensure realistic ranges
-        nitrogen = max(0, min(100, nitrogen))
-        phosphorus = max(0, min(100, phosphorus))
-        potassium = max(0, min(500, potassium))
-        ph = max(3, min(9, ph))
-        organic_matter = max(0, min(10, organic_matter))
-        moisture = max(0, min(100, moisture))
-        temperature = max(-5, min(45, temperature))
-        
-        # Calculate fertility based on soil science principles
-        fertility_score = 0
-        
-        # Nitrogen contribution (0-25 points)
-        if nitrogen < 15:
-            fertility_score += nitrogen * 0.8
-        elif nitrogen < 40:
-            fertility_score += 12 + (nitrogen - 15) * 0.5
-        else:
-            fertility_score += 25
-            
-        # Phosphorus contribution (0-20 points)
-        if phosphorus < 10:
-            fertility_score += phosphorus * 1.0
-        elif phosphorus < 30:
-            fertility_score += 10 + (phosphorus - 10) * 0.5
-        else:
-            fertility_score += 20
-            
-        # Potassium contribution (0-20 points)
-        if potassium < 100:
-            fertility_score += potassium * 0.1
-        elif potassium < 250:
-            fertility_score += 10 + (potassium - 100) * 0.067
-        else:
-            fertility_score += 20
-            
-        # pH contribution (0-15 points)
-        if 6.0 <= ph <= 7.5:
-            fertility_score += 15
-        elif 5.5 <= ph < 6.0 or 7.5 < ph <= 8.0:
-            fertility_score += 10
-        else:
-            fertility_score += 5
-            
-        # Organic matter contribution (0-15 points)
-        if organic_matter < 2:
-            fertility_score += organic_matter * 3
-        elif organic_matter < 5:
-            fertility_score += 6 + (organic_matter - 2) * 3
-        else:
-            fertility_score += 15
-            
-        # Moisture contribution (0-5 points)
-        if 30 <= moisture <= 70:
-            fertility_score += 5
-        elif 20 <= moisture < 30 or 70 < moisture <= 80:
-            fertility_score += 3
-        else:
-            fertility_score += 1
-            
-        # Add some randomness
-        fertility_score += np.random.normal(0, 3)
-        fertility_score = max(0, min(100, fertility_score))
-        
-        # Classify fertility level
-        if fertility_score >= 75:
-            fertility_level = 'High'
-        elif fertility_score >= 50:
-            fertility_level = 'Medium'
-        else:
-            fertility_level = 'Low'
-        
-        data.append({
-            'nitrogen': nitrogen,
-            'phosphorus': phosphorus,
-            'potassium': potassium,
-            'ph': ph,
-            'organic_matter': organic_matter,
-            'moisture': moisture,
-            'temperature': temperature,
-            'fertility_score': fertility_score,
-            'fertility_level': fertility_level
-        })
-    
-    return pd.DataFrame(data)
+# Random Forest settings used unless a search picked others
+DEFAULT_MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2
+}
 
-def train_soil_fertility_model():
+def train_soil_fertility_model(dataset_path=DEFAULT_DATASET_PATH, n_samples=5000, seed=42, model_params=None,
+                               families=None, accuracy_target=None):
     """
     Train machine learning model for soil fertility prediction
+
+    With ``families``, those model families are trained alongside the Random
+    Forest and the fastest one reaching ``accuracy_target`` is saved instead.
     """
-    print("Generating synthetic soil fertility dataset...")
-    df = generate_synthetic_soil_data(5000)
-    
-    print(f"Dataset shape: {df.shape}")
-    print(f"Fertility distribution:\n{df['fertility_level'].value_counts()}")
+    # Materialize the dataset on disk once; later runs memory-map the same files
+    print("Preparing synthetic soil fertility dataset...")
+    dataset = materialize_synthetic(dataset_path, n_samples, seed)
     
-    # Features and target
-    feature_columns = ['nitrogen', 'phosphorus', 'potassium', 'ph', 
-                      'organic_matter', 'moisture', 'temperature']
-    X = df[feature_columns]
-    y = df['fertility_level']
-    
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    print(f"Dataset: {dataset.n_rows} rows at {dataset_path}")
+    print(f"Fertility distribution:\n{pd.Series(dataset.label_names()).value_counts()}")
+    # Stratified split with a fixed seed, gathered once into files under the
+    # dataset's splits/ directory; features and target are memory-mapped views
+    feature_columns = dataset.feature_columns
+    X_train, X_test, y_train, y_test = dataset.split(test_fraction=0.2)
     
     print(f"Training set size: {X_train.shape[0]}")
     print(f"Test set size: {X_test.shape[0]}")
     
-    # Scale the features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+    # Trees are invariant to feature scaling, so fit on the raw float32 columns
+    # directly: sklearn can then use the memory map without a scaled copy
+    scaler = None
     
     # Train Random Forest model
     print("Training Random Forest model...")
     rf_model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=5,
-        min_samples_leaf=2,
+        **{**DEFAULT_MODEL_PARAMS, **(model_params or {})},
         random_state=42,
         class_weight='balanced'
     )
     
-    rf_model.fit(X_train_scaled, y_train)
+    started = time.perf_counter()
+    rf_model.fit(X_train, y_train)
+    rf_seconds = time.perf_counter() - started
     
     # Make predictions
-    y_pred = rf_model.predict(X_test_scaled)
+    y_pred = rf_model.predict(X_test)
     
     # Evaluate the model
     accuracy = accuracy_score(y_test, y_pred)
     print(f"Model Accuracy: {accuracy:.4f}")
     
     print("\nClassification Report:")
-    print(classification_report(y_test, y_pred))
+    print(classification_report(y_test, y_pred, labels=range(len(dataset.classes)),
+                                target_names=dataset.classes))
     
     print("\nConfusion Matrix:")
     print(confusion_matrix(y_test, y_pred))
     
     # Cross-validation
-    cv_scores = cross_val_score(rf_model, X_train_scaled, y_train, cv=5)
+    cv_scores = cross_val_score(rf_model, X_train, y_train, cv=5)
     print(f"\nCross-validation scores: {cv_scores}")
     print(f"Average CV score: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
     
@@ -184,21 +87,98 @@ def train_soil_fertility_model():
     print("\nFeature Importance:")
     print(feature_importance)
     
-    # Save the model and scaler
-    print("\nSaving model and scaler...")
-    joblib.dump(rf_model, 'models/soil_fertility_model.pkl')
-    joblib.dump(scaler, 'models/soil_fertility_scaler.pkl')
-    
-    # Save feature names for reference
-    joblib.dump(feature_columns, 'models/feature_names.pkl')
+    compiled = compile_forest(rf_model, class_names=dataset.classes)
+    metadata = {
+        'accuracy': float(accuracy),
+        'dataset': dataset.meta.get('source'),
+        'params': {**DEFAULT_MODEL_PARAMS, **(model_params or {})}
+    }
+    
+    if families:
+        compiled, metadata = compare_model_families(
+            compiled, rf_seconds, families, accuracy_target, dataset.classes,
+            X_train, X_test, y_train, y_test, metadata
+        )
+    
+    # Save the model and feature names as one servable bundle; the model was
+    # fit on raw values, so serving needs no scaler
+    print("\nSaving model bundle...")
+    os.makedirs('models', exist_ok=True)
+    bundle = save_bundle('models/soil_fertility_model.npz', compiled, feature_columns, metadata=metadata)
+    
+    # Publish to the registry; running servers pick up the new ACTIVE version
+    registry = ModelRegistry('models/registry')
+    registry.publish('models/soil_fertility_model.npz')
     
     print("Model training completed successfully!")
+    print(f"Model version: {bundle.version} ({bundle.family})")
     print("Files saved:")
-    print("- models/soil_fertility_model.pkl")
-    print("- models/soil_fertility_scaler.pkl")
-    print("- models/feature_names.pkl")
+    print("- models/soil_fertility_model.npz")
+    print(f"- {registry.path_for(bundle.version)} (active)")
     
     return rf_model, scaler, feature_columns
 
+def compare_model_families(rf_compiled, rf_seconds, families, accuracy_target, class_names,
+                           X_train, X_test, y_train, y_test, rf_metadata):
+    """
+    Train the other families, print a comparison and pick the model to serve
+    """
+    from ml_model.model_families import evaluate_family, select_family
+    
+    print("\nComparing model families...")
+    rf_result = evaluate_family('random_forest', X_train, y_train, X_test, y_test, class_names,
+                                params=rf_metadata['params'], model=rf_compiled)
+    rf_result['train_seconds'] = rf_seconds
+    results = [rf_result] + [
+        evaluate_family(family, X_train, y_train, X_test, y_test, class_names)
+        for family in families if family != 'random_forest'
+    ]
+    
+    print(f"{'family':<18} {'accuracy':>8} {'train s':>8} {'latency us':>10} {'rows/s':>10} {'KiB':>8}")
+    for result in results:
+        print(f"{result['family']:<18} {result['accuracy']:>8.4f} {result['train_seconds']:>8.2f} "
+              f"{result['latency_us']:>10.0f} {result['batch_rows_per_second']:>10.0f} "
+              f"{result['serialized_bytes'] / 1024:>8.0f}")
+    
+    chosen = select_family(results, accuracy_target)
+    if accuracy_target is not None and chosen['accuracy'] < accuracy_target:
+        print(f"No family reaches {accuracy_target:.4f} accuracy; using the most accurate")
+    print(f"Selected model family: {chosen['family']}")
+    
+    metadata = {
+        'accuracy': chosen['accuracy'],
+        'dataset': rf_metadata['dataset'],
+        'params': chosen['params'],
+        'accuracy_target': accuracy_target,
+        'family_comparison': [
+            {key: value for key, value in result.items() if key != 'model'} for result in results
+        ]
+    }
+    return chosen['model'], metadata
+
 if __name__ == "__main__":
-    model, scaler, features = train_soil_fertility_model()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Train the soil fertility model')
+    parser.add_argument('--dataset', default=DEFAULT_DATASET_PATH)
+    parser.add_argument('--samples', type=int, default=5000, help='Synthetic rows to materialize if needed')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--families', nargs='+', metavar='FAMILY',
+                        choices=['random_forest', 'gradient_boosting', 'linear', 'decision_tree'],
+                        help='Also train these model families and serve the fastest that meets --accuracy-target')
+    parser.add_argument('--accuracy-target', type=float, help='Held-out accuracy the served model must reach')
+    parser.add_argument('--compress-budget', type=float,
+                        help='Also compress the model within this held-out accuracy loss and publish it')
+    parser.add_argument('--distill', action='store_true', help='Let compression try distilled students')
+    args = parser.parse_args()
+
+    model, scaler, features = train_soil_fertility_model(args.dataset, args.samples, args.seed,
+                                                         families=args.families,
+                                                         accuracy_target=args.accuracy_target)
+
+    if args.compress_budget is not None:
+        from ml_model import compress
+
+        print("\nCompressing model...")
+        compress.main(['--dataset', args.dataset, '--samples', str(args.samples), '--seed', str(args.seed),
+                       '--budget', str(args.compress_budget), '--publish'] + (['--distill'] if args.distill else []))
\ No newline at end of file
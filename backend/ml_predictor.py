@@ -1,395 +1,412 @@
 import numpy as np
 import joblib
 import os
-import json
-import json
-from typing import Dict, Any
+from typing import Dict, Any, List
+from compiled_forest import compile_forest
+from model_bundle import load_bundle, fold_scaler, model_version_for
+import soil_rules
+from prediction_cache import PredictionCache, copy_result
+from inference_scheduler import MicroBatchScheduler
+from inference_pool import InferencePool
+from metrics import timed
+
+RULES_VERSION = 'rules'
+
+class LoadedModel:
+    """
+    Everything needed to serve one model version, swapped in as a unit
+
+    Requests read the predictor's active snapshot once and use it throughout,
+    so a reload never mixes one model's scaler or feature order with another.
+    """
+
+    def __init__(self, model=None, scaler=None, feature_names=None, version=None, source=None, family=None):
+        self.model = model
+        self.scaler = scaler
+        self.feature_names = list(feature_names or soil_rules.FEATURES)
+        self.version = version or RULES_VERSION
+        self.source = source
+        self.family = family or (RULES_VERSION if model is None else type(model).__name__)
+        self.key_factors = self._key_factors_reason()
+
+        # Column order for the model, or None when it matches the rule table
+        if self.feature_names == soil_rules.FEATURES:
+            self.columns = None
+        else:
+            self.columns = [soil_rules.FEATURES.index(name) for name in self.feature_names]
+
+    def inputs(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Reorder raw features (rule table order) for the model and apply scaling
+        """
+        features = raw
+        if self.columns is not None:
+            features = raw[:, self.columns]
+
+        # Apply scaling if scaler is available
+        if self.scaler:
+            features = self.scaler.transform(features)
+
+        return features
+
+    def predict_proba(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities for every row of a raw feature matrix
+        """
+        return self.model.predict_proba(self.inputs(raw))
+
+    def _key_factors_reason(self):
+        """
+        Explanation naming the three most important features, computed once per model
+        """
+        if not hasattr(self.model, 'feature_importances_'):
+            return None
+
+        feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
+        top_features = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:3]
+
+        return f'Key factors: {", ".join([f.replace("_", " ") for f, _ in top_features])}'
+
+def read_model(model_path: str) -> LoadedModel:
+    """
+    Load a trained model bundle (.npz) or legacy joblib pickles into a snapshot
+    """
+    if model_path.endswith('.pkl'):
+        return _read_legacy_model(model_path)
+
+    # Arrays are memory-mapped, so worker processes share pages; the
+    # bundle's model family decides which evaluator reads them
+    bundle = load_bundle(model_path)
+    return LoadedModel(
+        bundle.model, None,  # Scaler is folded into the split thresholds
+        bundle.feature_names or None, bundle.version, model_path, bundle.family
+    )
+
+def _read_legacy_model(model_path: str) -> LoadedModel:
+    """
+    Load separate model / scaler / feature name pickles from older training runs
+    """
+    model = joblib.load(model_path)
+
+    # Load scaler if available
+    scaler = None
+    model_dir = os.path.dirname(model_path)
+    for scaler_path in (model_path.replace('.pkl', '_scaler.pkl'),
+                        os.path.join(model_dir, 'soil_fertility_scaler.pkl')):
+        if os.path.exists(scaler_path):
+            scaler = joblib.load(scaler_path)
+            break
+
+    # Load feature names if available
+    feature_names = None
+    feature_path = os.path.join(model_dir, 'feature_names.pkl')
+    if os.path.exists(feature_path):
+        feature_names = joblib.load(feature_path)
+
+    if hasattr(model, 'estimators_') or hasattr(model, 'tree_'):
+        # Compile tree models and fold the scaler, as the bundle export does
+        forest = compile_forest(model)
+        if scaler is not None:
+            forest = fold_scaler(forest, scaler)
+        return LoadedModel(forest, None, feature_names, model_version_for(forest), model_path,
+                           'random_forest' if hasattr(model, 'estimators_') else 'decision_tree')
+
+    return LoadedModel(model, scaler, feature_names, os.path.basename(model_path), model_path)
 
 class SoilFertilityPredictor:
     """
     Machine Learning predictor for soil fertility analysis
     """
-    
-    def __init__(self, model_path=None):
-        self.model = None
-        self.scaler = None
-        self.feature_names = None
-        self.feature_names = None
-        self.feature_names = [
-            'nitrogen', 'phosphorus', 'potassium', 'ph', 
-            'organic_matter', 'moisture', 'temperature'
-        ]
-        
-        # Try to load trained model
-        model_path = model_path or 'models/soil_fertility_model.pkl'
-        if os.path.exists(model_path):
-        model_path = model_path or 'models/soil_fertility_model.pkl'
+
+    def __init__(self, model_path=None, cache_size=4096):
+        # Rule-based until a model is loaded
+        self._active = LoadedModel()
+
+        # Precompute rule outputs for every feature band combination
+        self.rules = soil_rules.RuleLookup()
+
+        # Results for repeated (quantized) readings; 0 disables caching
+        self.cache = PredictionCache(cache_size) if cache_size else None
+
+        # Optional micro-batching of concurrent requests (enable_micro_batching)
+        self.scheduler = None
+
+        # Optional out-of-process scoring (enable_worker_pool)
+        self.pool = None
+
+        # Try to load trained model, falling back to pre-bundle pickles
+        model_path = model_path or 'models/soil_fertility_model.npz'
+        legacy_path = os.path.splitext(model_path)[0] + '.pkl'
         if os.path.exists(model_path):
             self.load_model(model_path)
+        elif os.path.exists(legacy_path):
+            self.load_model(legacy_path)
         else:
             print("No trained model found. Using rule-based predictions.")
-        else:
-            print("No trained model found. Using rule-based predictions.")
-    
-    def load_model(self, model_path: str):
+
+    @property
+    def active(self) -> LoadedModel:
+        return self._active
+
+    @property
+    def model(self):
+        return self._active.model
+
+    @property
+    def scaler(self):
+        return self._active.scaler
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self._active.feature_names
+
+    @property
+    def model_version(self) -> str:
+        return self._active.version
+
+    @property
+    def model_family(self) -> str:
+        return self._active.family
+
+    @property
+    def key_factors(self):
+        return self._active.key_factors
+
+    def load_model(self, model_path: str) -> bool:
         """
-        Load trained ML model and scaler
+        Load a trained model bundle (.npz) or legacy joblib pickles
+
+        The new model is built completely before it replaces the active one,
+        so in-flight requests finish on the old model and a failed load keeps
+        serving it.
         """
         try:
-            # Load your trained model
-            self.model = joblib.load(model_path)
-            
-            # Load scaler if available
-            scaler_path = model_path.replace('.pkl', '_scaler.pkl')
-            if os.path.exists(scaler_path):
-                self.scaler = joblib.load(scaler_path)
-            
-            # Load feature names if available
-            feature_path = os.path.join(os.path.dirname(model_path), 'feature_names.pkl')
-            if os.path.exists(feature_path):
-                self.feature_names = joblib.load(feature_path)
-            
-            # Load feature names if available
-            feature_path = os.path.join(os.path.dirname(model_path), 'feature_names.pkl')
-            if os.path.exists(feature_path):
-                self.feature_names = joblib.load(feature_path)
-                
-            print(f"Model loaded successfully from {model_path}")
-            print(f"Model type: {type(self.model).__name__}")
-            if hasattr(self.model, 'n_estimators'):
-                print(f"Number of estimators: {self.model.n_estimators}")
-            print(f"Model type: {type(self.model).__name__}")
-            if hasattr(self.model, 'n_estimators'):
-                print(f"Number of estimators: {self.model.n_estimators}")
+            loaded = read_model(model_path)
         except Exception as e:
             print(f"Error loading model: {e}")
-            self.model = None
-    
+            return False
+
+        self.activate(loaded)
+
+        print(f"Model loaded successfully from {model_path}")
+        print(f"Model type: {type(loaded.model).__name__}")
+        print(f"Model family: {loaded.family}")
+        if hasattr(loaded.model, 'n_estimators'):
+            print(f"Number of estimators: {loaded.model.n_estimators}")
+        return True
+
+    def activate(self, loaded: LoadedModel):
+        """
+        Atomically make ``loaded`` the model used for new requests
+        """
+        self._active = loaded
+
+        # Cache keys carry the model version, so entries from the previous
+        # model can never be served again; drop them to free the space
+        if self.cache is not None:
+            self.cache.clear()
+
     def preprocess_features(self, soil_data: Dict[str, float]) -> np.ndarray:
         """
         Preprocess soil data for ML model input
         """
-        # Extract features in the correct order
-        features = np.array([[
-            soil_data['nitrogen'],
-            soil_data['phosphorus'],
-            soil_data['potassium'],
-            soil_data['ph'],
-            soil_data['organic_matter'],
-            soil_data['moisture'],
-            soil_data['temperature']
-        ]])
-        
-        # Apply scaling if scaler is available
-        if self.scaler:
-            features = self.scaler.transform(features)
-        
-        return features
-    
+        return self.preprocess_batch([soil_data])
+
+    def preprocess_batch(self, samples: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Preprocess many soil samples into a single N x 7 feature matrix
+        """
+        return self._active.inputs(soil_rules.feature_matrix(samples))
+
     def predict_fertility(self, soil_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Predict soil fertility using ML model or fallback to rule-based logic
         """
-        if self.model:
-            return self._ml_prediction(soil_data)
+        return self.predict_fertility_batch([soil_data])[0]
+
+    def predict_fertility_batch(self, samples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Predict soil fertility for many samples with a single model call
+        """
+        if not samples:
+            return []
+
+        # Every sample in the request is scored by the same model version
+        loaded = self._active
+
+        with timed('preprocess_features'):
+            raw = soil_rules.feature_matrix(samples)
+        if self.cache is None:
+            return self._score_rows(raw, loaded)
+
+        with timed('cache_lookup'):
+            # Rows are always scored on their raw values. Only readings already
+            # on the instrument grid share a key with other requests; finer
+            # ones could fall either side of a threshold, so they bypass the cache
+            quantized = self.cache.quantize(raw)
+            cacheable = (quantized == raw).all(axis=1)
+            keys = self.cache.keys(quantized, loaded.version)
+            results = [self.cache.get(key) if ok else None for key, ok in zip(keys, cacheable)]
+
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            for index, result in zip(missing, self._score_rows(raw[missing], loaded)):
+                # A rules fallback after a transient model error is not this version's answer
+                if cacheable[index] and result['model_version'] == loaded.version:
+                    self.cache.put(keys[index], result)
+                results[index] = result
+
+        return [copy_result(result) for result in results]
+
+    def enable_micro_batching(self, max_wait_ms: float = 2.0, max_batch_size: int = 64, **options):
+        """
+        Coalesce concurrent small requests into shared model calls
+        """
+        self.disable_micro_batching()
+        self.scheduler = MicroBatchScheduler(
+            self._predict_matrix, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, **options
+        )
+
+    def disable_micro_batching(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+
+    def enable_worker_pool(self, n_workers: int = None, slot_rows: int = 256, **options):
+        """
+        Score in persistent worker processes instead of request threads
+        """
+        self.disable_worker_pool()
+        self.pool = InferencePool(read_model, n_workers=n_workers, slot_rows=slot_rows, **options)
+
+    def disable_worker_pool(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def _score_rows(self, raw: np.ndarray, loaded: LoadedModel) -> List[Dict[str, Any]]:
+        """
+        Predict uncached rows, through the micro-batcher when it is enabled
+        """
+        # Requests that already fill a batch gain nothing from waiting
+        if self.scheduler is not None and loaded.model and len(raw) < self.scheduler.max_batch_size:
+            return self.scheduler.submit(raw, loaded)
+        return self._predict_matrix(raw, loaded)
+
+    def _predict_matrix(self, raw: np.ndarray, loaded: LoadedModel) -> List[Dict[str, Any]]:
+        """
+        Predict every row of a raw feature matrix, falling back to the rules
+        """
+        if loaded.model:
+            try:
+                return self._ml_predictions(raw, loaded)
+            except Exception as e:
+                print(f"ML prediction error: {e}")
+
+        # Fallback to rule-based prediction
+        with timed('rules'):
+            results = self.rules.rule_based_results(raw)
+        for result in results:
+            result['model_version'] = RULES_VERSION
+        return results
+
+    def _ml_predictions(self, raw: np.ndarray, loaded: LoadedModel) -> List[Dict[str, Any]]:
+        """
+        Score a batch of samples with one predict_proba call over the N x 7 matrix
+        """
+        model = loaded.model
+
+        if hasattr(model, 'predict_proba'):
+            # The predicted class is the argmax of the class probabilities,
+            # so a single predict_proba call replaces predict + predict_proba
+            with timed('predict_proba'):
+                probabilities = self._class_probabilities(raw, loaded)
+            best = probabilities.argmax(axis=1)
+            predictions = np.asarray(model.classes_)[best]
+            confidences = probabilities[np.arange(len(raw)), best]
         else:
-            return self._rule_based_prediction(soil_data)
-    
-    def _ml_prediction(self, soil_data: Dict[str, Any]) -> Dict[str, Any]:
+            with timed('predict'):
+                predictions = model.predict(loaded.inputs(raw))
+            confidences = np.full(len(raw), 0.85)  # Default confidence
+
+        with timed('explanations'):
+            # Explanations and recommendations only depend on the band combination
+            full_codes, scored_codes = self.rules.codes(raw)
+            confidence_words = soil_rules.confidence_levels(confidences)
+
+            return [
+                self._build_ml_result(loaded, full_code, scored_code, prediction, float(confidence), word)
+                for full_code, scored_code, prediction, confidence, word in zip(
+                    full_codes.tolist(), scored_codes.tolist(), predictions, confidences, confidence_words
+                )
+            ]
+
+    def _class_probabilities(self, raw: np.ndarray, loaded: LoadedModel) -> np.ndarray:
         """
-        Make prediction using trained ML model
+        Class probabilities from the worker pool when enabled, else in-process
         """
-        try:
-            # Preprocess features
-            features = self.preprocess_features(soil_data)
-            
-            # Make prediction
-            prediction = self.model.predict(features)[0]
-            
-            # Get prediction probabilities if available
-            confidence = 0.85  # Default confidence
-            confidence = 0.85  # Default confidence
-            if hasattr(self.model, 'predict_proba'):
-                probabilities = self.model.predict_proba(features)[0]
-                confidence = max(probabilities)
-                
-                # Get class probabilities for detailed analysis
-                classes = self.model.classes_
-                prob_dict = dict(zip(classes, probabilities))
-                classes = self.model.classes_
-                prob_dict = dict(zip(classes, probabilities))
-            
-            # The prediction is already a fertility level from our trained model
-            fertility_level = str(prediction)
-            
-            # The prediction is already a fertility level from our trained model
+        if self.pool is not None and loaded.source:
+            try:
+                return self.pool.predict_proba(raw, loaded.source, loaded.version)
+            except Exception as e:
+                print(f"Inference pool error: {e}")
+        return loaded.predict_proba(raw)
+
+    def _build_ml_result(self, loaded: LoadedModel, full_code: int, scored_code: int, prediction,
+                         confidence: float, confidence_word: int) -> Dict[str, Any]:
+        """
+        Turn a raw model output into the API response for one sample
+        """
+        # Calculate score based on confidence and fertility level
+        if isinstance(prediction, (int, float, np.integer, np.floating)):
+            # If model returns numeric score
+            if prediction > 0.8:
+                fertility_level = 'High'
+            elif prediction > 0.6:
+                fertility_level = 'Medium'
+            else:
+                fertility_level = 'Low'
+            score = int(prediction * 100)
+        else:
+            # If prediction is categorical (our case)
             fertility_level = str(prediction)
-            
-            # Calculate score based on confidence and fertility level
-            if isinstance(prediction, (int, float)):
-                # If model returns numeric score
-                # If model returns numeric score
-                if prediction > 0.8:
-                    fertility_level = 'High'
-                    score = int(prediction * 100)
-                elif prediction > 0.6:
-                    fertility_level = 'Medium'
-                    score = int(prediction * 100)
-                else:
-                    fertility_level = 'Low'
-                    score = int(prediction * 100)
+            if fertility_level == 'High':
+                score = int(75 + confidence * 25)  # 75-100
+            elif fertility_level == 'Medium':
+                score = int(50 + confidence * 25)  # 50-75
             else:
-                # If prediction is categorical (our case)
-                fertility_level = str(prediction)
-                if fertility_level == 'High':
-                    score = int(75 + confidence * 25)  # 75-100
-                elif fertility_level == 'Medium':
-                    score = int(50 + confidence * 25)  # 50-75
-                else:
-                    score = int(confidence * 50)       # 0-50
-                    score = int(75 + confidence * 25)  # 75-100
-                elif fertility_level == 'Medium':
-                    score = int(50 + confidence * 25)  # 50-75
-                else:
-                    score = int(confidence * 50)       # 0-50
-            
-            # Generate explanations based on ML prediction
-            reasons = self._generate_ml_explanations(soil_data, fertility_level, confidence)
-            recommendations = self._generate_recommendations(soil_data, fertility_level)
-            
-            return {
-                'fertility_level': fertility_level,
-                'score': score,
-                'confidence': confidence,
-                'reasons': reasons,
-                'recommendations': recommendations
-            }
-            
-        except Exception as e:
-            print(f"ML prediction error: {e}")
-            # Fallback to rule-based prediction
-            return self._rule_based_prediction(soil_data)
-    
-    def _generate_ml_explanations(self, soil_data: Dict[str, Any], fertility_level: str, confidence: float = 0.85) -> list:
+                score = int(confidence * 50)       # 0-50
+
+        # Generate explanations based on ML prediction
+        reasons = self._generate_ml_explanations(
+            loaded, full_code, fertility_level, confidence, confidence_word
+        )
+        recommendations = self.rules.recommendations_for(scored_code, fertility_level)
+
+        return {
+            'fertility_level': fertility_level,
+            'score': score,
+            'confidence': confidence,
+            'reasons': reasons,
+            'recommendations': recommendations,
+            'model_version': loaded.version
+        }
+
+    def _generate_ml_explanations(self, loaded: LoadedModel, full_code: int, fertility_level: str,
+                                  confidence: float, confidence_word: int) -> list:
         """
         Generate explanations based on ML model insights and feature importance
         """
-        reasons = []
-        
         # Add confidence-based explanation
-        if confidence > 0.9:
-            reasons.append(f'ML model predicts {fertility_level.lower()} fertility with very high confidence ({confidence:.1%})')
-        elif confidence > 0.8:
-            reasons.append(f'ML model predicts {fertility_level.lower()} fertility with high confidence ({confidence:.1%})')
-        else:
-            reasons.append(f'ML model predicts {fertility_level.lower()} fertility with moderate confidence ({confidence:.1%})')
-        
-        # Feature importance analysis (if available)
-        if hasattr(self.model, 'feature_importances_'):
-            feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
-            top_features = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:3]
-            
-            reasons.append(f'Key factors: {", ".join([f.replace("_", " ") for f, _ in top_features])}')
-        
-        # Analyze each parameter and provide insights based on soil science
-        if soil_data['nitrogen'] < 20:
-            reasons.append('Nitrogen deficiency detected - critical for plant growth and leaf development')
-        elif soil_data['nitrogen'] > 50:
-            reasons.append('Excellent nitrogen levels support vigorous plant growth')
-        else:
-        # Add confidence-based explanation
-        if confidence > 0.9:
-            reasons.append(f'ML model predicts {fertility_level.lower()} fertility with very high confidence ({confidence:.1%})')
-        elif confidence > 0.8:
-            reasons.append(f'ML model predicts {fertility_level.lower()} fertility with high confidence ({confidence:.1%})')
-        else:
-            reasons.append(f'ML model predicts {fertility_level.lower()} fertility with moderate confidence ({confidence:.1%})')
-        
+        word = soil_rules.CONFIDENCE_WORDS[confidence_word]
+        reasons = [f'ML model predicts {fertility_level.lower()} fertility with {word} confidence '
+                   f'({soil_rules.format_confidence(confidence)})']
+
         # Feature importance analysis (if available)
-        if hasattr(self.model, 'feature_importances_'):
-            feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
-            top_features = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:3]
-            
-            reasons.append(f'Key factors: {", ".join([f.replace("_", " ") for f, _ in top_features])}')
-        
+        if loaded.key_factors:
+            reasons.append(loaded.key_factors)
+
         # Analyze each parameter and provide insights based on soil science
-        
-            reasons.append('Nitrogen deficiency detected - critical for plant growth and leaf development')
-            reasons.append('Low phosphorus may limit root development and flowering')
-            reasons.append('Excellent nitrogen levels support vigorous plant growth')
-        else:
-            reasons.append('Nitrogen levels are adequate for most crops')
-            reasons.append('Optimal phosphorus levels promote strong root systems')
-        else:
-            reasons.append('Low phosphorus may limit root development and flowering')
-        
-            reasons.append('Optimal phosphorus levels promote strong root systems')
-        else:
-            reasons.append('Phosphorus levels support normal plant development')
-            reasons.append('Potassium deficiency may reduce disease resistance and stress tolerance')
-        elif soil_data['potassium'] > 200:
-            reasons.append('Potassium deficiency may reduce disease resistance and stress tolerance')
-        else:
-            reasons.append('Excellent potassium levels enhance plant resilience')
-        else:
-            reasons.append('Potassium levels are sufficient for plant health')
-        
-        if soil_data['ph'] < 6.0 or soil_data['ph'] > 8.0:
-            reasons.append('pH levels outside optimal range may limit nutrient uptake')
-        else:
-            reasons.append('pH levels are ideal for maximum nutrient availability')
-        
-        if soil_data['organic_matter'] < 2:
-            reasons.append('Low organic matter limits soil structure and water retention')
-        elif soil_data['organic_matter'] > 4:
-            reasons.append('Rich organic matter content enhances soil biology')
-        else:
-            reasons.append('Organic matter levels support healthy soil ecosystem')
-        
-        # Environmental factors
-        if soil_data['moisture'] < 30 or soil_data['moisture'] > 80:
-            reasons.append('pH levels outside optimal range may limit nutrient uptake')
-        else:
-            reasons.append('pH levels are ideal for maximum nutrient availability')
-        
-        if soil_data['temperature'] < 15 or soil_data['temperature'] > 30:
-            reasons.append('Low organic matter limits soil structure and water retention')
-        else:
-            reasons.append('Rich organic matter content enhances soil biology')
-        else:
-            reasons.append('Organic matter levels support healthy soil ecosystem')
-        
-        # Environmental factors
-        if soil_data['moisture'] < 30 or soil_data['moisture'] > 80:
-            reasons.append('Moisture levels may stress plants - optimal range is 30-70%')
-        else:
-            reasons.append('Soil moisture is within ideal range for plant growth')
-        
-        if soil_data['temperature'] < 15 or soil_data['temperature'] > 30:
-            reasons.append('Soil temperature outside optimal range may slow nutrient uptake')
-        else:
-            reasons.append('Soil temperature supports active root growth and nutrient absorption')
-        
+        reasons.extend(self.rules.ml_reasons[full_code])
+
         return reasons
-    
-    def _generate_recommendations(self, soil_data: Dict[str, Any], fertility_level: str) -> Dict[str, list]:
-        """
-        Generate fertilizer and crop recommendations
-        """
-        fertilizers = []
-        crops = []
-        improvements = []
-        
-        # Fertilizer recommendations based on deficiencies
-        if soil_data['nitrogen'] < 20:
-            fertilizers.extend(['Urea (46-0-0)', 'Ammonium Sulfate (21-0-0)'])
-            improvements.append('Apply nitrogen-rich fertilizers during growing season')
-        
-        if soil_data['phosphorus'] < 15:
-            fertilizers.extend(['Triple Superphosphate (0-46-0)', 'Bone Meal (4-12-0)'])
-            improvements.append('Increase phosphorus for better root development')
-        
-        if soil_data['potassium'] < 100:
-            fertilizers.extend(['Muriate of Potash (0-0-60)', 'Potassium Sulfate (0-0-50)'])
-            improvements.append('Apply potassium fertilizers for stress tolerance')
-        
-        if soil_data['ph'] < 6.0:
-            fertilizers.append('Dolomitic Lime')
-            improvements.append('Apply lime to increase pH')
-        elif soil_data['ph'] > 8.0:
-            fertilizers.append('Elemental Sulfur')
-            improvements.append('Apply sulfur to decrease pH')
-        
-        if soil_data['organic_matter'] < 2:
-            fertilizers.extend(['Compost', 'Well-aged Manure'])
-            improvements.append('Add organic matter to improve soil structure')
-        
-        # Crop recommendations based on fertility level
-        if fertility_level == 'High':
-            crops.extend(['Corn', 'Soybeans', 'Wheat', 'Tomatoes', 'Peppers', 'Cucumbers'])
-        elif fertility_level == 'Medium':
-            crops.extend(['Beans', 'Carrots', 'Lettuce', 'Spinach', 'Radishes', 'Onions'])
-        else:
-            crops.extend(['Clover', 'Alfalfa', 'Buckwheat', 'Rye Grass', 'Cover Crops'])
-        
-        return {
-            'fertilizers': list(set(fertilizers)),
-            'crops': crops,
-            'improvements': improvements
-        }
-    
-    def _rule_based_prediction(self, soil_data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Fallback rule-based prediction when ML model is not available
-        """
-        score = 0
-        reasons = []
-        
-        # Nitrogen analysis
-        if soil_data['nitrogen'] < 20:
-            reasons.append('Low nitrogen levels detected - affects plant growth')
-            score += 10
-        elif soil_data['nitrogen'] > 50:
-            reasons.append('Optimal nitrogen levels support healthy growth')
-            score += 30
-        else:
-            reasons.append('Moderate nitrogen levels - adequate for most crops')
-            score += 20
-        
-        # Phosphorus analysis
-        if soil_data['phosphorus'] < 15:
-            reasons.append('Phosphorus deficiency limits root development')
-            score += 10
-        elif soil_data['phosphorus'] > 30:
-            reasons.append('Good phosphorus availability')
-            score += 25
-        else:
-            reasons.append('Adequate phosphorus levels')
-            score += 20
-        
-        # Potassium analysis
-        if soil_data['potassium'] < 100:
-            reasons.append('Low potassium affects disease resistance')
-            score += 10
-        elif soil_data['potassium'] > 200:
-            reasons.append('Excellent potassium levels')
-            score += 25
-        else:
-            reasons.append('Moderate potassium availability')
-            score += 20
-        
-        # pH analysis
-        if soil_data['ph'] < 6.0 or soil_data['ph'] > 8.0:
-            reasons.append('pH outside optimal range affects nutrients')
-            score += 5
-        else:
-            reasons.append('pH within optimal range')
-            score += 20
-        
-        # Organic matter analysis
-        if soil_data['organic_matter'] < 2:
-            reasons.append('Low organic matter reduces soil health')
-            score += 5
-        elif soil_data['organic_matter'] > 4:
-            reasons.append('Rich organic matter improves soil')
-            score += 20
-        else:
-            reasons.append('Adequate organic matter')
-            score += 15
-        
-        # Determine fertility level
-        if score > 80:
-            fertility_level = 'High'
-        elif score > 60:
-            fertility_level = 'Medium'
-        else:
-            fertility_level = 'Low'
-        
-        recommendations = self._generate_recommendations(soil_data, fertility_level)
-        
-        return {
-            'fertility_level': fertility_level,
-            'score': min(score, 100),
-            'reasons': reasons,
-            'recommendations': recommendations
-        }
\ No newline at end of file
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from compiled_forest import CompiledForest
+from compiled_linear import CompiledLinear
+
+# Bump when the set or meaning of arrays stored in a bundle changes
+# (2: model_family member; boosted forests and linear models)
+BUNDLE_FORMAT_VERSION = 2
+
+# Evaluator class that scores each model family
+MODEL_FAMILIES = {
+    'random_forest': CompiledForest,
+    'decision_tree': CompiledForest,
+    'gradient_boosting': CompiledForest,
+    'linear': CompiledLinear
+}
+
+# Arrays smaller than this are read into memory instead of memory-mapped
+MMAP_MIN_BYTES = 4096
+
+class ModelBundle:
+    """
+    A servable model: compiled model, feature order and metadata in one file
+
+    Bundles are uncompressed ``.npz`` archives holding only plain arrays, so
+    they load without pickle and their members can be memory-mapped. The
+    ``model_family`` member selects the evaluator that reads the arrays.
+    """
+
+    def __init__(self, model, feature_names: List[str],
+                 metadata: Optional[Dict[str, Any]] = None, family: str = 'random_forest'):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.metadata = dict(metadata or {})
+        self.family = family
+
+    @property
+    def forest(self):
+        # Name used before bundles could hold other model families
+        return self.model
+
+    @property
+    def version(self) -> str:
+        return self.metadata.get('model_version', 'unversioned')
+
+def model_family_for(model) -> str:
+    """
+    Family name for a compiled model, from its structure
+    """
+    if isinstance(model, CompiledLinear):
+        return 'linear'
+    if model.link == 'softmax':
+        return 'gradient_boosting'
+    return 'decision_tree' if model.n_estimators == 1 else 'random_forest'
+
+def fold_scaler(forest: CompiledForest, scaler: Any) -> CompiledForest:
+    """
+    Map an affine StandardScaler onto the split thresholds of a forest
+
+    A split ``(x - mean) / scale <= t`` is the same test as
+    ``x <= t * scale + mean`` for positive ``scale``, so the folded forest
+    scores raw feature values directly.
+    """
+    n_features = scaler.n_features_in_
+    # mean_ / scale_ are None when the scaler was built without centering or scaling
+    mean = np.zeros(n_features) if scaler.mean_ is None else np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.ones(n_features) if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64)
+
+    arrays = forest.to_arrays()
+    is_leaf = forest.left == np.arange(forest.n_nodes)
+    arrays['threshold'] = np.where(
+        is_leaf, forest.threshold,
+        forest.threshold * scale[forest.feature] + mean[forest.feature]
+    )
+    # Thresholds now live in raw feature space; compare in full precision
+    arrays['input_dtype'] = np.array('float64')
+    return CompiledForest.from_arrays(arrays)
+
+def model_version_for(model) -> str:
+    """
+    Content-derived version id, stable for identical exported models
+    """
+    digest = hashlib.sha256()
+    if isinstance(model, CompiledForest):
+        parts = [model.feature, model.threshold, model.children, model.value]
+        if model.base_score is not None:
+            parts.append(model.base_score)
+        if model.missing_right is not None:
+            parts.append(model.missing_left)
+    else:
+        parts = [array for _, array in sorted(model.to_arrays().items())]
+    for part in parts:
+        digest.update(np.ascontiguousarray(part).tobytes())
+    return digest.hexdigest()[:12]
+
+def save_bundle(path: str, model, feature_names: List[str],
+                scaler: Any = None, metadata: Optional[Dict[str, Any]] = None,
+                family: Optional[str] = None) -> ModelBundle:
+    """
+    Write a model bundle, folding ``scaler`` into a forest if one is given
+    """
+    family = family or model_family_for(model)
+    if not isinstance(model, MODEL_FAMILIES[family]):
+        raise ValueError(f'{type(model).__name__} cannot be saved as a {family} model')
+    if scaler is not None:
+        if not isinstance(model, CompiledForest):
+            raise ValueError('Only forests can fold a scaler')
+        model = fold_scaler(model, scaler)
+
+    metadata = dict(metadata or {})
+    metadata.setdefault('model_version', model_version_for(model))
+    metadata.setdefault('created_at', datetime.utcnow().isoformat())
+    metadata['scaler_folded'] = scaler is not None or metadata.get('scaler_folded', False)
+    metadata['model_family'] = family
+
+    arrays = model.to_arrays()
+    arrays['model_family'] = np.array(family)
+    arrays['feature_names'] = np.array(list(feature_names), dtype=str)
+    arrays['format_version'] = np.array(BUNDLE_FORMAT_VERSION)
+    arrays['metadata'] = np.array(json.dumps(metadata))
+
+    # np.savez stores members uncompressed, which is what makes them mappable.
+    # A running predictor may have the old file mapped, so never rewrite it in
+    # place: write a sibling and rename it over the top
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return ModelBundle(model, feature_names, metadata, family)
+
+def load_bundle(path: str, mmap: bool = True) -> ModelBundle:
+    """
+    Load a model bundle, memory-mapping its arrays when ``mmap`` is set
+    """
+    arrays = _read_npz(path, mmap)
+
+    format_version = int(arrays['format_version']) if 'format_version' in arrays else 0
+    if format_version > BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f'Model bundle format {format_version} is newer than supported ({BUNDLE_FORMAT_VERSION})'
+        )
+
+    # Bundles from before model families always hold a random forest
+    family = str(arrays['model_family']) if 'model_family' in arrays else 'random_forest'
+    if family not in MODEL_FAMILIES:
+        raise ValueError(f'Unknown model family: {family}')
+
+    metadata = json.loads(str(arrays['metadata'])) if 'metadata' in arrays else {}
+    model = MODEL_FAMILIES[family].from_arrays(arrays)
+    metadata.setdefault('model_version', model_version_for(model))
+    metadata.setdefault('model_family', family)
+
+    if 'feature_names' in arrays:
+        feature_names = [str(name) for name in arrays['feature_names']]
+    else:
+        feature_names = None
+
+    return ModelBundle(model, feature_names or [], metadata, family)
+
+def _read_npz(path: str, mmap: bool) -> Dict[str, np.ndarray]:
+    """
+    Read every member of an .npz archive, mapping large stored members
+
+    ``np.load`` ignores ``mmap_mode`` for .npz files, so locate each member's
+    .npy payload inside the zip and map it directly.
+    """
+    if not mmap:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info), allow_pickle=False)
+                continue
+
+            # Local file header: 30 fixed bytes, then file name and extra field
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f'Bundle member {name} holds Python objects')
+
+            nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            if nbytes < MMAP_MIN_BYTES:
+                data = np.frombuffer(f.read(nbytes), dtype=dtype)
+                arrays[name] = data.reshape(shape, order='F' if fortran_order else 'C')
+            else:
+                arrays[name] = np.memmap(
+                    path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                    order='F' if fortran_order else 'C'
+                )
+
+    return arrays
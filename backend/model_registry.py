@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, List, Optional
+
+from model_bundle import load_bundle
+
+# Name of the file holding the active version id inside a registry directory
+ACTIVE_POINTER = 'ACTIVE'
+
+class ModelRegistry:
+    """
+    Directory of versioned model bundles with an ``ACTIVE`` pointer file
+
+    Bundles are stored as ``<version>.npz`` and never modified once
+    published. Every write goes to a temporary file that is renamed into
+    place, so readers only ever see a complete bundle or pointer.
+    """
+
+    def __init__(self, root: str = 'models/registry'):
+        self.root = root
+
+    def path_for(self, version: str) -> str:
+        return os.path.join(self.root, f'{version}.npz')
+
+    def versions(self) -> List[str]:
+        """
+        Published versions, oldest first
+        """
+        if not os.path.isdir(self.root):
+            return []
+        bundles = [name for name in os.listdir(self.root) if name.endswith('.npz')]
+        bundles.sort(key=lambda name: os.path.getmtime(os.path.join(self.root, name)))
+        return [name[:-4] for name in bundles]
+
+    def active_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, ACTIVE_POINTER)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def active_path(self) -> Optional[str]:
+        version = self.active_version()
+        return self.path_for(version) if version else None
+
+    def publish(self, bundle_path: str, activate: bool = True) -> str:
+        """
+        Copy a bundle into the registry under its model version
+        """
+        version = load_bundle(bundle_path, mmap=False).version
+        target = self.path_for(version)
+        if not os.path.exists(target):
+            os.makedirs(self.root, exist_ok=True)
+            with open(bundle_path, 'rb') as src:
+                self._write_atomic(target, lambda dst: shutil.copyfileobj(src, dst))
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str):
+        """
+        Point the registry at an already published version
+        """
+        if not os.path.exists(self.path_for(version)):
+            raise ValueError(f'Unknown model version: {version}')
+        self._write_atomic(os.path.join(self.root, ACTIVE_POINTER),
+                           lambda f: f.write(f'{version}\n'.encode()))
+
+    def _write_atomic(self, path: str, write: Callable):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+class RegistryWatcher:
+    """
+    Poll a registry's ``ACTIVE`` pointer and reload the predictor when it moves
+
+    Loading happens on the watcher thread; requests keep using the current
+    model until the new one is fully built and swapped in.
+    """
+
+    def __init__(self, registry: ModelRegistry, predictor, interval: float = 5.0):
+        self.registry = registry
+        self.predictor = predictor
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-registry-watcher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=1.0)
+
+    def check(self) -> bool:
+        """
+        Reload if the active version differs from the predictor's; True on a swap
+        """
+        version = self.registry.active_version()
+        if not version or version == self.predictor.model_version:
+            return False
+        return self.predictor.load_model(self.registry.path_for(version))
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Model registry watch error: {e}")
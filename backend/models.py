@@ -3,6 +3,38 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+def create_missing_columns():
+    """
+    Add nullable columns declared on models to tables that already exist
+
+    Like indexes, columns added to a model after its table was created are
+    skipped by ``db.create_all``; only nullable ones can be added in place.
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(db.text(
+                    f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                ))
+
+def create_missing_indexes():
+    """
+    Add indexes declared on models to tables that already exist
+
+    ``db.create_all`` skips existing tables, so databases created before an
+    index was declared would otherwise never get it.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -15,6 +47,7 @@ class User(db.Model):
     # Relationships
     soil_analyses = db.relationship('SoilAnalysis', backref='user', lazy=True, cascade='all, delete-orphan')
     chat_messages = db.relationship('ChatMessage', backref='user', lazy=True, cascade='all, delete-orphan')
+    statistics = db.relationship('UserStatistics', uselist=False, lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -26,6 +59,12 @@ class User(db.Model):
 
 class SoilAnalysis(db.Model):
     __tablename__ = 'soil_analyses'
+    __table_args__ = (
+        # History pages seek this index: newest first per user, id breaks ties
+        db.Index('ix_soil_analyses_user_created', 'user_id', 'created_at', 'id'),
+        # Retraining reads lab results in the order they were recorded
+        db.Index('ix_soil_analyses_lab_confirmed', 'lab_confirmed_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -43,13 +82,41 @@ class SoilAnalysis(db.Model):
     # Results
     fertility_level = db.Column(db.String(10), nullable=False)
     score = db.Column(db.Integer, nullable=False)
-    reasons = db.Column(db.Text, nullable=False)  # JSON string
-    recommendations = db.Column(db.Text, nullable=False)  # JSON string
+    # Loaded together on first access, so listings that skip them never read them
+    reasons = db.deferred(db.Column(db.Text, nullable=False), group='details')  # JSON string, '' when reason_ids is set
+    recommendations = db.deferred(db.Column(db.Text, nullable=False), group='details')  # JSON string, '' when recommendation_ids is set
+    
+    # Packed phrase ids (see phrase_catalog.py); NULL on rows written as JSON
+    reason_ids = db.deferred(db.Column(db.LargeBinary, nullable=True), group='details')
+    # Model confidence, formatted back into the interned reason; NULL for rule-based results
+    confidence = db.deferred(db.Column(db.Float, nullable=True), group='details')
+    recommendation_ids = db.deferred(db.Column(db.LargeBinary, nullable=True), group='details')
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
+    # Lab-confirmed fertility level, the ground truth retraining learns from;
+    # NULL until a lab result is recorded (fertility_level is the model's own output)
+    lab_fertility_level = db.deferred(db.Column(db.String(10), nullable=True), group='lab')
+    lab_confirmed_at = db.deferred(db.Column(db.DateTime, nullable=True), group='lab')
+    
+    def to_dict(self, reasons=None, recommendations=None):
+        """
+        Serialized analysis; pass reasons and recommendations if already decoded
+        """
         import json
+        from phrase_catalog import decode_reasons, decode_recommendations
+        
+        if reasons is None:
+            if self.reason_ids is not None:
+                reasons = decode_reasons(self.reason_ids, self.confidence)
+            else:
+                reasons = json.loads(self.reasons) if self.reasons else []
+        if recommendations is None:
+            if self.recommendation_ids is not None:
+                recommendations = decode_recommendations(self.recommendation_ids)
+            else:
+                recommendations = json.loads(self.recommendations) if self.recommendations else {}
+        
         return {
             'id': self.id,
             'nitrogen': self.nitrogen,
@@ -62,13 +129,41 @@ class SoilAnalysis(db.Model):
             'location': self.location,
             'fertility_level': self.fertility_level,
             'score': self.score,
-            'reasons': json.loads(self.reasons) if self.reasons else [],
-            'recommendations': json.loads(self.recommendations) if self.recommendations else {},
+            'reasons': reasons,
+            'recommendations': recommendations,
             'created_at': self.created_at.isoformat()
         }
 
+class Phrase(db.Model):
+    """
+    Distinct reason and recommendation texts, referenced by id from soil_analyses
+    """
+    __tablename__ = 'phrases'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    text = db.Column(db.Text, unique=True, nullable=False)
+
+class UserStatistics(db.Model):
+    """
+    Running per-user analysis counts, kept in step with soil_analyses
+
+    Maintained only when USER_STATS_TABLE is enabled; see user_statistics.py.
+    """
+    __tablename__ = 'user_statistics'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    total_analyses = db.Column(db.Integer, nullable=False, default=0)
+    high_count = db.Column(db.Integer, nullable=False, default=0)
+    medium_count = db.Column(db.Integer, nullable=False, default=0)
+    low_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
+    __table_args__ = (
+        db.Index('ix_chat_messages_user_created', 'user_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
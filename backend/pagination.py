@@ -0,0 +1,134 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import request
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.orm import undefer
+
+# Upper bound on keyset page size, so every page stays a short index range scan
+MAX_PER_PAGE = 100
+
+class CursorError(ValueError):
+    """
+    A ``before`` cursor that is not ``<created_at>,<id>``
+    """
+
+class FieldsError(ValueError):
+    """
+    A ``fields`` list naming columns that cannot be projected
+    """
+
+def projectable_fields(model) -> List[str]:
+    """
+    Columns ``?fields=`` may select: every eagerly loaded column except the owner
+    """
+    return [
+        attribute.key for attribute in inspect(model).column_attrs
+        if not attribute.deferred and attribute.key != 'user_id'
+    ]
+
+def requested_fields(model) -> Optional[List[str]]:
+    """
+    The ``?fields=a,b`` projection, or None for full rows
+    """
+    value = request.args.get('fields')
+    if not value:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    allowed = projectable_fields(model)
+    unknown = [field for field in fields if field not in allowed]
+    if unknown or not fields:
+        raise FieldsError(f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return fields
+
+def project_row(row, fields: List[str]) -> Dict[str, Any]:
+    projected = {}
+    for field in fields:
+        value = getattr(row, field)
+        projected[field] = value.isoformat() if isinstance(value, datetime) else value
+    return projected
+
+def encode_cursor(row) -> str:
+    return f'{row.created_at.isoformat()},{row.id}'
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, row_id = cursor.rsplit(',', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except ValueError:
+        raise CursorError(f'Invalid cursor: {cursor!r}')
+
+def wants_total(default: bool) -> bool:
+    """
+    ``?total=0|1`` switches the total row count off or on
+    """
+    value = request.args.get('total')
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+def history_page(model, user_id, default_per_page: int) -> Dict[str, Any]:
+    """
+    One page of a user's rows of ``model``, newest first
+
+    With ``?before=<created_at>,<id>`` (empty for the first page) the page is
+    read by seeking the ``(user_id, created_at, id)`` index past the cursor,
+    so it costs the same however deep it is, and the total is only counted
+    with ``?total=1``. Otherwise ``?page=`` offset pagination is used as
+    before; its total can be skipped with ``?total=0``. Either way the
+    response carries ``next_before`` for fetching the following page.
+
+    ``?fields=a,b`` selects just those columns (see ``projectable_fields``)
+    with a column-only query, skipping ORM objects and ``to_dict``; without
+    it full rows are loaded, deferred columns included.
+
+    Returns the JSON body, with the serialized rows under ``history``.
+    """
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    fields = requested_fields(model)
+    query = model.query.filter_by(user_id=user_id)
+    newest_first = (model.created_at.desc(), model.id.desc())
+
+    if fields is None:
+        rows_query = query.options(undefer('*'))
+    else:
+        # The cursor needs created_at and id even when they are not returned
+        columns = dict.fromkeys(fields + ['created_at', 'id'])
+        rows_query = query.with_entities(*[getattr(model, column) for column in columns])
+
+    before = request.args.get('before')
+    if before is None:
+        page = request.args.get('page', 1, type=int)
+        include_total = wants_total(True)
+        rows = rows_query.order_by(*newest_first).paginate(
+            page=page,
+            per_page=per_page,
+            error_out=False,
+            count=include_total
+        )
+        result = {
+            'history': rows.items,
+            'has_more': rows.has_next if include_total else len(rows.items) == per_page,
+            'current_page': page
+        }
+        if include_total:
+            result.update({'total': rows.total, 'pages': rows.pages})
+    else:
+        per_page = min(max(per_page, 1), MAX_PER_PAGE)
+        keyset = rows_query
+        if before:
+            keyset = keyset.filter(tuple_(model.created_at, model.id) < decode_cursor(before))
+
+        # One extra row tells whether another page follows
+        items = keyset.order_by(*newest_first).limit(per_page + 1).all()
+        result = {'history': items[:per_page], 'has_more': len(items) > per_page}
+        if wants_total(False):
+            result['total'] = query.count()
+
+    last = result['history'][-1] if result['history'] else None
+    result['next_before'] = encode_cursor(last) if last is not None and result['has_more'] else None
+    if fields is None:
+        result['history'] = [row.to_dict() for row in result['history']]
+    else:
+        result['history'] = [project_row(row, fields) for row in result['history']]
+    return result
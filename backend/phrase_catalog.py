@@ -0,0 +1,167 @@
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from models import db, Phrase
+from soil_rules import format_confidence
+
+# Recommendation lists, in the order their lengths are packed
+RECOMMENDATION_KEYS = ('fertilizers', 'crops', 'improvements')
+
+# Stands in for the model confidence in interned reasons; analyses store the number
+CONFIDENCE_PLACEHOLDER = '{confidence}'
+
+# session.info key for phrases inserted by the session's open transaction
+PENDING_KEY = 'pending_phrases'
+
+class PhraseCatalog:
+    """
+    In-memory two-way map over the ``phrases`` table
+
+    Reasons and recommendations come from a small vocabulary, so analyses
+    store packed phrase ids instead of JSON text. New phrases are inserted
+    in the writer's transaction and only enter the shared map once it
+    commits, so a rolled-back insert never leaves ids the table lacks.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._texts: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def load_ids(self, ids: Iterable[int]):
+        """
+        Load specific phrases by id, e.g. ones other processes added
+
+        Ids are looked up explicitly rather than above a high-water mark,
+        since concurrent writers can commit them out of order.
+        """
+        self.add(db.session.execute(
+            select(Phrase.id, Phrase.text).where(Phrase.id.in_(list(ids)))
+        ).all())
+
+    def load_texts(self, texts: Iterable[str]):
+        self.add(db.session.execute(
+            select(Phrase.id, Phrase.text).where(Phrase.text.in_(list(texts)))
+        ).all())
+
+    def add(self, rows: Iterable):
+        with self._lock:
+            for phrase_id, text in rows:
+                self._ids[text] = phrase_id
+                self._texts[phrase_id] = text
+
+    def ids_for(self, texts: List[str]) -> List[int]:
+        """
+        Phrase ids for ``texts``, inserting unknown phrases in the current transaction
+        """
+        pending = db.session.info.setdefault(PENDING_KEY, {})
+        missing = [text for text in dict.fromkeys(texts) if text not in self._ids and text not in pending]
+        if missing:
+            # Another process may have added them already
+            self.load_texts(missing)
+            missing = [text for text in missing if text not in self._ids]
+        if missing:
+            db.session.execute(_insert_ignoring_duplicates(), [{'text': text} for text in missing])
+            pending.update(db.session.execute(
+                select(Phrase.text, Phrase.id).where(Phrase.text.in_(missing))
+            ).all())
+            db.session.info.setdefault('phrase_catalogs', set()).add(self)
+
+        ids = self._ids
+        return [ids[text] if text in ids else pending[text] for text in texts]
+
+    def texts_for(self, ids: List[int]) -> List[str]:
+        texts = self._texts
+        unknown = {phrase_id for phrase_id in ids if phrase_id not in texts}
+        if unknown:
+            self.load_ids(unknown)
+        return [texts[phrase_id] for phrase_id in ids]
+
+def _insert_ignoring_duplicates():
+    """
+    INSERT into phrases that skips texts a concurrent writer already added
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        module = __import__(f'sqlalchemy.dialects.{dialect}', fromlist=['insert'])
+        return module.insert(Phrase).on_conflict_do_nothing(index_elements=['text'])
+    if dialect in ('mysql', 'mariadb'):
+        return insert(Phrase).prefix_with('IGNORE')
+    return insert(Phrase)
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    for catalog in session.info.pop('phrase_catalogs', ()):
+        catalog.add((phrase_id, text) for text, phrase_id in pending.items())
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop('phrase_catalogs', None)
+
+def init_app(app):
+    app.extensions['phrase_catalog'] = PhraseCatalog()
+
+def get_catalog() -> PhraseCatalog:
+    return current_app.extensions['phrase_catalog']
+
+def pack_ids(ids: List[int]) -> bytes:
+    """
+    Width byte (2 or 4) followed by little-endian unsigned ids
+    """
+    dtype = '<u2' if not ids or max(ids) < 1 << 16 else '<u4'
+    packed = np.asarray(ids, dtype=dtype)
+    return bytes([packed.itemsize]) + packed.tobytes()
+
+def unpack_ids(blob: bytes) -> List[int]:
+    return np.frombuffer(blob, dtype=f'<u{blob[0]}', offset=1).tolist()
+
+def encode_reasons(reasons: List[str], confidence: Optional[float] = None) -> bytes:
+    """
+    Packed phrase ids, with the ``confidence`` figure replaced by a placeholder
+
+    Otherwise every distinct confidence would intern a new phrase and the
+    vocabulary would grow without bound.
+    """
+    if confidence is not None:
+        shown = f'({format_confidence(confidence)})'
+        reasons = [reason.replace(shown, f'({CONFIDENCE_PLACEHOLDER})') for reason in reasons]
+    return pack_ids(get_catalog().ids_for(reasons))
+
+def decode_reasons(blob: bytes, confidence: Optional[float] = None) -> List[str]:
+    reasons = get_catalog().texts_for(unpack_ids(blob))
+    if confidence is not None:
+        shown = format_confidence(confidence)
+        reasons = [reason.replace(CONFIDENCE_PLACEHOLDER, shown) for reason in reasons]
+    return reasons
+
+def encode_recommendations(recommendations: Dict[str, List[str]]) -> Optional[bytes]:
+    """
+    Packed list lengths then phrase ids, or None for an unexpected shape
+    """
+    if set(recommendations) != set(RECOMMENDATION_KEYS):
+        return None
+    lists = [list(recommendations[key]) for key in RECOMMENDATION_KEYS]
+    texts = [text for values in lists for text in values]
+    return pack_ids([len(values) for values in lists] + get_catalog().ids_for(texts))
+
+def decode_recommendations(blob: bytes) -> Dict[str, List[str]]:
+    ids = unpack_ids(blob)
+    n_keys = len(RECOMMENDATION_KEYS)
+    texts = get_catalog().texts_for(ids[n_keys:])
+
+    recommendations = {}
+    start = 0
+    for key, length in zip(RECOMMENDATION_KEYS, ids[:n_keys]):
+        recommendations[key] = texts[start:start + length]
+        start += length
+    return recommendations
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+import soil_rules
+
+# Instrument resolution per feature; readings are snapped to these steps,
+# which must divide one unit evenly (1, 0.1, 0.01, ...)
+DEFAULT_RESOLUTIONS = {
+    'nitrogen': 0.1,        # ppm
+    'phosphorus': 0.1,      # ppm
+    'potassium': 1.0,       # ppm
+    'ph': 0.01,
+    'organic_matter': 0.01,  # percentage
+    'moisture': 0.1,        # percentage
+    'temperature': 0.1,     # Celsius
+}
+
+class PredictionCache:
+    """
+    Bounded, thread-safe LRU cache of prediction results
+
+    Keys are the feature vector in whole instrument steps plus the model
+    version, so a newly loaded model never sees stale results. The predictor
+    only caches readings already on that grid, since finer values can land
+    on the other side of a model or band threshold.
+    """
+
+    def __init__(self, max_entries: int = 4096, resolutions: Optional[Dict[str, float]] = None):
+        resolutions = {**DEFAULT_RESOLUTIONS, **(resolutions or {})}
+        self.max_entries = max_entries
+        # Work in whole steps per unit (10 for 0.1, 100 for 0.01): dividing by
+        # an exact integer turns 300 steps back into exactly 30.0
+        self.steps_per_unit = np.rint(1.0 / np.array([resolutions[name] for name in soil_rules.FEATURES]))
+        self._entries: 'OrderedDict[Hashable, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Snap a raw feature matrix (soil_rules.FEATURES order) to instrument steps
+        """
+        return np.rint(raw * self.steps_per_unit) / self.steps_per_unit
+
+    def keys(self, quantized: np.ndarray, model_version: str) -> List[Hashable]:
+        """
+        Cache keys for every row of a quantized feature matrix
+        """
+        steps = np.rint(quantized * self.steps_per_unit).tolist()
+        return [(model_version, *row) for row in steps]
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: Hashable, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+def copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy a cached result deeply enough that callers can mutate it freely
+    """
+    copied = dict(result)
+    copied['reasons'] = list(result['reasons'])
+    copied['recommendations'] = {key: list(values) for key, values in result['recommendations'].items()}
+    return copied
@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, ChatMessage
+from metrics import timed
+from pagination import history_page, CursorError, FieldsError
+from write_behind import get_writer
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -9,7 +12,8 @@ chat_bp = Blueprint('chat', __name__)
 def chat_message():
     try:
         user_id = get_jwt_identity()
-        data = request.get_json()
+        with timed('json_parse'):
+            data = request.get_json()
         
         if not data.get('message'):
             return jsonify({'error': 'Message is required'}), 400
@@ -20,17 +24,19 @@ def chat_message():
             return jsonify({'error': 'Message cannot be empty'}), 400
         
         # Generate AI response
-        response = generate_farming_advice(message)
+        with timed('chat_advice'):
+            response = generate_farming_advice(message)
         
         # Save chat message
-        chat = ChatMessage(
-            user_id=user_id,
-            message=message,
-            response=response
-        )
+        row = {'user_id': user_id, 'message': message, 'response': response}
+        writer = get_writer()
         
-        db.session.add(chat)
-        db.session.commit()
+        with timed('db_commit'):
+            if writer is not None:
+                writer.submit(ChatMessage, [row])
+            else:
+                db.session.add(ChatMessage(**row))
+                db.session.commit()
         
         return jsonify({'response': response}), 200
         
@@ -42,28 +48,10 @@ def chat_message():
 def get_chat_history():
     try:
         user_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        messages = ChatMessage.query.filter_by(user_id=user_id).order_by(
-            ChatMessage.created_at.desc()
-        ).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        history = []
-        for msg in messages.items:
-            history.append(msg.to_dict())
-        
-        return jsonify({
-            'history': history,
-            'total': messages.total,
-            'pages': messages.pages,
-            'current_page': page
-        }), 200
+        return jsonify(history_page(ChatMessage, user_id, default_per_page=20)), 200
         
+    except (CursorError, FieldsError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
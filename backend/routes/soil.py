@@ -1,61 +1,275 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, SoilAnalysis
 from ml_predictor import SoilFertilityPredictor
+from model_registry import ModelRegistry, RegistryWatcher
+from metrics import timed, register_stats, PREDICTION_CACHE_FIELDS, SCHEDULER_FIELDS
+from pagination import history_page, CursorError, FieldsError
+from user_statistics import record_analyses, user_statistics
+from phrase_catalog import encode_reasons, encode_recommendations
+from write_behind import get_writer
+from analysis_cache import get_cache, put_on_commit, render_analysis
+from soil_rules import LEVELS
+from sqlalchemy import update
+from sqlalchemy.orm import undefer_group
+from datetime import datetime
+import hmac
 import json
+import math
 
 soil_bp = Blueprint('soil', __name__)
 
 # Initialize ML predictor
 predictor = SoilFertilityPredictor()
 
+@soil_bp.record_once
+def configure_predictor(state):
+    """
+    Apply app configuration to the shared predictor when the blueprint is registered
+    """
+    window_ms = state.app.config.get('ML_BATCH_WINDOW_MS', 0)
+    if window_ms:
+        predictor.enable_micro_batching(
+            max_wait_ms=window_ms,
+            max_batch_size=state.app.config.get('ML_BATCH_MAX_SIZE', 64)
+        )
+    
+    workers = state.app.config.get('ML_WORKER_PROCESSES', 0)
+    if workers:
+        predictor.enable_worker_pool(
+            n_workers=workers,
+            slot_rows=state.app.config.get('ML_WORKER_SLOT_ROWS', 256)
+        )
+    
+    # Serve the registry's active version when one has been published
+    registry = ModelRegistry(state.app.config.get('MODEL_REGISTRY_DIR', 'models/registry'))
+    state.app.extensions['model_registry'] = registry
+    active_path = registry.active_path()
+    if active_path and registry.active_version() != predictor.model_version:
+        predictor.load_model(active_path)
+    
+    # Publish the cache and scheduler counts at /api/metrics; the scheduler is
+    # looked up per scrape since enable_micro_batching replaces it
+    register_stats('prediction_cache', lambda: predictor.cache.stats() if predictor.cache else None,
+                   PREDICTION_CACHE_FIELDS)
+    register_stats('inference_scheduler', lambda: predictor.scheduler.stats() if predictor.scheduler else None,
+                   SCHEDULER_FIELDS)
+    
+    interval = state.app.config.get('MODEL_WATCH_INTERVAL', 0)
+    if interval:
+        state.app.extensions['model_watcher'] = RegistryWatcher(registry, predictor, interval).start()
+
+def model_admin_authorized():
+    """
+    Check the X-Admin-Token header against the configured admin token
+    """
+    token = current_app.config.get('MODEL_ADMIN_TOKEN')
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+REQUIRED_FIELDS = ['nitrogen', 'phosphorus', 'potassium', 'ph',
+                   'organic_matter', 'moisture', 'temperature']
+
+# Upper bound on samples accepted by a single batch request
+MAX_BATCH_SAMPLES = 5000
+
+def validate_soil_sample(data):
+    """
+    Return an error message for an invalid soil sample, or None if it is valid
+    """
+    if not isinstance(data, dict):
+        return 'Sample must be an object'
+    
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            return f'Missing field: {field}'
+        
+        # Validate numeric values; NaN and infinity would reach the model unchecked
+        try:
+            value = float(data[field])
+        except (ValueError, TypeError):
+            return f'Invalid value for {field}'
+        if not math.isfinite(value):
+            return f'Invalid value for {field}'
+    
+    return None
+
+def analysis_values(user_id, data, prediction):
+    """
+    Column values for a SoilAnalysis row built from a sample and its prediction,
+    with reasons and recommendations still as lists
+    """
+    return {
+        'user_id': user_id,
+        'nitrogen': float(data['nitrogen']),
+        'phosphorus': float(data['phosphorus']),
+        'potassium': float(data['potassium']),
+        'ph': float(data['ph']),
+        'organic_matter': float(data['organic_matter']),
+        'moisture': float(data['moisture']),
+        'temperature': float(data['temperature']),
+        'location': data.get('location', ''),
+        'fertility_level': prediction['fertility_level'],
+        'score': prediction['score'],
+        'confidence': prediction.get('confidence'),
+        'reasons': prediction['reasons'],
+        'recommendations': prediction['recommendations']
+    }
+
+def intern_phrases(values):
+    """
+    Replace reason and recommendation lists with phrase ids
+    
+    Recommendations of an unexpected shape are kept as JSON text instead.
+    """
+    row = dict(values)
+    recommendation_ids = encode_recommendations(row['recommendations'])
+    row.update({
+        'reasons': '',
+        'reason_ids': encode_reasons(row['reasons'], row['confidence']),
+        'recommendations': '' if recommendation_ids is not None else json.dumps(row['recommendations']),
+        'recommendation_ids': recommendation_ids
+    })
+    return row
+
+def build_analysis_row(user_id, data, prediction):
+    return intern_phrases(analysis_values(user_id, data, prediction))
+
+def record_analysis_rows(rows):
+    """
+    Count inserted analysis rows in user_statistics, if it is maintained
+    """
+    if not current_app.config.get('USER_STATS_TABLE'):
+        return
+    by_user = {}
+    for row in rows:
+        by_user.setdefault(row['user_id'], []).append((row['fertility_level'], row['score']))
+    for user_id, results in by_user.items():
+        record_analyses(user_id, results)
+
+def analyses_inserted(rows):
+    """
+    Count inserted analyses and render their detail responses for the cache
+    
+    ``rows`` are analysis_values rows with the id and created_at of the insert.
+    """
+    record_analysis_rows(rows)
+    if get_cache() is None:
+        return
+    for row in rows:
+        columns = {key: value for key, value in row.items() if key not in ('reasons', 'recommendations')}
+        body = render_analysis(SoilAnalysis(**columns).to_dict(
+            reasons=row['reasons'], recommendations=row['recommendations']
+        ))
+        put_on_commit(row['id'], row['user_id'], body)
+
+@soil_bp.record_once
+def configure_write_behind(state):
+    """
+    Let a write-behind queue intern phrases, update statistics and fill the
+    detail cache as it inserts analyses
+    """
+    writer = state.app.extensions.get('write_behind')
+    if writer is not None:
+        writer.register(SoilAnalysis, prepare=intern_phrases, after_insert=analyses_inserted)
+
 @soil_bp.route('/analyze', methods=['POST'])
 @jwt_required()
 def analyze_soil():
     try:
         user_id = get_jwt_identity()
-        data = request.get_json()
+        with timed('json_parse'):
+            data = request.get_json()
         
         # Validate soil data
-        required_fields = ['nitrogen', 'phosphorus', 'potassium', 'ph', 
-                          'organic_matter', 'moisture', 'temperature']
-        
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing field: {field}'}), 400
-            
-            # Validate numeric values
-            try:
-                float(data[field])
-            except (ValueError, TypeError):
-                return jsonify({'error': f'Invalid value for {field}'}), 400
+        with timed('validate'):
+            error = validate_soil_sample(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Make ML prediction
         prediction = predictor.predict_fertility(data)
         
         # Save analysis to database
-        analysis = SoilAnalysis(
-            user_id=user_id,
-            nitrogen=float(data['nitrogen']),
-            phosphorus=float(data['phosphorus']),
-            potassium=float(data['potassium']),
-            ph=float(data['ph']),
-            organic_matter=float(data['organic_matter']),
-            moisture=float(data['moisture']),
-            temperature=float(data['temperature']),
-            location=data.get('location', ''),
-            fertility_level=prediction['fertility_level'],
-            score=prediction['score'],
-            reasons=json.dumps(prediction['reasons']),
-            recommendations=json.dumps(prediction['recommendations'])
-        )
+        writer = get_writer()
+        with timed('db_commit'):
+            if writer is not None:
+                writer.submit(SoilAnalysis, [analysis_values(user_id, data, prediction)])
+            else:
+                row = build_analysis_row(user_id, data, prediction)
+                analysis = SoilAnalysis(**row)
+                db.session.add(analysis)
+                record_analysis_rows([row])
+                if get_cache():
+                    # Render the detail response now, from values already in hand
+                    db.session.flush()
+                    put_on_commit(analysis.id, user_id, render_analysis(analysis.to_dict(
+                        reasons=prediction['reasons'], recommendations=prediction['recommendations']
+                    )))
+                db.session.commit()
         
-        db.session.add(analysis)
-        db.session.commit()
+        with timed('serialize'):
+            return jsonify(prediction), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@soil_bp.route('/analyze/batch', methods=['POST'])
+@jwt_required()
+def analyze_soil_batch():
+    try:
+        user_id = get_jwt_identity()
+        with timed('json_parse'):
+            data = request.get_json()
         
-        return jsonify(prediction), 200
+        samples = data.get('samples') if isinstance(data, dict) else None
+        if not isinstance(samples, list) or not samples:
+            return jsonify({'error': 'samples must be a non-empty list'}), 400
+        
+        if len(samples) > MAX_BATCH_SAMPLES:
+            return jsonify({'error': f'Too many samples (max {MAX_BATCH_SAMPLES})'}), 400
+        
+        # Validate every sample before scoring any of them
+        with timed('validate'):
+            for index, sample in enumerate(samples):
+                error = validate_soil_sample(sample)
+                if error:
+                    return jsonify({'error': f'Sample {index}: {error}'}), 400
+        
+        # Score the whole batch with one model call
+        features = [
+            {field: float(sample[field]) for field in REQUIRED_FIELDS}
+            for sample in samples
+        ]
+        predictions = predictor.predict_fertility_batch(features)
+        
+        # Bulk-insert all analyses in a single transaction
+        writer = get_writer()
+        with timed('db_commit'):
+            rows = [
+                analysis_values(user_id, sample, prediction)
+                for sample, prediction in zip(samples, predictions)
+            ]
+            if writer is not None:
+                writer.submit(SoilAnalysis, rows)
+            else:
+                inserted = db.session.execute(
+                    db.insert(SoilAnalysis).returning(
+                        SoilAnalysis.id, SoilAnalysis.created_at, sort_by_parameter_order=True
+                    ),
+                    [intern_phrases(row) for row in rows]
+                ).mappings()
+                analyses_inserted([dict(row, **filled) for row, filled in zip(rows, inserted)])
+                db.session.commit()
+        
+        with timed('serialize'):
+            return jsonify({
+                'results': predictions,
+                'count': len(predictions)
+            }), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @soil_bp.route('/history', methods=['GET'])
@@ -63,28 +277,10 @@ def analyze_soil():
 def get_soil_history():
     try:
         user_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        analyses = SoilAnalysis.query.filter_by(user_id=user_id).order_by(
-            SoilAnalysis.created_at.desc()
-        ).paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        history = []
-        for analysis in analyses.items:
-            history.append(analysis.to_dict())
-        
-        return jsonify({
-            'history': history,
-            'total': analyses.total,
-            'pages': analyses.pages,
-            'current_page': page
-        }), 200
+        return jsonify(history_page(SoilAnalysis, user_id, default_per_page=10)), 200
         
+    except (CursorError, FieldsError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -93,17 +289,58 @@ def get_soil_history():
 def get_analysis_detail(analysis_id):
     try:
         user_id = get_jwt_identity()
-        analysis = SoilAnalysis.query.filter_by(
-            id=analysis_id, 
-            user_id=user_id
-        ).first()
+        cache = get_cache()
+        
+        # Analyses are immutable, so a rendered body never goes stale
+        entry = cache.get(analysis_id) if cache else None
+        if entry is None or entry.user_id != user_id:
+            analysis = SoilAnalysis.query.options(undefer_group('details')).filter_by(
+                id=analysis_id, 
+                user_id=user_id
+            ).first()
+            
+            if not analysis:
+                return jsonify({'error': 'Analysis not found'}), 404
+            
+            body = render_analysis(analysis.to_dict())
+            if not cache:
+                return current_app.response_class(body, mimetype='application/json')
+            entry = cache.put(analysis_id, user_id, body)
+        
+        response = current_app.response_class(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@soil_bp.route('/analysis/<int:analysis_id>/lab-result', methods=['POST'])
+@jwt_required()
+def record_lab_result(analysis_id):
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
         
-        if not analysis:
+        # The ground-truth label retraining learns from; a later result supersedes it
+        level = data.get('fertility_level') if isinstance(data, dict) else None
+        if level not in LEVELS:
+            return jsonify({'error': f"fertility_level must be one of {', '.join(LEVELS)}"}), 400
+        
+        updated = db.session.execute(
+            update(SoilAnalysis)
+            .where(SoilAnalysis.id == analysis_id, SoilAnalysis.user_id == user_id)
+            .values(lab_fertility_level=level, lab_confirmed_at=datetime.utcnow())
+        )
+        if updated.rowcount == 0:
+            db.session.rollback()
             return jsonify({'error': 'Analysis not found'}), 404
+        db.session.commit()
         
-        return jsonify({'analysis': analysis.to_dict()}), 200
+        return jsonify({'message': 'Lab result recorded'}), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @soil_bp.route('/statistics', methods=['GET'])
@@ -112,32 +349,55 @@ def get_user_statistics():
     try:
         user_id = get_jwt_identity()
         
-        total_analyses = SoilAnalysis.query.filter_by(user_id=user_id).count()
-        
-        # Get fertility level distribution
-        high_fertility = SoilAnalysis.query.filter_by(
-            user_id=user_id, fertility_level='High'
-        ).count()
-        medium_fertility = SoilAnalysis.query.filter_by(
-            user_id=user_id, fertility_level='Medium'
-        ).count()
-        low_fertility = SoilAnalysis.query.filter_by(
-            user_id=user_id, fertility_level='Low'
-        ).count()
+        # O(1) read of the maintained row when enabled, else one grouped query
+        stats = user_statistics(user_id, use_table=current_app.config.get('USER_STATS_TABLE', False))
+        return jsonify(stats), 200
         
-        # Get average score
-        analyses = SoilAnalysis.query.filter_by(user_id=user_id).all()
-        avg_score = sum(a.score for a in analyses) / len(analyses) if analyses else 0
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@soil_bp.route('/model', methods=['GET'])
+@jwt_required()
+def get_model_info():
+    try:
+        registry = current_app.extensions['model_registry']
         
         return jsonify({
-            'total_analyses': total_analyses,
-            'fertility_distribution': {
-                'high': high_fertility,
-                'medium': medium_fertility,
-                'low': low_fertility
-            },
-            'average_score': round(avg_score, 1)
+            'model_version': predictor.model_version,
+            'model_family': predictor.model_family,
+            'registry_active_version': registry.active_version(),
+            'available_versions': registry.versions()
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@soil_bp.route('/model/reload', methods=['POST'])
+def reload_model():
+    try:
+        if not model_admin_authorized():
+            return jsonify({'error': 'Forbidden'}), 403
+        
+        registry = current_app.extensions['model_registry']
+        data = request.get_json(silent=True) or {}
+        
+        # Optionally move the ACTIVE pointer before reloading
+        version = data.get('version')
+        if version:
+            try:
+                registry.activate(version)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 404
+        
+        active_path = registry.active_path()
+        if not active_path:
+            return jsonify({'error': 'No active model in registry'}), 404
+        
+        # Requests in flight keep their model; the swap is a single assignment
+        if not predictor.load_model(active_path):
+            return jsonify({'error': 'Model failed to load'}), 500
+        
+        return jsonify({'model_version': predictor.model_version}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
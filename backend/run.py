@@ -1,11 +1,17 @@
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from models import db
+from models import db, create_missing_columns, create_missing_indexes
 from routes.auth import auth_bp
 from routes.soil import soil_bp
 from routes.chat import chat_bp
 from config import config
+import metrics
+import phrase_catalog
+import write_behind
+import storage
+import analysis_cache
+import user_statistics
 import os
 
 def create_app(config_name=None):
@@ -16,15 +22,32 @@ def create_app(config_name=None):
     app.config.from_object(config[config_name])
     
     # Initialize extensions
+    storage.configure_engine_options(app)
     db.init_app(app)
+    storage.install_pragmas(app)
     jwt = JWTManager(app)
     CORS(app, origins=['http://localhost:5173'])  # Vite dev server
     
+    # Optional batched persistence; started before the blueprints register their hooks
+    write_behind.init_app(app)
+    
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(soil_bp, url_prefix='/api/soil')
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     
+    # Request timing and the Prometheus /api/metrics endpoint
+    metrics.init_app(app)
+    
+    # In-memory phrase catalog for interned reasons and recommendations
+    phrase_catalog.init_app(app)
+    
+    # Rendered analysis detail responses, served with ETags
+    analysis_cache.init_app(app)
+    
+    # flask rebuild-user-stats
+    user_statistics.init_app(app)
+    
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
     def health_check():
@@ -33,6 +56,8 @@ def create_app(config_name=None):
     # Create database tables
     with app.app_context():
         db.create_all()
+        create_missing_columns()
+        create_missing_indexes()
         
         # Create demo user if it doesn't exist
         from models import User
@@ -50,14 +75,7 @@ def create_app(config_name=None):
             print("Demo user created: demo@example.com / password")
         
         # Check if ML model exists
-        if os.path.exists('models/soil_fertility_model.pkl'):
-            print("✓ ML model found - using trained predictions")
-        else:
-            print("⚠ No ML model found - using rule-based predictions")
-            print("Run 'python ml_model/train_model.py' to train the ML model")
-        
-        # Check if ML model exists
-        if os.path.exists('models/soil_fertility_model.pkl'):
+        if os.path.exists('models/soil_fertility_model.npz'):
             print("✓ ML model found - using trained predictions")
         else:
             print("⚠ No ML model found - using rule-based predictions")
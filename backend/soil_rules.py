@@ -0,0 +1,344 @@
+"""
+Declarative soil threshold table and a vectorized evaluator over it
+
+Every rule-based output (fallback score and fertility level, per-feature
+explanations, fertilizer and improvement recommendations) is derived from
+which band each feature falls into. The bands and their outcomes are
+declared once in ``RULES``; the evaluator classifies whole arrays of
+samples with ``np.select`` / ``np.digitize``.
+"""
+import numpy as np
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+# Feature bands: below ``low`` is LOW, above ``high`` is HIGH, else NORMAL
+LOW, NORMAL, HIGH = 0, 1, 2
+
+class FeatureRule(NamedTuple):
+    low: float
+    high: float
+    # Each of the following holds one entry per band: (LOW, NORMAL, HIGH)
+    scores: Tuple[int, int, int]
+    rule_reasons: Tuple[str, str, str]
+    ml_reasons: Tuple[str, str, str]
+    fertilizers: Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]
+    improvements: Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]
+
+RULES: Dict[str, FeatureRule] = {
+    'nitrogen': FeatureRule(
+        low=20, high=50,
+        scores=(10, 20, 30),
+        rule_reasons=(
+            'Low nitrogen levels detected - affects plant growth',
+            'Moderate nitrogen levels - adequate for most crops',
+            'Optimal nitrogen levels support healthy growth',
+        ),
+        ml_reasons=(
+            'Nitrogen deficiency detected - critical for plant growth and leaf development',
+            'Nitrogen levels are adequate for most crops',
+            'Excellent nitrogen levels support vigorous plant growth',
+        ),
+        fertilizers=(('Urea (46-0-0)', 'Ammonium Sulfate (21-0-0)'), (), ()),
+        improvements=(('Apply nitrogen-rich fertilizers during growing season',), (), ()),
+    ),
+    'phosphorus': FeatureRule(
+        low=15, high=30,
+        scores=(10, 20, 25),
+        rule_reasons=(
+            'Phosphorus deficiency limits root development',
+            'Adequate phosphorus levels',
+            'Good phosphorus availability',
+        ),
+        ml_reasons=(
+            'Low phosphorus may limit root development and flowering',
+            'Phosphorus levels support normal plant development',
+            'Optimal phosphorus levels promote strong root systems',
+        ),
+        fertilizers=(('Triple Superphosphate (0-46-0)', 'Bone Meal (4-12-0)'), (), ()),
+        improvements=(('Increase phosphorus for better root development',), (), ()),
+    ),
+    'potassium': FeatureRule(
+        low=100, high=200,
+        scores=(10, 20, 25),
+        rule_reasons=(
+            'Low potassium affects disease resistance',
+            'Moderate potassium availability',
+            'Excellent potassium levels',
+        ),
+        ml_reasons=(
+            'Potassium deficiency may reduce disease resistance and stress tolerance',
+            'Potassium levels are sufficient for plant health',
+            'Excellent potassium levels enhance plant resilience',
+        ),
+        fertilizers=(('Muriate of Potash (0-0-60)', 'Potassium Sulfate (0-0-50)'), (), ()),
+        improvements=(('Apply potassium fertilizers for stress tolerance',), (), ()),
+    ),
+    'ph': FeatureRule(
+        low=6.0, high=8.0,
+        scores=(5, 20, 5),
+        rule_reasons=(
+            'pH outside optimal range affects nutrients',
+            'pH within optimal range',
+            'pH outside optimal range affects nutrients',
+        ),
+        ml_reasons=(
+            'pH levels outside optimal range may limit nutrient uptake',
+            'pH levels are ideal for maximum nutrient availability',
+            'pH levels outside optimal range may limit nutrient uptake',
+        ),
+        fertilizers=(('Dolomitic Lime',), (), ('Elemental Sulfur',)),
+        improvements=(('Apply lime to increase pH',), (), ('Apply sulfur to decrease pH',)),
+    ),
+    'organic_matter': FeatureRule(
+        low=2, high=4,
+        scores=(5, 15, 20),
+        rule_reasons=(
+            'Low organic matter reduces soil health',
+            'Adequate organic matter',
+            'Rich organic matter improves soil',
+        ),
+        ml_reasons=(
+            'Low organic matter limits soil structure and water retention',
+            'Organic matter levels support healthy soil ecosystem',
+            'Rich organic matter content enhances soil biology',
+        ),
+        fertilizers=(('Compost', 'Well-aged Manure'), (), ()),
+        improvements=(('Add organic matter to improve soil structure',), (), ()),
+    ),
+    'moisture': FeatureRule(
+        low=30, high=80,
+        scores=(0, 0, 0),
+        rule_reasons=('', '', ''),
+        ml_reasons=(
+            'Moisture levels may stress plants - optimal range is 30-70%',
+            'Soil moisture is within ideal range for plant growth',
+            'Moisture levels may stress plants - optimal range is 30-70%',
+        ),
+        fertilizers=((), (), ()),
+        improvements=((), (), ()),
+    ),
+    'temperature': FeatureRule(
+        low=15, high=30,
+        scores=(0, 0, 0),
+        rule_reasons=('', '', ''),
+        ml_reasons=(
+            'Soil temperature outside optimal range may slow nutrient uptake',
+            'Soil temperature supports active root growth and nutrient absorption',
+            'Soil temperature outside optimal range may slow nutrient uptake',
+        ),
+        fertilizers=((), (), ()),
+        improvements=((), (), ()),
+    ),
+}
+
+# Column order expected by the evaluator
+FEATURES: List[str] = list(RULES)
+
+# Features that contribute to the rule-based fallback score and reasons
+SCORED_FEATURES: List[str] = ['nitrogen', 'phosphorus', 'potassium', 'ph', 'organic_matter']
+
+# Rule score -> fertility level: <= 60 Low, 61-80 Medium, > 80 High
+LEVELS: Tuple[str, str, str] = ('Low', 'Medium', 'High')
+LEVEL_SCORE_BOUNDS = [60, 80]
+
+# Model confidence -> wording: <= 0.8 moderate, (0.8, 0.9] high, > 0.9 very high
+CONFIDENCE_WORDS: Tuple[str, str, str] = ('moderate', 'high', 'very high')
+CONFIDENCE_BOUNDS = [0.8, 0.9]
+
+CROPS: Dict[str, Tuple[str, ...]] = {
+    'High': ('Corn', 'Soybeans', 'Wheat', 'Tomatoes', 'Peppers', 'Cucumbers'),
+    'Medium': ('Beans', 'Carrots', 'Lettuce', 'Spinach', 'Radishes', 'Onions'),
+    'Low': ('Clover', 'Alfalfa', 'Buckwheat', 'Rye Grass', 'Cover Crops'),
+}
+
+_LOW_BOUNDS = np.array([RULES[name].low for name in FEATURES], dtype=np.float64)
+_HIGH_BOUNDS = np.array([RULES[name].high for name in FEATURES], dtype=np.float64)
+_SCORED_COLUMNS = np.array([FEATURES.index(name) for name in SCORED_FEATURES])
+_SCORE_TABLE = np.array([RULES[name].scores for name in SCORED_FEATURES], dtype=np.int64)
+
+def feature_matrix(samples: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Stack soil samples into an N x len(FEATURES) float matrix in table order
+    """
+    return np.array(
+        [[float(sample[name]) for name in FEATURES] for sample in samples],
+        dtype=np.float64
+    ).reshape(len(samples), len(FEATURES))
+
+def feature_bands(X: np.ndarray) -> np.ndarray:
+    """
+    Classify every feature of every sample into LOW / NORMAL / HIGH
+    """
+    X = np.asarray(X, dtype=np.float64)
+    return np.select(
+        [X < _LOW_BOUNDS, X > _HIGH_BOUNDS], [LOW, HIGH], NORMAL
+    ).astype(np.int8)
+
+def rule_scores(bands: np.ndarray) -> np.ndarray:
+    """
+    Rule-based fertility score (capped at 100) for each row of a band matrix
+    """
+    scored = bands[:, _SCORED_COLUMNS]
+    scores = _SCORE_TABLE[np.arange(len(SCORED_FEATURES)), scored].sum(axis=1)
+    return np.minimum(scores, 100)
+
+def score_levels(scores: np.ndarray) -> np.ndarray:
+    """
+    Index into LEVELS for each rule score
+    """
+    return np.digitize(scores, LEVEL_SCORE_BOUNDS, right=True)
+
+def confidence_levels(confidences: np.ndarray) -> np.ndarray:
+    """
+    Index into CONFIDENCE_WORDS for each model confidence
+    """
+    return np.digitize(confidences, CONFIDENCE_BOUNDS, right=True)
+
+def format_confidence(confidence: float) -> str:
+    """
+    Model confidence as reasons show it, e.g. '87.5%'
+    """
+    return f'{confidence:.1%}'
+
+def rule_reasons(band_row) -> List[str]:
+    """
+    Rule-based explanations for one row of the band matrix
+    """
+    return [
+        RULES[name].rule_reasons[band_row[column]]
+        for name, column in zip(SCORED_FEATURES, _SCORED_COLUMNS)
+    ]
+
+def ml_reasons(band_row) -> List[str]:
+    """
+    Per-feature explanations that accompany an ML prediction
+    """
+    return [RULES[name].ml_reasons[band] for name, band in zip(FEATURES, band_row)]
+
+def recommendations(band_row, fertility_level: str) -> Dict[str, list]:
+    """
+    Fertilizer, crop and improvement recommendations for one row of bands
+    """
+    fertilizers = []
+    improvements = []
+    for name, band in zip(FEATURES, band_row):
+        rule = RULES[name]
+        fertilizers.extend(rule.fertilizers[band])
+        improvements.extend(rule.improvements[band])
+
+    return {
+        'fertilizers': list(dict.fromkeys(fertilizers)),
+        'crops': list(CROPS[fertility_level]),
+        'improvements': improvements
+    }
+
+def evaluate_rules(X: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Vectorized rule evaluation for a whole matrix of samples
+    """
+    bands = feature_bands(X)
+    scores = rule_scores(bands)
+    return {
+        'bands': bands,
+        'scores': scores,
+        'levels': np.asarray(LEVELS)[score_levels(scores)],
+    }
+
+def rule_based_results(X: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Full rule-based prediction results for every row of X
+    """
+    evaluated = evaluate_rules(X)
+    return [
+        {
+            'fertility_level': str(level),
+            'score': int(score),
+            'reasons': rule_reasons(band_row),
+            'recommendations': recommendations(band_row, str(level))
+        }
+        for band_row, score, level in zip(
+            evaluated['bands'].tolist(), evaluated['scores'], evaluated['levels']
+        )
+    ]
+
+class RuleLookup:
+    """
+    Every rule output precomputed for every combination of feature bands
+
+    Seven three-way bands give 3 ** 7 = 2187 combinations (243 for the five
+    scored features), so the whole output space fits in a few small tables.
+    Scoring a sample is then one band classification, one dot product to get
+    the combination code and one table lookup.
+    """
+
+    def __init__(self):
+        self._weights = 3 ** np.arange(len(FEATURES))
+        self._scored_weights = np.zeros(len(FEATURES), dtype=np.int64)
+        self._scored_weights[_SCORED_COLUMNS] = 3 ** np.arange(len(SCORED_FEATURES))
+
+        # One band row per combination; code(row) == row index
+        all_bands = np.stack(
+            np.unravel_index(np.arange(3 ** len(FEATURES)), (3,) * len(FEATURES), order='F'),
+            axis=1
+        )
+        band_rows = all_bands.tolist()
+        scored_codes = all_bands @ self._scored_weights
+
+        # Identical tuples share one object across combinations
+        interned: Dict[tuple, tuple] = {}
+
+        def intern(values) -> tuple:
+            values = tuple(values)
+            return interned.setdefault(values, values)
+
+        self.ml_reasons: List[Tuple[str, ...]] = [intern(ml_reasons(row)) for row in band_rows]
+
+        self.recommendations: Dict[Tuple[int, str], Dict[str, Tuple[str, ...]]] = {}
+        self.rule_results: List[Tuple[int, str, Tuple[str, ...], Dict[str, Tuple[str, ...]]]] = \
+            [None] * (3 ** len(SCORED_FEATURES))
+
+        scores = rule_scores(all_bands)
+        levels = np.asarray(LEVELS)[score_levels(scores)]
+        for row, scored_code, score, level in zip(band_rows, scored_codes.tolist(), scores.tolist(), levels):
+            if self.rule_results[scored_code] is not None:
+                continue
+
+            for fertility_level in LEVELS:
+                recs = recommendations(row, fertility_level)
+                self.recommendations[(scored_code, fertility_level)] = {
+                    key: intern(values) for key, values in recs.items()
+                }
+
+            self.rule_results[scored_code] = (
+                score, str(level), intern(rule_reasons(row)),
+                self.recommendations[(scored_code, str(level))]
+            )
+
+    def codes(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Combination codes over all features and over the scored features
+        """
+        bands = feature_bands(X).astype(np.int64)
+        return bands @ self._weights, bands @ self._scored_weights
+
+    def recommendations_for(self, scored_code: int, fertility_level: str) -> Dict[str, list]:
+        """
+        Fresh recommendation lists for a scored-band combination and level
+        """
+        recs = self.recommendations[(scored_code, fertility_level)]
+        return {key: list(values) for key, values in recs.items()}
+
+    def rule_based_results(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Rule-based prediction results for every row of X via table lookup
+        """
+        _, scored_codes = self.codes(X)
+        results = []
+        for scored_code in scored_codes.tolist():
+            score, level, reasons, recs = self.rule_results[scored_code]
+            results.append({
+                'fertility_level': level,
+                'score': score,
+                'reasons': list(reasons),
+                'recommendations': {key: list(values) for key, values in recs.items()}
+            })
+        return results
@@ -0,0 +1,58 @@
+from typing import Any, Dict
+
+from sqlalchemy import event
+
+from models import db
+
+def resolve_storage_profile(config) -> Dict[str, Any]:
+    """
+    The STORAGE_PROFILES entry named by STORAGE_PROFILE
+
+    Without an explicit name, SQLite databases get the 'sqlite' profile and
+    anything else the 'server' one.
+    """
+    name = config.get('STORAGE_PROFILE')
+    if not name:
+        uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+        name = 'sqlite' if uri.startswith('sqlite') else 'server'
+
+    profiles = config.get('STORAGE_PROFILES', {})
+    if name not in profiles:
+        raise ValueError(f"Unknown storage profile {name!r} (expected one of: {', '.join(profiles)})")
+    return profiles[name]
+
+def configure_engine_options(app):
+    """
+    Merge the profile's engine options into SQLALCHEMY_ENGINE_OPTIONS
+
+    Must run before ``db.init_app``, which creates the engine. Options set
+    directly in SQLALCHEMY_ENGINE_OPTIONS take precedence.
+    """
+    profile = resolve_storage_profile(app.config)
+    options = dict(profile.get('engine_options', {}))
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def sqlite_pragma_statements(pragmas: Dict[str, Any]):
+    return [f'PRAGMA {name}={value}' for name, value in pragmas.items()]
+
+def install_pragmas(app):
+    """
+    Apply the profile's SQLite pragmas to every new connection of the app's engine
+    """
+    pragmas = resolve_storage_profile(app.config).get('pragmas')
+    with app.app_context():
+        engine = db.engine
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    statements = sqlite_pragma_statements(pragmas)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
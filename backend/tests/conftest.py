@@ -0,0 +1,61 @@
+import pytest
+import json
+from run import create_app
+from config import TestingConfig
+from models import db, User
+from werkzeug.security import generate_password_hash
+
+# A low-fertility reading, so its analysis has both reasons and recommendations
+SAMPLE = {'nitrogen': 10, 'phosphorus': 8, 'potassium': 80, 'ph': 5.2,
+          'organic_matter': 1.2, 'moisture': 30, 'temperature': 18}
+
+def add_user(email='test@example.com'):
+    user = User(
+        name='Test User',
+        email=email,
+        password_hash=generate_password_hash('testpassword')
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def user_id(email='test@example.com'):
+    return User.query.filter_by(email=email).one().id
+
+def login(client, email='test@example.com'):
+    response = client.post('/api/auth/login',
+        data=json.dumps({'email': email, 'password': 'testpassword'}),
+        content_type='application/json'
+    )
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+@pytest.fixture
+def config_overrides():
+    """
+    TestingConfig attributes to set before the app is created; override per module
+    """
+    return {}
+
+@pytest.fixture
+def app(config_overrides, monkeypatch):
+    for key, value in config_overrides.items():
+        monkeypatch.setattr(TestingConfig, key, value, raising=False)
+    app = create_app('testing')
+
+    with app.app_context():
+        db.create_all()
+        add_user()
+
+        yield app
+        writer = app.extensions.get('write_behind')
+        if writer is not None:
+            writer.close()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def headers(client):
+    return login(client)
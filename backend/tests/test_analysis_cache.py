@@ -0,0 +1,95 @@
+import json
+from sqlalchemy import event
+from conftest import SAMPLE, add_user, login, user_id
+from models import db, User, SoilAnalysis
+from analysis_cache import RenderedAnalysisCache, get_cache, put_on_commit, render_analysis
+
+def analysis_queries(client, url, headers):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, [sql for sql in statements if 'FROM soil_analyses' in sql]
+
+def test_detail_is_rendered_at_write_time_and_revalidated_with_etag(app, client, headers):
+    client.post('/api/soil/analyze', data=json.dumps(SAMPLE),
+                content_type='application/json', headers=headers)
+    analysis = SoilAnalysis.query.one()
+
+    response, queries = analysis_queries(client, f'/api/soil/analysis/{analysis.id}', headers)
+    assert response.status_code == 200
+    assert queries == []
+    # Same bytes as rendering the stored row
+    assert response.data == render_analysis(analysis.to_dict())
+    assert json.loads(response.data)['analysis']['id'] == analysis.id
+
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/')
+    response = client.get(f'/api/soil/analysis/{analysis.id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+def test_batch_rows_are_rendered_at_write_time(app, client, headers):
+    client.post('/api/soil/analyze/batch', data=json.dumps({'samples': [SAMPLE, {**SAMPLE, 'nitrogen': 60}]}),
+                content_type='application/json', headers=headers)
+
+    for analysis in SoilAnalysis.query.all():
+        response, queries = analysis_queries(client, f'/api/soil/analysis/{analysis.id}', headers)
+        assert queries == []
+        assert response.data == render_analysis(analysis.to_dict())
+
+def test_uncached_rows_are_cached_on_first_view(app, client, headers):
+    analysis = SoilAnalysis(
+        user_id=user_id(), nitrogen=20, phosphorus=20,
+        potassium=150, ph=6.5, organic_matter=3, moisture=45, temperature=22,
+        fertility_level='High', score=90, reasons='[]', recommendations='{}'
+    )
+    db.session.add(analysis)
+    db.session.commit()
+
+    first, queries = analysis_queries(client, f'/api/soil/analysis/{analysis.id}', headers)
+    assert len(queries) == 1
+    second, queries = analysis_queries(client, f'/api/soil/analysis/{analysis.id}', headers)
+    assert queries == [] and second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+
+def test_rolled_back_rows_are_not_cached(app):
+    put_on_commit(99, 1, b'{}')
+    db.session.rollback()
+    assert get_cache().get(99) is None
+
+def test_cascade_deletes_discard_cached_analyses(app, client, headers):
+    client.post('/api/soil/analyze', data=json.dumps(SAMPLE),
+                content_type='application/json', headers=headers)
+    analysis_id = SoilAnalysis.query.one().id
+    assert get_cache().get(analysis_id) is not None
+
+    db.session.delete(User.query.filter_by(email='test@example.com').one())
+    db.session.commit()
+    assert get_cache().get(analysis_id) is None
+
+def test_cached_analysis_is_not_served_to_other_users(app, client, headers):
+    client.post('/api/soil/analyze', data=json.dumps(SAMPLE),
+                content_type='application/json', headers=headers)
+    analysis_id = SoilAnalysis.query.one().id
+    add_user('other@example.com')
+
+    response = client.get(f'/api/soil/analysis/{analysis_id}', headers=login(client, 'other@example.com'))
+    assert response.status_code == 404
+
+def test_evicted_entries_spill_to_disk(tmp_path):
+    cache = RenderedAnalysisCache(max_entries=1, spill_dir=str(tmp_path), max_spilled=1)
+
+    first = cache.put(1, 7, b'{"analysis": 1}\n')
+    cache.put(2, 7, b'{"analysis": 2}\n')
+    assert cache.get(1) == first
+    assert cache.stats()['disk_hits'] == 1
+
+    # Only the most recently spilled file is kept
+    cache.put(3, 7, b'{"analysis": 3}\n')
+    assert cache.get(2) is None
+    assert cache.get(1) == first
@@ -0,0 +1,48 @@
+import json
+from ml_model import benchmark
+
+def results(**values):
+    return {'metrics': {name: {'value': value, 'unit': 'ms'} for name, value in values.items()}}
+
+def test_compare_flags_only_metrics_past_tolerance():
+    baseline = results(ml_batch=10.0, rules_batch=4.0, cold_model_load=5.0)
+    current = results(ml_batch=12.0, rules_batch=5.5, extra=1.0)
+
+    regressions = benchmark.compare(current, baseline, tolerance=0.25)
+
+    assert [name for name, *_ in regressions] == ['rules_batch']
+
+def test_compare_honours_per_metric_tolerance():
+    baseline = results(ml_batch=10.0)
+    baseline['metrics']['ml_batch']['tolerance'] = 0.1
+
+    assert benchmark.compare(results(ml_batch=12.0), baseline, tolerance=0.5)
+
+def test_main_writes_json_and_fails_on_regression(tmp_path):
+    output = tmp_path / 'bench.json'
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(results(rules_batch=1e-9)))
+
+    status = benchmark.main([
+        '--model', str(tmp_path / 'missing.npz'), '--batch-size', '50', '--quick',
+        '--output', str(output), '--compare', str(baseline)
+    ])
+
+    written = json.loads(output.read_text())
+    assert set(written['metrics']) == {'rules_single_row', 'rules_batch'}
+    assert status == 1
+
+def test_missing_baseline_metrics_fail_the_comparison(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps(results(rules_batch=1e9, ml_batch=1e9)))
+    args = ['--model', str(tmp_path / 'missing.npz'), '--batch-size', '50', '--quick', '--compare', str(baseline)]
+
+    assert benchmark.missing_metrics(results(rules_batch=1.0), json.loads(baseline.read_text())) == ['ml_batch']
+    assert benchmark.main(args) == 1
+    assert benchmark.main(args + ['--allow-missing']) == 0
+
+def test_committed_baseline_covers_ml_and_rules_paths():
+    with open(benchmark.DEFAULT_BASELINE_PATH) as f:
+        baseline = json.load(f)
+
+    assert {'ml_single_row', 'ml_batch', 'rules_batch', 'cold_model_load'} <= set(baseline['metrics'])
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from compiled_forest import CompiledForest, compile_forest
+
+sklearn_ensemble = pytest.importorskip('sklearn.ensemble')
+
+@pytest.fixture
+def fitted_forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 7))
+    y = np.where(X[:, 0] + X[:, 1] > 0.5, 'High', np.where(X[:, 2] > 0, 'Medium', 'Low'))
+    
+    model = sklearn_ensemble.RandomForestClassifier(
+        n_estimators=20, max_depth=6, random_state=0, class_weight='balanced'
+    )
+    model.fit(X, y)
+    return model, rng.normal(size=(300, 7))
+
+def test_compiled_forest_matches_sklearn(fitted_forest):
+    model, X = fitted_forest
+    compiled = compile_forest(model)
+    
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X))
+    assert (compiled.predict(X) == model.predict(X)).all()
+    assert list(compiled.classes_) == list(model.classes_)
+
+def test_compiled_forest_chunked_batches(fitted_forest):
+    model, X = fitted_forest
+    compiled = compile_forest(model)
+    expected = compiled.predict_proba(X)
+    
+    compiled.chunk_size = 64
+    np.testing.assert_allclose(compiled.predict_proba(X), expected)
+
+def test_compiled_forest_save_load_roundtrip(fitted_forest, tmp_path):
+    model, X = fitted_forest
+    path = tmp_path / 'forest.npz'
+    compile_forest(model).save(str(path))
+    
+    loaded = CompiledForest.load(str(path))
+    np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_allclose(loaded.feature_importances_, model.feature_importances_)
+
+@pytest.mark.parametrize('n_classes', [2, 3])
+def test_compiled_gradient_boosting_matches_sklearn(n_classes):
+    from compiled_forest import compile_gradient_boosting
+    
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(1000, 7))
+    y = np.digitize(X[:, 0] + X[:, 1], [-0.5, 0.5][:n_classes - 1])
+    model = sklearn_ensemble.HistGradientBoostingClassifier(max_iter=30, max_depth=4, random_state=0).fit(X, y)
+    
+    compiled = compile_gradient_boosting(model, class_names=np.array(['a', 'b', 'c'])[:n_classes])
+    X_test = rng.normal(size=(200, 7))
+    
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test), atol=1e-12)
+    loaded = CompiledForest.from_arrays(compiled.to_arrays())
+    np.testing.assert_allclose(loaded.predict_proba(X_test), compiled.predict_proba(X_test))
+
+def test_compiled_gradient_boosting_routes_missing_values_like_sklearn():
+    from compiled_forest import compile_gradient_boosting
+    
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(1000, 7))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    model = sklearn_ensemble.HistGradientBoostingClassifier(max_iter=20, max_depth=4, random_state=0).fit(X, y)
+    
+    compiled = compile_gradient_boosting(model)
+    X_test = rng.normal(size=(200, 7))
+    X_test[rng.random(X_test.shape) < 0.3] = np.nan
+    
+    assert not compiled.missing_left.all()
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test), atol=1e-12)
+    loaded = CompiledForest.from_arrays(compiled.to_arrays())
+    np.testing.assert_allclose(loaded.predict_proba(X_test), compiled.predict_proba(X_test))
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from compiled_forest import compile_forest
+from ml_model import compress
+from ml_model.dataset import materialize_synthetic
+from model_bundle import load_bundle, save_bundle
+
+sklearn_ensemble = pytest.importorskip('sklearn.ensemble')
+
+@pytest.fixture
+def trained(tmp_path):
+    dataset = materialize_synthetic(str(tmp_path / 'dataset'), n_samples=1500)
+    X_train, X_held_out, y_train, y_held_out = dataset.split(0.2)
+    model = sklearn_ensemble.RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0)
+    model.fit(X_train, y_train)
+    X_val, X_test, y_val, y_test = X_held_out[:150], X_held_out[150:], y_held_out[:150], y_held_out[150:]
+    return compile_forest(model, class_names=dataset.classes), X_train, X_val, y_val, X_test, y_test
+
+def test_prune_without_limits_keeps_predictions(trained):
+    forest, _, _, _, X_test, _ = trained
+    pruned = compress.prune_forest(forest)
+
+    np.testing.assert_allclose(pruned.predict_proba(X_test), forest.predict_proba(X_test))
+    assert pruned.n_nodes == forest.n_nodes
+
+def test_pruned_forest_matches_depth_cut_probabilities(trained):
+    forest, _, _, _, X_test, _ = trained
+    levels = list(compress.tree_probabilities_by_depth(forest, X_test))
+    trees = [3, 7, 11]
+
+    pruned = compress.prune_forest(forest, trees, max_depth=4)
+
+    assert pruned.n_estimators == 3 and pruned.max_depth == 4
+    assert pruned.n_nodes < forest.n_nodes
+    np.testing.assert_allclose(pruned.predict_proba(X_test), levels[4][:, trees].mean(axis=1))
+
+def test_compression_stays_within_budget(trained, tmp_path):
+    forest, X_train, X_val, y_val, X_test, y_test = trained
+
+    result = compress.compress_forest(forest, X_train, X_val, y_val, X_test, y_test, budget=0.02, distill=True)
+    compact = result['forest']
+
+    assert result['method'] in ('prune', 'distill')
+    assert compress.serving_cost(compact) < compress.serving_cost(forest)
+    accuracy = (compact.predict(X_test) == forest.classes_[np.asarray(y_test)]).mean()
+    assert accuracy == pytest.approx(result['accuracy'])
+    assert result['baseline_accuracy'] - accuracy <= 0.02
+
+    # The compact forest round-trips through an ordinary bundle
+    path = str(tmp_path / 'compact.npz')
+    save_bundle(path, compact, ['f'] * 7)
+    np.testing.assert_allclose(load_bundle(path).forest.predict_proba(X_test), compact.predict_proba(X_test))
+
+def test_zero_budget_never_loses_accuracy(trained):
+    forest, X_train, X_val, y_val, X_test, y_test = trained
+
+    result = compress.compress_forest(forest, X_train, X_val, y_val, X_test, y_test, budget=0.0)
+
+    assert result['accuracy'] >= result['baseline_accuracy']
+
+def test_trees_are_ranked_on_the_given_unseen_rows(trained, monkeypatch):
+    forest, X_train, X_val, y_val, X_test, y_test = trained
+    ranked = []
+    greedy_tree_order = compress.greedy_tree_order
+
+    def recording_order(probabilities, y):
+        ranked.append(y)
+        return greedy_tree_order(probabilities, y)
+
+    monkeypatch.setattr(compress, 'greedy_tree_order', recording_order)
+    compress.compress_forest(forest, X_train, X_val, y_val, X_test, y_test)
+
+    assert ranked and all(np.array_equal(y, np.asarray(y_val)) for y in ranked)
@@ -0,0 +1,87 @@
+import os
+import numpy as np
+import pytest
+from ml_model.dataset import DatasetWriter, SoilDataset, materialize_synthetic, LABEL_FILE
+from ml_model.synthetic_data import generate_synthetic_soil_data, FEATURE_COLUMNS
+
+def test_materialized_dataset_matches_generator(tmp_path):
+    path = str(tmp_path / 'dataset')
+    dataset = materialize_synthetic(path, n_samples=1000, seed=3, chunk_size=256)
+    expected = generate_synthetic_soil_data(1000, seed=3)
+    
+    assert isinstance(dataset.features, np.memmap)
+    np.testing.assert_array_equal(dataset.features, expected[FEATURE_COLUMNS].to_numpy(np.float32))
+    assert (dataset.label_names() == expected['fertility_level'].to_numpy()).all()
+    np.testing.assert_array_equal(dataset.column('fertility_score'), expected['fertility_score'])
+
+def test_materialize_reuses_existing_data(tmp_path):
+    path = str(tmp_path / 'dataset')
+    materialize_synthetic(path, n_samples=500, seed=3)
+    written_at = os.path.getmtime(os.path.join(path, LABEL_FILE))
+    
+    assert len(materialize_synthetic(path, n_samples=500, seed=3)) == 500
+    assert os.path.getmtime(os.path.join(path, LABEL_FILE)) == written_at
+    assert len(materialize_synthetic(path, n_samples=300, seed=3)) == 300
+
+def test_split_is_stratified_and_reproducible(tmp_path):
+    dataset = materialize_synthetic(str(tmp_path / 'dataset'), n_samples=500)
+    X_train, X_test, y_train, y_test = dataset.split(0.2)
+    
+    assert len(X_train) + len(X_test) == 500 and len(y_train) == len(X_train)
+    assert abs(len(X_test) - 100) <= len(dataset.classes)
+    for code in range(len(dataset.classes)):
+        share = (y_test == code).mean() - (np.asarray(dataset.labels) == code).mean()
+        assert abs(share) < 0.02
+    
+    train_rows, test_rows = dataset.split_indices(0.2)
+    assert np.intersect1d(train_rows, test_rows).size == 0
+    # Not a contiguous tail
+    assert test_rows.min() < 400
+    np.testing.assert_array_equal(X_test, dataset.features[test_rows])
+    np.testing.assert_array_equal(y_train, dataset.labels[train_rows])
+    assert not np.array_equal(dataset.split_indices(0.2, seed=7)[1], test_rows)
+
+def test_split_is_memory_mapped_and_rebuilt_after_appends(tmp_path):
+    path = str(tmp_path / 'dataset')
+    with DatasetWriter(path) as writer:
+        writer.write(generate_synthetic_soil_data(200))
+    X_train, X_test, _, _ = SoilDataset(path).split(0.2)
+    
+    assert isinstance(X_train, np.memmap) and isinstance(X_test, np.memmap)
+    assert not X_train.flags.owndata and not X_test.flags.writeable
+    # Reused while the dataset is unchanged
+    split_path = SoilDataset(path).materialize_split(0.2)
+    written_at = os.path.getmtime(os.path.join(split_path, 'train_rows.npy'))
+    assert SoilDataset(path).materialize_split(0.2) == split_path
+    assert os.path.getmtime(os.path.join(split_path, 'train_rows.npy')) == written_at
+    
+    with DatasetWriter(path, append=True) as writer:
+        writer.write(generate_synthetic_soil_data(100))
+    X_train, X_test, _, _ = SoilDataset(path).split(0.2)
+    assert len(X_train) + len(X_test) == 300
+
+def test_append_discards_uncommitted_rows(tmp_path):
+    path = str(tmp_path / 'dataset')
+    chunk = generate_synthetic_soil_data(10)
+    with DatasetWriter(path) as writer:
+        writer.write(chunk)
+    
+    # Simulate a crash after writing data but before committing meta.json
+    with open(os.path.join(path, LABEL_FILE), 'ab') as f:
+        f.write(b'\x01' * 5)
+    
+    with DatasetWriter(path, append=True) as writer:
+        writer.write(chunk)
+    
+    dataset = SoilDataset(path)
+    assert len(dataset) == 20
+    assert os.path.getsize(os.path.join(path, LABEL_FILE)) == 20
+    np.testing.assert_array_equal(dataset.labels[:10], dataset.labels[10:])
+
+def test_unknown_labels_are_rejected(tmp_path):
+    chunk = generate_synthetic_soil_data(3)
+    chunk['fertility_level'] = 'Excellent'
+    
+    with DatasetWriter(str(tmp_path / 'dataset')) as writer:
+        with pytest.raises(ValueError):
+            writer.write(chunk)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from compiled_forest import compile_forest
+from model_bundle import save_bundle
+from inference_pool import InferencePool
+from ml_predictor import SoilFertilityPredictor, read_model
+
+sklearn_ensemble = pytest.importorskip('sklearn.ensemble')
+
+FEATURES = ['nitrogen', 'phosphorus', 'potassium', 'ph',
+            'organic_matter', 'moisture', 'temperature']
+
+def make_data(seed, n):
+    rng = np.random.default_rng(seed)
+    return rng.normal([30, 25, 200, 6.5, 3.5, 50, 22], [15, 10, 80, 1.2, 1.5, 20, 8], size=(n, 7))
+
+def make_bundle(path, seed):
+    X = make_data(seed, 500)
+    y = np.where(X[:, 0] > 30, 'High', np.where(X[:, 2] > 200, 'Medium', 'Low'))
+    model = sklearn_ensemble.RandomForestClassifier(n_estimators=10, max_depth=5, random_state=seed)
+    save_bundle(str(path), compile_forest(model.fit(X, y)), FEATURES)
+    return str(path)
+
+@pytest.fixture(scope='module')
+def bundles(tmp_path_factory):
+    root = tmp_path_factory.mktemp('pool')
+    return make_bundle(root / 'first.npz', 1), make_bundle(root / 'second.npz', 2)
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = InferencePool(read_model, n_workers=2, slot_rows=16, n_slots=4)
+    yield pool
+    pool.close()
+
+def test_pool_matches_in_process_scoring(pool, bundles):
+    X = make_data(3, 100)  # Spans several slots
+    for path in bundles:
+        expected = read_model(path).predict_proba(X)
+        np.testing.assert_allclose(pool.predict_proba(X, path), expected)
+
+    assert pool.stats()['free_slots'] == 4
+
+def test_worker_errors_propagate(pool, tmp_path):
+    with pytest.raises(RuntimeError):
+        pool.predict_proba(make_data(4, 5), str(tmp_path / 'missing.npz'))
+
+    assert pool.stats()['free_slots'] == 4
+
+def test_predictor_results_unchanged_with_worker_pool(bundles):
+    first, _ = bundles
+    samples = [dict(zip(FEATURES, row)) for row in make_data(5, 40)]
+
+    predictor = SoilFertilityPredictor(first, cache_size=0)
+    expected = predictor.predict_fertility_batch(samples)
+
+    predictor.enable_worker_pool(n_workers=1, slot_rows=16)
+    try:
+        assert predictor.predict_fertility_batch(samples) == expected
+    finally:
+        predictor.disable_worker_pool()
+
+def test_workers_follow_a_model_retrained_at_the_same_path(tmp_path):
+    path = make_bundle(tmp_path / 'model.npz', 1)
+    X = make_data(6, 20)
+    old = read_model(path)
+
+    pool = InferencePool(read_model, n_workers=1, slot_rows=16, n_slots=2)
+    try:
+        np.testing.assert_allclose(pool.predict_proba(X, path, old.version), old.predict_proba(X))
+
+        make_bundle(tmp_path / 'model.npz', 2)
+        new = read_model(path)
+        assert new.version != old.version
+        np.testing.assert_allclose(pool.predict_proba(X, path, new.version), new.predict_proba(X))
+
+        # A version the path no longer holds, and the worker never loaded, is refused
+        with pytest.raises(RuntimeError):
+            pool.predict_proba(make_data(7, 20), path, 'not-a-version')
+    finally:
+        pool.close()
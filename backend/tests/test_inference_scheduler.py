@@ -0,0 +1,54 @@
+import threading
+import time
+import numpy as np
+from inference_scheduler import MicroBatchScheduler
+
+def make_scheduler(calls, **options):
+    def predict_batch(rows, context):
+        calls.append(len(rows))
+        return [float(row.sum()) for row in rows]
+    return MicroBatchScheduler(predict_batch, **options)
+
+def test_concurrent_requests_share_one_model_call():
+    calls = []
+    scheduler = make_scheduler(calls, max_wait_ms=200, max_idle_ms=100, max_batch_size=8)
+    results = {}
+    
+    def worker(i):
+        results[i] = scheduler.submit(np.full((1, 7), float(i)))
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scheduler.stop()
+    
+    assert sum(calls) == 8
+    assert len(calls) < 8
+    assert all(results[i] == [7.0 * i] for i in range(8))
+
+def test_lone_request_does_not_wait_for_full_window():
+    calls = []
+    scheduler = make_scheduler(calls, max_wait_ms=500, max_idle_ms=1)
+    
+    start = time.perf_counter()
+    assert scheduler.submit(np.ones((2, 7))) == [7.0, 7.0]
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+    
+    assert elapsed < 0.25
+    assert calls == [2]
+
+def test_errors_propagate_to_callers():
+    def failing(rows, context):
+        raise ValueError('boom')
+    scheduler = MicroBatchScheduler(failing, max_wait_ms=1)
+    
+    try:
+        scheduler.submit(np.ones((1, 7)))
+        assert False, 'expected ValueError'
+    except ValueError as e:
+        assert 'boom' in str(e)
+    finally:
+        scheduler.stop()
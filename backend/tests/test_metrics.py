@@ -0,0 +1,76 @@
+import pytest
+import json
+from conftest import SAMPLE
+import metrics
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset_metrics()
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram('test_seconds', 'Test histogram', ('stage',), buckets=(0.1, 1.0))
+    child = histogram.labels('parse')
+    for value in (0.05, 0.5, 5.0):
+        child.observe(value)
+
+    lines = histogram.collect()
+
+    assert '# TYPE test_seconds histogram' in lines
+    assert 'test_seconds_bucket{stage="parse",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="parse",le="1"} 2' in lines
+    assert 'test_seconds_bucket{stage="parse",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="parse"} 3' in lines
+
+def test_metrics_endpoint_reports_stages_and_requests(client, headers):
+    client.post('/api/soil/analyze', data=json.dumps(SAMPLE),
+                content_type='application/json', headers=headers)
+    client.post('/api/soil/analyze', data=json.dumps({'nitrogen': 25}),
+                content_type='application/json', headers=headers)
+
+    response = client.get('/api/metrics')
+    body = response.data.decode()
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    for stage in ('json_parse', 'validate', 'preprocess_features', 'db_commit', 'serialize'):
+        assert f'soilsense_stage_duration_seconds_count{{stage="{stage}"}}' in body
+    assert 'soilsense_http_requests_total{endpoint="soil.analyze_soil",method="POST",status="200"} 1' in body
+    assert 'soilsense_http_requests_total{endpoint="soil.analyze_soil",method="POST",status="400"} 1' in body
+
+def test_stats_collector_publishes_counters_and_gauges():
+    stats = {'hits': 3, 'size': 2}
+    collector = metrics.StatsCollector(lambda: stats, {
+        'hits': ('counter', 'test_hits_total', 'Test hits'),
+        'size': ('gauge', 'test_entries', 'Test entries')
+    })
+
+    lines = collector.collect()
+
+    assert '# TYPE test_hits_total counter' in lines and 'test_hits_total 3' in lines
+    assert '# TYPE test_entries gauge' in lines and 'test_entries 2' in lines
+    assert metrics.StatsCollector(lambda: None, {}).collect() == []
+
+def test_metrics_endpoint_reports_component_counts(client, headers):
+    for _ in range(2):
+        client.post('/api/soil/analyze', data=json.dumps(SAMPLE),
+                    content_type='application/json', headers=headers)
+
+    body = client.get('/api/metrics').data.decode()
+
+    assert 'soilsense_prediction_cache_hits_total ' in body
+    assert 'soilsense_prediction_cache_misses_total ' in body
+    assert 'soilsense_prediction_cache_evictions_total ' in body
+    # Micro-batching and write-behind are off in testing, so their families are left out
+    assert 'soilsense_inference_batches_total' not in body
+    assert 'soilsense_write_behind_queue_depth' not in body
+
+@pytest.mark.parametrize('config_overrides', [{'WRITE_BEHIND_MODE': 'group'}])
+def test_metrics_endpoint_reports_write_behind_queue(client, headers):
+    client.post('/api/soil/analyze', data=json.dumps(SAMPLE),
+                content_type='application/json', headers=headers)
+
+    body = client.get('/api/metrics').data.decode()
+
+    assert 'soilsense_write_behind_flushed_rows_total 1' in body
+    assert 'soilsense_write_behind_failed_rows_total 0' in body
+    assert 'soilsense_write_behind_queue_depth 0' in body
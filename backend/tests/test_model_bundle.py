@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from compiled_forest import compile_forest
+from model_bundle import save_bundle, load_bundle, BUNDLE_FORMAT_VERSION
+from ml_predictor import SoilFertilityPredictor
+
+sklearn_ensemble = pytest.importorskip('sklearn.ensemble')
+sklearn_preprocessing = pytest.importorskip('sklearn.preprocessing')
+
+FEATURES = ['nitrogen', 'phosphorus', 'potassium', 'ph',
+            'organic_matter', 'moisture', 'temperature']
+
+@pytest.fixture
+def trained(tmp_path):
+    rng = np.random.default_rng(1)
+    X = rng.normal([30, 25, 200, 6.5, 3.5, 50, 22], [15, 10, 80, 1.2, 1.5, 20, 8], size=(800, 7))
+    y = np.where(X[:, 0] > 35, 'High', np.where(X[:, 2] > 180, 'Medium', 'Low'))
+    
+    scaler = sklearn_preprocessing.StandardScaler().fit(X)
+    model = sklearn_ensemble.RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0)
+    model.fit(scaler.transform(X), y)
+    
+    path = str(tmp_path / 'soil_fertility_model.npz')
+    save_bundle(path, compile_forest(model), FEATURES, scaler=scaler)
+    return model, scaler, path, rng.normal(
+        [30, 25, 200, 6.5, 3.5, 50, 22], [15, 10, 80, 1.2, 1.5, 20, 8], size=(400, 7)
+    )
+
+def test_bundle_folds_scaler_into_thresholds(trained):
+    model, scaler, path, X = trained
+    bundle = load_bundle(path)
+    
+    expected = model.predict_proba(scaler.transform(X))
+    np.testing.assert_allclose(bundle.forest.predict_proba(X), expected)
+    assert bundle.feature_names == FEATURES
+    assert bundle.metadata['scaler_folded'] is True
+
+def test_bundle_is_memory_mapped(trained):
+    _, _, path, _ = trained
+    bundle = load_bundle(path)
+    
+    # Large members are read-only views onto the mapped file, not copies
+    assert not bundle.forest.threshold.flags.owndata
+    assert not bundle.forest.threshold.flags.writeable
+    assert bundle.version == load_bundle(path, mmap=False).version
+
+def test_bundle_rejects_newer_format(trained, tmp_path):
+    _, _, path, _ = trained
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    arrays['format_version'] = np.array(BUNDLE_FORMAT_VERSION + 1)
+    newer = str(tmp_path / 'newer.npz')
+    np.savez(newer, **arrays)
+    
+    with pytest.raises(ValueError):
+        load_bundle(newer)
+
+def test_predictor_serves_bundle_on_raw_features(trained):
+    model, scaler, path, X = trained
+    predictor = SoilFertilityPredictor(path, cache_size=0)
+    
+    sample = dict(zip(FEATURES, X[0]))
+    result = predictor.predict_fertility(sample)
+    
+    assert predictor.scaler is None
+    assert result['fertility_level'] == model.predict(scaler.transform(X[:1]))[0]
+    assert result['confidence'] == pytest.approx(model.predict_proba(scaler.transform(X[:1])).max())
+
+def test_overwriting_a_loaded_bundle_keeps_it_servable(trained):
+    model, scaler, path, X = trained
+    predictor = SoilFertilityPredictor(path, cache_size=0)
+    sample = dict(zip(FEATURES, X[0]))
+    before = predictor.predict_fertility(sample)
+    
+    other = sklearn_ensemble.RandomForestClassifier(n_estimators=40, max_depth=10, random_state=1)
+    other.fit(scaler.transform(X), model.predict(scaler.transform(X)))
+    save_bundle(path, compile_forest(other), FEATURES, scaler=scaler)
+    
+    # The old mapping stays valid after the file is replaced
+    assert predictor.predict_fertility(sample) == before
+    assert load_bundle(path).version != before['model_version']
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from ml_model import model_families
+from ml_model.dataset import materialize_synthetic
+from model_bundle import save_bundle, load_bundle
+from ml_predictor import SoilFertilityPredictor
+
+pytest.importorskip('sklearn.ensemble')
+
+@pytest.fixture(scope='module')
+def split(tmp_path_factory):
+    dataset = materialize_synthetic(str(tmp_path_factory.mktemp('families') / 'dataset'), n_samples=1200)
+    return dataset, dataset.split(0.2)
+
+@pytest.mark.parametrize('family', sorted(model_families.FAMILY_TRAINERS))
+def test_family_round_trips_through_bundle(split, family, tmp_path):
+    dataset, (X_train, X_test, y_train, y_test) = split
+    
+    result = model_families.evaluate_family(family, X_train, y_train, X_test, y_test, dataset.classes)
+    assert result['accuracy'] > 0.6
+    assert result['serialized_bytes'] > 0 and result['batch_rows_per_second'] > 0
+    
+    path = str(tmp_path / 'model.npz')
+    save_bundle(path, result['model'], dataset.feature_columns)
+    bundle = load_bundle(path)
+    assert bundle.family == family == bundle.metadata['model_family']
+    np.testing.assert_allclose(bundle.model.predict_proba(X_test), result['model'].predict_proba(X_test))
+    
+    predictor = SoilFertilityPredictor(path, cache_size=0)
+    assert predictor.model_family == family
+    prediction = predictor.predict_fertility(dict(zip(dataset.feature_columns, map(float, X_test[0]))))
+    assert prediction['model_version'] == bundle.version
+    assert prediction['fertility_level'] == result['model'].predict(X_test[:1])[0]
+
+def test_linear_family_matches_sklearn(split):
+    from sklearn.linear_model import LogisticRegression
+    from compiled_linear import CompiledLinear, compile_linear, hinge_knots
+    
+    _, (X_train, X_test, y_train, _) = split
+    knots = hinge_knots(X_train, 3)
+    n_columns = X_train.shape[1] * 4
+    unscaled = CompiledLinear(knots, np.zeros(n_columns), np.ones(n_columns), np.zeros((1, n_columns)), [0.0], [0])
+    Z_train = unscaled.expand(X_train)
+    mean, scale = Z_train.mean(axis=0), Z_train.std(axis=0)
+    
+    model = LogisticRegression(max_iter=2000).fit((Z_train - mean) / scale, y_train)
+    compiled = compile_linear(model, knots, mean, scale)
+    
+    expected = model.predict_proba((unscaled.expand(X_test) - mean) / scale)
+    np.testing.assert_allclose(compiled.predict_proba(X_test), expected, atol=1e-10)
+
+def test_select_family_prefers_fastest_meeting_target():
+    results = [
+        {'family': 'random_forest', 'accuracy': 0.90, 'latency_us': 120},
+        {'family': 'linear', 'accuracy': 0.88, 'latency_us': 30},
+        {'family': 'decision_tree', 'accuracy': 0.75, 'latency_us': 20}
+    ]
+    
+    assert model_families.select_family(results, 0.85)['family'] == 'linear'
+    assert model_families.select_family(results, 0.89)['family'] == 'random_forest'
+    assert model_families.select_family(results, 0.95)['family'] == 'random_forest'
+    assert model_families.select_family(results)['family'] == 'random_forest'
+
+def test_unknown_family_is_rejected(split, tmp_path):
+    dataset, (X_train, _, y_train, _) = split
+    model = model_families.fit_decision_tree(X_train, y_train, dataset.classes, {'max_depth': 3})
+    path = str(tmp_path / 'model.npz')
+    save_bundle(path, model, dataset.feature_columns)
+    
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in data.files}
+    arrays['model_family'] = np.array('neural_net')
+    np.savez(path, **arrays)
+    
+    with pytest.raises(ValueError):
+        load_bundle(path)
+    assert not SoilFertilityPredictor(cache_size=0).load_model(path)
@@ -0,0 +1,112 @@
+import json
+import os
+import numpy as np
+import pytest
+from conftest import SAMPLE
+from compiled_forest import compile_forest
+from config import ProductionConfig
+from model_bundle import save_bundle
+from model_registry import ModelRegistry, RegistryWatcher
+from ml_predictor import SoilFertilityPredictor, RULES_VERSION
+
+sklearn_tree = pytest.importorskip('sklearn.tree')
+
+FEATURES = ['nitrogen', 'phosphorus', 'potassium', 'ph',
+            'organic_matter', 'moisture', 'temperature']
+
+def make_bundle(path, seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal([30, 25, 200, 6.5, 3.5, 50, 22], [15, 10, 80, 1.2, 1.5, 20, 8], size=(300, 7))
+    y = np.where(X[:, 0] > 30, 'High', np.where(X[:, 2] > 200, 'Medium', 'Low'))
+    model = sklearn_tree.DecisionTreeClassifier(max_depth=4, random_state=seed).fit(X, y)
+    return save_bundle(str(path), compile_forest(model), FEATURES).version
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    first = make_bundle(tmp_path / 'first.npz', 1)
+    second = make_bundle(tmp_path / 'second.npz', 2)
+    registry.publish(str(tmp_path / 'first.npz'))
+    registry.publish(str(tmp_path / 'second.npz'), activate=False)
+    return registry, first, second
+
+def test_publish_and_activate(registry):
+    registry, first, second = registry
+
+    assert registry.active_version() == first
+    assert set(registry.versions()) == {first, second}
+
+    registry.activate(second)
+    assert registry.active_version() == second
+
+    with pytest.raises(ValueError):
+        registry.activate('missing')
+
+def test_watcher_swaps_model_and_results_report_version(registry):
+    registry, first, second = registry
+    predictor = SoilFertilityPredictor(registry.active_path())
+    watcher = RegistryWatcher(registry, predictor)
+
+    assert predictor.predict_fertility(SAMPLE)['model_version'] == first
+    assert watcher.check() is False
+
+    registry.activate(second)
+    assert watcher.check() is True
+    assert predictor.predict_fertility(SAMPLE)['model_version'] == second
+
+def test_failed_load_keeps_serving_current_model(registry, tmp_path):
+    registry, first, _ = registry
+    predictor = SoilFertilityPredictor(registry.active_path())
+
+    broken = tmp_path / 'broken.npz'
+    broken.write_bytes(b'not a bundle')
+
+    assert predictor.load_model(str(broken)) is False
+    assert predictor.model_version == first
+
+def test_snapshot_survives_swap(registry):
+    registry, first, second = registry
+    predictor = SoilFertilityPredictor(registry.active_path(), cache_size=0)
+    predictor.enable_micro_batching(max_wait_ms=1.0)
+
+    try:
+        # A request that captured the old snapshot finishes on it
+        loaded = predictor.active
+        predictor.load_model(registry.path_for(second))
+        raw = np.array([[SAMPLE[name] for name in FEATURES]], dtype=float)
+
+        assert predictor._score_rows(raw, loaded)[0]['model_version'] == first
+        assert predictor.predict_fertility(SAMPLE)['model_version'] == second
+    finally:
+        predictor.disable_micro_batching()
+
+def test_watching_is_off_outside_production(app):
+    assert 'model_watcher' not in app.extensions
+    assert ProductionConfig.MODEL_WATCH_INTERVAL > 0 or 'MODEL_WATCH_INTERVAL' in os.environ
+
+def test_rule_based_results_report_version(tmp_path):
+    predictor = SoilFertilityPredictor(str(tmp_path / 'missing.npz'))
+    assert predictor.predict_fertility(SAMPLE)['model_version'] == RULES_VERSION
+
+@pytest.mark.parametrize('config_overrides', [{'MODEL_ADMIN_TOKEN': 'secret'}])
+def test_reload_endpoint_requires_admin_token(registry, app, client):
+    from routes.soil import predictor
+
+    registry, first, second = registry
+    app.extensions['model_registry'] = registry
+    previous = predictor.active
+
+    try:
+        response = client.post('/api/soil/model/reload', headers={'X-Admin-Token': 'wrong'})
+        assert response.status_code == 403
+
+        response = client.post('/api/soil/model/reload',
+            data=json.dumps({'version': second}),
+            content_type='application/json',
+            headers={'X-Admin-Token': 'secret'}
+        )
+        assert response.status_code == 200
+        assert json.loads(response.data)['model_version'] == second
+        assert registry.active_version() == second
+    finally:
+        predictor.activate(previous)
@@ -0,0 +1,103 @@
+import pytest
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from models import db, User, SoilAnalysis, ChatMessage
+
+@pytest.fixture
+def app(app):
+    user = User.query.filter_by(email='test@example.com').one()
+
+    # Pairs of rows share a timestamp, so ordering has to fall back on id
+    start = datetime(2024, 1, 1)
+    for i in range(25):
+        created_at = start + timedelta(minutes=i // 2)
+        db.session.add(SoilAnalysis(
+            user_id=user.id, nitrogen=20, phosphorus=20, potassium=150, ph=6.5,
+            organic_matter=3, moisture=45, temperature=22, fertility_level='Medium',
+            score=60, reasons='[]', recommendations='{}', created_at=created_at
+        ))
+        db.session.add(ChatMessage(user_id=user.id, message=f'q{i}', response=f'a{i}', created_at=created_at))
+    db.session.commit()
+    return app
+
+@pytest.mark.parametrize('endpoint', ['/api/soil/history', '/api/chat/history'])
+def test_keyset_pages_cover_history_newest_first(client, headers, endpoint):
+    seen = []
+    before = ''
+    while before is not None:
+        response = client.get(f'{endpoint}?before={before}&per_page=7', headers=headers)
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert 'total' not in data
+        seen.extend(item['id'] for item in data['history'])
+        before = data['next_before']
+
+    assert seen == list(range(25, 0, -1))
+
+def test_keyset_total_is_optional(client, headers):
+    data = json.loads(client.get('/api/soil/history?before=&total=1', headers=headers).data)
+
+    assert data['total'] == 25
+    assert len(data['history']) == 10 and data['has_more']
+
+def test_offset_pages_match_keyset_order_and_can_skip_count(client, headers):
+    data = json.loads(client.get('/api/soil/history?page=2', headers=headers).data)
+    assert data['total'] == 25 and data['pages'] == 3
+    assert [item['id'] for item in data['history']] == list(range(15, 5, -1))
+
+    data = json.loads(client.get('/api/soil/history?page=2&total=0', headers=headers).data)
+    assert 'total' not in data
+
+    # The offset response's cursor continues where the page ended
+    data = json.loads(client.get(f"/api/soil/history?before={data['next_before']}", headers=headers).data)
+    assert [item['id'] for item in data['history']] == list(range(5, 0, -1))
+    assert data['next_before'] is None
+
+def test_invalid_cursor_is_rejected(client, headers):
+    response = client.get('/api/chat/history?before=yesterday', headers=headers)
+
+    assert response.status_code == 400
+    assert 'error' in json.loads(response.data)
+
+@contextmanager
+def captured_sql():
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+def test_fields_projection_skips_heavy_columns(client, headers):
+    with captured_sql() as statements:
+        response = client.get('/api/soil/history?before=&per_page=7&fields=fertility_level,score,location,created_at',
+                              headers=headers)
+    data = json.loads(response.data)
+
+    assert response.status_code == 200
+    assert data['history'][0] == {'fertility_level': 'Medium', 'score': 60, 'location': None,
+                                  'created_at': '2024-01-01T00:12:00'}
+    page_queries = [sql for sql in statements if 'FROM soil_analyses' in sql]
+    assert len(page_queries) == 1 and 'reason' not in page_queries[0]
+
+    # Projected pages chain through the same cursor
+    data = json.loads(client.get(f"/api/soil/history?before={data['next_before']}&fields=id", headers=headers).data)
+    assert [item['id'] for item in data['history']] == list(range(18, 8, -1))
+
+def test_full_rows_load_deferred_columns_in_the_page_query(client, headers):
+    with captured_sql() as statements:
+        data = json.loads(client.get('/api/soil/history?page=1&total=0', headers=headers).data)
+
+    assert data['history'][0]['reasons'] == [] and data['history'][0]['recommendations'] == {}
+    assert len([sql for sql in statements if 'FROM soil_analyses' in sql]) == 1
+
+@pytest.mark.parametrize('fields', ['reasons', 'user_id', 'score,bogus'])
+def test_unknown_or_deferred_fields_are_rejected(client, headers, fields):
+    response = client.get(f'/api/soil/history?fields={fields}', headers=headers)
+
+    assert response.status_code == 400
+    assert 'error' in json.loads(response.data)
@@ -0,0 +1,86 @@
+import json
+from conftest import SAMPLE, user_id
+from models import db, SoilAnalysis, Phrase
+from phrase_catalog import (
+    get_catalog, pack_ids, unpack_ids, encode_reasons, decode_reasons,
+    encode_recommendations, decode_recommendations
+)
+
+def test_pack_ids_round_trip_and_widen():
+    assert unpack_ids(pack_ids([])) == []
+    assert unpack_ids(pack_ids([1, 2, 65535])) == [1, 2, 65535]
+    assert len(pack_ids([1, 2, 3])) == 7
+    assert unpack_ids(pack_ids([1, 70000])) == [1, 70000]
+
+def test_recommendations_round_trip(app):
+    recommendations = {'fertilizers': ['urea', 'compost'], 'crops': [], 'improvements': ['compost']}
+
+    blob = encode_recommendations(recommendations)
+    db.session.commit()
+
+    assert decode_recommendations(blob) == recommendations
+    assert Phrase.query.count() == 2
+    assert encode_recommendations({'other': ['x']}) is None
+
+def test_analyses_are_interned_and_history_is_unchanged(client, headers):
+    response = client.post('/api/soil/analyze', data=json.dumps(SAMPLE),
+                           content_type='application/json', headers=headers)
+    prediction = json.loads(response.data)
+
+    row = SoilAnalysis.query.one()
+    assert row.reason_ids is not None and row.reasons == ''
+    assert row.recommendation_ids is not None and row.recommendations == ''
+
+    history = json.loads(client.get('/api/soil/history', headers=headers).data)['history']
+    assert history[0]['reasons'] == prediction['reasons']
+    assert history[0]['recommendations'] == prediction['recommendations']
+
+def test_legacy_json_rows_are_still_readable(app):
+    row = SoilAnalysis(
+        user_id=user_id(), nitrogen=20, phosphorus=20, potassium=150, ph=6.5, organic_matter=3,
+        moisture=45, temperature=22, fertility_level='High', score=90,
+        reasons=json.dumps(['Balanced nutrients']),
+        recommendations=json.dumps({'fertilizers': [], 'crops': ['Wheat'], 'improvements': []})
+    )
+    db.session.add(row)
+    db.session.commit()
+
+    data = row.to_dict()
+    assert data['reasons'] == ['Balanced nutrients']
+    assert data['recommendations']['crops'] == ['Wheat']
+
+def test_rolled_back_phrases_stay_out_of_the_catalog(app):
+    catalog = get_catalog()
+
+    catalog.ids_for(['never committed'])
+    db.session.rollback()
+    assert 'never committed' not in catalog._ids
+    assert Phrase.query.filter_by(text='never committed').count() == 0
+
+    [phrase_id] = catalog.ids_for(['committed'])
+    db.session.commit()
+    assert catalog.texts_for([phrase_id]) == ['committed']
+
+def test_phrases_committed_out_of_order_by_other_processes_resolve(app):
+    catalog = get_catalog()
+    db.session.add(Phrase(id=10, text='seen here'))
+    db.session.commit()
+    assert catalog.texts_for([10]) == ['seen here']
+
+    # Another process commits a lower id after this one has seen a higher one
+    db.session.add(Phrase(id=5, text='from elsewhere'))
+    db.session.commit()
+
+    assert catalog.texts_for([5, 10]) == ['from elsewhere', 'seen here']
+    assert catalog.ids_for(['from elsewhere']) == [5]
+
+def test_confidence_is_stored_apart_from_the_interned_reason(app):
+    reasons = ['ML model predicts low fertility with high confidence (87.5%)', 'Low nitrogen']
+
+    blob = encode_reasons(reasons, 0.875)
+    for confidence in (0.5, 0.61, 0.999):
+        encode_reasons([f'ML model predicts low fertility with high confidence ({confidence:.1%})'], confidence)
+    db.session.commit()
+
+    assert Phrase.query.count() == 2
+    assert decode_reasons(blob, 0.875) == reasons
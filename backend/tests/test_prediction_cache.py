@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+import soil_rules
+from conftest import SAMPLE
+from compiled_forest import compile_forest
+from model_bundle import save_bundle
+from prediction_cache import PredictionCache
+from ml_predictor import SoilFertilityPredictor
+
+def test_cache_lru_eviction_and_counters():
+    cache = PredictionCache(max_entries=2)
+    cache.put('a', {'score': 1})
+    cache.put('b', {'score': 2})
+    assert cache.get('a') == {'score': 1}
+    
+    cache.put('c', {'score': 3})  # evicts 'b', the least recently used
+    assert cache.get('b') is None
+    assert cache.get('c') == {'score': 3}
+    
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 1, 1, 2)
+
+def test_cache_quantizes_to_instrument_resolution():
+    cache = PredictionCache()
+    raw = np.array([
+        [25.04, 20.0, 150.2, 6.501, 3.0, 45.0, 30.0],
+        [24.96, 20.0, 149.8, 6.499, 3.0, 45.0, 29.99]
+    ])
+    quantized = cache.quantize(raw)
+    
+    keys = cache.keys(quantized, 'v1')
+    assert keys[0] == keys[1]
+    assert keys[0] != cache.keys(quantized, 'v2')[0]
+    # Band edges survive quantization exactly
+    assert quantized[0, -1] == 30.0
+
+def test_predictor_serves_repeated_readings_from_cache():
+    predictor = SoilFertilityPredictor('missing-model.npz')
+    
+    first = predictor.predict_fertility(SAMPLE)
+    first['reasons'].append('mutated by caller')
+    second = predictor.predict_fertility(dict(SAMPLE, nitrogen=10.0))
+    predictor.predict_fertility(dict(SAMPLE, nitrogen=10.01))  # Off the 0.1 grid: not cached
+    
+    assert predictor.cache.stats()['hits'] == 1
+    assert predictor.cache.stats()['size'] == 1
+    assert 'mutated by caller' not in second['reasons']
+    assert second['score'] == first['score']
+
+def test_predictor_cache_is_cleared_on_model_load(tmp_path):
+    sklearn_tree = pytest.importorskip('sklearn.tree')
+    rng = np.random.default_rng(0)
+    X = rng.normal([30, 25, 200, 6.5, 3.5, 50, 22], [15, 10, 80, 1.2, 1.5, 20, 8], size=(200, 7))
+    model = sklearn_tree.DecisionTreeClassifier(max_depth=3).fit(X, np.where(X[:, 0] > 30, 'High', 'Low'))
+    path = str(tmp_path / 'model.npz')
+    save_bundle(path, compile_forest(model), soil_rules.FEATURES)
+    
+    predictor = SoilFertilityPredictor('missing-model.npz')
+    predictor.predict_fertility(SAMPLE)
+    assert predictor.cache.stats()['size'] == 1
+    
+    predictor.load_model(path)
+    assert predictor.cache.stats()['size'] == 0
+    assert 'confidence' in predictor.predict_fertility(SAMPLE)
+
+def test_results_match_with_cache_on_and_off_at_a_band_threshold():
+    cached = SoilFertilityPredictor('missing-model.npz')
+    uncached = SoilFertilityPredictor('missing-model.npz', cache_size=0)
+    
+    for nitrogen in (19.96, 20.0, 19.96, 20.04):
+        sample = dict(SAMPLE, nitrogen=nitrogen)
+        assert cached.predict_fertility(sample) == uncached.predict_fertility(sample)
+
+def test_rules_fallback_after_a_model_error_is_not_cached(tmp_path, monkeypatch):
+    sklearn_tree = pytest.importorskip('sklearn.tree')
+    rng = np.random.default_rng(0)
+    X = rng.normal([30, 25, 200, 6.5, 3.5, 50, 22], [15, 10, 80, 1.2, 1.5, 20, 8], size=(200, 7))
+    model = sklearn_tree.DecisionTreeClassifier(max_depth=3).fit(X, np.where(X[:, 0] > 30, 'High', 'Low'))
+    path = str(tmp_path / 'model.npz')
+    save_bundle(path, compile_forest(model), soil_rules.FEATURES)
+    predictor = SoilFertilityPredictor(path)
+    
+    def failing(raw, loaded):
+        raise RuntimeError('transient')
+    monkeypatch.setattr(predictor, '_ml_predictions', failing)
+    assert predictor.predict_fertility(SAMPLE)['model_version'] == 'rules'
+    assert predictor.cache.stats()['size'] == 0
+    
+    monkeypatch.undo()
+    assert predictor.predict_fertility(SAMPLE)['model_version'] == predictor.model_version
@@ -0,0 +1,92 @@
+import pytest
+import numpy as np
+from datetime import datetime
+from conftest import user_id
+from models import db, SoilAnalysis
+from ml_model import retrain
+from ml_model.dataset import SoilDataset, materialize_synthetic
+from ml_model.synthetic_data import generate_synthetic_soil_data, FEATURE_COLUMNS
+from model_registry import ModelRegistry
+
+pytest.importorskip('sklearn.ensemble')
+
+def add_analyses(n, seed, lab_results=True):
+    """
+    Stored analyses whose lab results are the synthetic labels; predictions are all 'Low'
+    """
+    rows = generate_synthetic_soil_data(n, seed=seed)
+    confirmed_at = datetime.utcnow()
+    db.session.execute(db.insert(SoilAnalysis), [
+        {
+            'user_id': user_id(), **{name: float(row[name]) for name in FEATURE_COLUMNS},
+            'fertility_level': 'Low', 'score': int(row['fertility_score']),
+            'reasons': '[]', 'recommendations': '{}',
+            'lab_fertility_level': row['fertility_level'] if lab_results else None,
+            'lab_confirmed_at': confirmed_at if lab_results else None
+        }
+        for _, row in rows.iterrows()
+    ])
+    db.session.commit()
+    return rows
+
+def test_retraining_only_processes_new_rows(app, tmp_path):
+    paths = {
+        'dataset_path': str(tmp_path / 'field'),
+        'checkpoint_path': str(tmp_path / 'checkpoint.pkl'),
+        'bundle_path': str(tmp_path / 'model.npz'),
+        'registry_root': str(tmp_path / 'registry')
+    }
+    options = {'trees_per_run': 5, 'base_dataset_path': str(tmp_path / 'base')}
+    
+    add_analyses(300, seed=1)
+    first = retrain.retrain(db.session, chunk_size=64, **paths, **options)
+    
+    assert first['ingested'] == 300 and first['new_rows'] == 300
+    assert first['n_estimators'] == 105
+    assert SoilDataset(paths['dataset_path']).meta['lab_mark'][1] == 300
+    assert ModelRegistry(paths['registry_root']).active_version() == first['model_version']
+    
+    assert retrain.retrain(db.session, **paths, **options)['skipped'] is True
+    
+    add_analyses(120, seed=2)
+    second = retrain.retrain(db.session, chunk_size=64, **paths, **options)
+    
+    assert second['ingested'] == 120 and second['new_rows'] == 120
+    assert second['total_rows'] == 420
+    assert second['n_estimators'] == 110
+    assert 0.0 <= second['accuracy_before'] <= 1.0
+
+def test_window_refit_uses_recent_rows(app, tmp_path):
+    add_analyses(200, seed=3)
+    
+    summary = retrain.retrain(
+        db.session, mode='window', dataset_path=str(tmp_path / 'field'),
+        checkpoint_path=str(tmp_path / 'checkpoint.pkl'), bundle_path=str(tmp_path / 'model.npz'),
+        registry_root=None, window_rows=150, n_estimators=10
+    )
+    
+    assert summary['fitted_rows'] == 150
+    assert summary['n_estimators'] == 10
+
+def test_only_lab_confirmed_labels_are_ingested(app, tmp_path):
+    path = str(tmp_path / 'field')
+    add_analyses(50, seed=4, lab_results=False)
+    confirmed = add_analyses(80, seed=5)
+    
+    assert retrain.ingest_new_rows(db.session, path, chunk_size=32) == 80
+    field = SoilDataset(path)
+    np.testing.assert_array_equal(field.label_names(), confirmed['fertility_level'].to_numpy())
+    
+    # A lab result recorded later for an older analysis is picked up on the next run
+    older = SoilAnalysis.query.filter(SoilAnalysis.lab_fertility_level.is_(None)).first()
+    older.lab_fertility_level = 'High'
+    older.lab_confirmed_at = datetime.utcnow()
+    db.session.commit()
+    assert retrain.ingest_new_rows(db.session, path) == 1
+    assert SoilDataset(path).meta['lab_mark'][1] == older.id
+
+def test_existing_base_dataset_is_reused(tmp_path):
+    path = str(tmp_path / 'base')
+    materialize_synthetic(path, n_samples=400, seed=9)
+    
+    assert retrain.base_dataset(path).n_rows == 400
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from ml_model import search
+from ml_model.dataset import materialize_synthetic
+
+pytest.importorskip('sklearn.ensemble')
+
+def trial(accuracy, latency):
+    return {'cv_accuracy': accuracy, 'latency_us': latency}
+
+def test_pareto_front_keeps_undominated_trials():
+    trials = [trial(0.80, 50), trial(0.85, 90), trial(0.84, 120), trial(0.90, 200), trial(0.79, 60)]
+    
+    front = search.pareto_front(trials)
+    
+    assert [(t['cv_accuracy'], t['latency_us']) for t in front] == [(0.80, 50), (0.85, 90), (0.90, 200)]
+    assert search.best_within_budget(front, 150) == trial(0.85, 90)
+    assert search.best_within_budget(front, 10) is None
+
+def test_candidate_params_samples_grid():
+    grid = {'max_depth': [4, 8], 'n_estimators': [10, 20, 30]}
+    
+    assert len(search.candidate_params(grid)) == 6
+    sampled = search.candidate_params(grid, n_iter=3, seed=1)
+    assert len(sampled) == 3 and sampled == search.candidate_params(grid, n_iter=3, seed=1)
+
+def test_trial_reports_accuracy_and_serving_cost(tmp_path):
+    path = str(tmp_path / 'dataset')
+    materialize_synthetic(path, n_samples=600)
+    search._init_worker(path)
+    
+    result = search.run_trial({'n_estimators': 5, 'max_depth': 4}, n_folds=3)
+    forest = search.CompiledForest.from_arrays(result.pop('forest'))
+    cost = search.measure_serving_cost(forest, search._dataset.features[:50], repeat=1)
+    
+    assert all(isinstance(part, np.memmap) for part in search._split)
+    assert 0.5 < result['cv_accuracy'] <= 1.0
+    assert 0.5 < result['test_accuracy'] <= 1.0
+    assert cost['latency_us'] > 0 and cost['model_bytes'] > 0
+    assert set(forest.classes_) <= {'High', 'Low', 'Medium'}
+
+def test_cv_folds_are_fit_without_their_held_out_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / 'dataset')
+    materialize_synthetic(path, n_samples=600)
+    search._init_worker(path)
+    X_train = search._dataset.split(search.TEST_FRACTION)[0]
+    
+    fitted = []
+    fit = search._fit
+    monkeypatch.setattr(search, '_fit', lambda params, X, y: fitted.append(X) or fit(params, X, y))
+    search.run_trial({'n_estimators': 3, 'max_depth': 3}, n_folds=3)
+    
+    for (start, stop), X in zip(search.fold_bounds(len(X_train), 3), fitted):
+        assert len(X) == len(X_train) - (stop - start)
+        held_out = {row.tobytes() for row in X_train[start:stop]}
+        assert not any(row.tobytes() in held_out for row in X)
+    assert len(fitted[-1]) == len(X_train)
+
+def test_trials_fit_and_report_the_training_defaults(tmp_path, monkeypatch):
+    path = str(tmp_path / 'dataset')
+    materialize_synthetic(path, n_samples=300)
+    search._init_worker(path)
+    
+    fitted = []
+    fit = search._fit
+    monkeypatch.setattr(search, '_fit', lambda params, X, y: fitted.append(params) or fit(params, X, y))
+    result = search.run_trial({'n_estimators': 3, 'max_depth': 3}, n_folds=2)
+    
+    expected = {**search.DEFAULT_MODEL_PARAMS, 'n_estimators': 3, 'max_depth': 3}
+    assert result['params'] == expected
+    assert fitted == [expected] * 3
@@ -1,47 +1,9 @@
 import pytest
 import json
-from run import create_app
-from models import db, User
-from werkzeug.security import generate_password_hash
+from conftest import SAMPLE
+from models import db, SoilAnalysis
 
-@pytest.fixture
-def app():
-    app = create_app('testing')
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    
-    with app.app_context():
-        db.create_all()
-        
-        # Create test user
-        user = User(
-            name='Test User',
-            email='test@example.com',
-            password_hash=generate_password_hash('testpassword')
-        )
-        db.session.add(user)
-        db.session.commit()
-        
-        yield app
-        db.drop_all()
-
-@pytest.fixture
-def client(app):
-    return app.test_client()
-
-@pytest.fixture
-def auth_token(client):
-    response = client.post('/api/auth/login',
-        data=json.dumps({
-            'email': 'test@example.com',
-            'password': 'testpassword'
-        }),
-        content_type='application/json'
-    )
-    data = json.loads(response.data)
-    return data['access_token']
-
-def test_soil_analysis_success(client, auth_token):
+def test_soil_analysis_success(client, headers):
     soil_data = {
         'nitrogen': 25,
         'phosphorus': 20,
@@ -56,7 +18,7 @@ def test_soil_analysis_success(client, auth_token):
     response = client.post('/api/soil/analyze',
         data=json.dumps(soil_data),
         content_type='application/json',
-        headers={'Authorization': f'Bearer {auth_token}'}
+        headers=headers
     )
     
     assert response.status_code == 200
@@ -66,7 +28,7 @@ def test_soil_analysis_success(client, auth_token):
     assert 'reasons' in data
     assert 'recommendations' in data
 
-def test_soil_analysis_missing_fields(client, auth_token):
+def test_soil_analysis_missing_fields(client, headers):
     incomplete_data = {
         'nitrogen': 25,
         'phosphorus': 20
@@ -76,37 +38,103 @@ def test_soil_analysis_missing_fields(client, auth_token):
     response = client.post('/api/soil/analyze',
         data=json.dumps(incomplete_data),
         content_type='application/json',
-        headers={'Authorization': f'Bearer {auth_token}'}
+        headers=headers
     )
     
     assert response.status_code == 400
     data = json.loads(response.data)
     assert 'Missing field' in data['error']
 
-def test_soil_analysis_unauthorized(client):
-    soil_data = {
-        'nitrogen': 25,
-        'phosphorus': 20,
-        'potassium': 150,
-        'ph': 6.5,
-        'organic_matter': 3,
-        'moisture': 45,
-        'temperature': 22
-    }
+@pytest.mark.parametrize('value', ['nan', 'inf', '-Infinity'])
+def test_soil_analysis_rejects_non_finite_values(client, headers, value):
+    sample = dict(SAMPLE, nitrogen=value)
     
     response = client.post('/api/soil/analyze',
-        data=json.dumps(soil_data),
+        data=json.dumps(sample),
+        content_type='application/json',
+        headers=headers
+    )
+    
+    assert response.status_code == 400
+    assert json.loads(response.data)['error'] == 'Invalid value for nitrogen'
+
+def test_soil_analysis_unauthorized(client):
+    response = client.post('/api/soil/analyze',
+        data=json.dumps(SAMPLE),
         content_type='application/json'
     )
     
     assert response.status_code == 401
 
-def test_get_soil_history(client, auth_token):
+def test_get_soil_history(client, headers):
     response = client.get('/api/soil/history',
-        headers={'Authorization': f'Bearer {auth_token}'}
+        headers=headers
     )
     
     assert response.status_code == 200
     data = json.loads(response.data)
     assert 'history' in data
-    assert isinstance(data['history'], list)
\ No newline at end of file
+    assert isinstance(data['history'], list)
+
+
+def test_soil_analysis_batch(client, headers):
+    samples = [
+        {'nitrogen': 25, 'phosphorus': 20, 'potassium': 150, 'ph': 6.5,
+         'organic_matter': 3, 'moisture': 45, 'temperature': 22, 'location': 'Plot A'},
+        {'nitrogen': 10, 'phosphorus': 8, 'potassium': 80, 'ph': 5.2,
+         'organic_matter': 1.2, 'moisture': 30, 'temperature': 18},
+        {'nitrogen': 60, 'phosphorus': 35, 'potassium': 250, 'ph': 6.8,
+         'organic_matter': 4.5, 'moisture': 55, 'temperature': 24}
+    ]
+    
+    response = client.post('/api/soil/analyze/batch',
+        data=json.dumps({'samples': samples}),
+        content_type='application/json',
+        headers=headers
+    )
+    
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['count'] == 3
+    assert all('fertility_level' in result for result in data['results'])
+    
+    response = client.get('/api/soil/history',
+        headers=headers
+    )
+    data = json.loads(response.data)
+    assert data['total'] == 3
+
+def test_soil_analysis_batch_invalid_sample(client, headers):
+    samples = [
+        {'nitrogen': 25, 'phosphorus': 20, 'potassium': 150, 'ph': 6.5,
+         'organic_matter': 3, 'moisture': 45, 'temperature': 22},
+        {'nitrogen': 'abc', 'phosphorus': 20}
+    ]
+    
+    response = client.post('/api/soil/analyze/batch',
+        data=json.dumps({'samples': samples}),
+        content_type='application/json',
+        headers=headers
+    )
+    
+    assert response.status_code == 400
+    data = json.loads(response.data)
+    assert 'Sample 1' in data['error']
+
+def test_record_lab_result(client, headers):
+    client.post('/api/soil/analyze', data=json.dumps(SAMPLE),
+                content_type='application/json', headers=headers)
+    analysis_id = json.loads(client.get('/api/soil/history', headers=headers).data)['history'][0]['id']
+    
+    response = client.post(f'/api/soil/analysis/{analysis_id}/lab-result',
+        data=json.dumps({'fertility_level': 'Excellent'}), content_type='application/json', headers=headers)
+    assert response.status_code == 400
+    
+    response = client.post(f'/api/soil/analysis/{analysis_id + 1}/lab-result',
+        data=json.dumps({'fertility_level': 'High'}), content_type='application/json', headers=headers)
+    assert response.status_code == 404
+    
+    response = client.post(f'/api/soil/analysis/{analysis_id}/lab-result',
+        data=json.dumps({'fertility_level': 'High'}), content_type='application/json', headers=headers)
+    assert response.status_code == 200
+    assert db.session.get(SoilAnalysis, analysis_id).lab_fertility_level == 'High'
@@ -0,0 +1,62 @@
+import numpy as np
+import soil_rules
+
+def sample(**overrides):
+    data = {
+        'nitrogen': 25, 'phosphorus': 20, 'potassium': 150, 'ph': 6.5,
+        'organic_matter': 3, 'moisture': 45, 'temperature': 22
+    }
+    data.update(overrides)
+    return data
+
+def test_band_boundaries_are_inclusive_of_normal_range():
+    X = soil_rules.feature_matrix([
+        sample(nitrogen=19.9), sample(nitrogen=20), sample(nitrogen=50), sample(nitrogen=50.1)
+    ])
+    bands = soil_rules.feature_bands(X)[:, soil_rules.FEATURES.index('nitrogen')]
+    
+    assert bands.tolist() == [soil_rules.LOW, soil_rules.NORMAL, soil_rules.NORMAL, soil_rules.HIGH]
+
+def test_rule_scores_and_levels():
+    X = soil_rules.feature_matrix([
+        sample(),
+        sample(nitrogen=60, phosphorus=35, potassium=250, organic_matter=5),
+        sample(nitrogen=5, phosphorus=5, potassium=50, ph=4.5, organic_matter=1)
+    ])
+    evaluated = soil_rules.evaluate_rules(X)
+    
+    assert evaluated['scores'].tolist() == [95, 100, 40]
+    assert evaluated['levels'].tolist() == ['High', 'High', 'Low']
+
+def test_recommendations_follow_ph_direction():
+    X = soil_rules.feature_matrix([sample(ph=5.0), sample(ph=8.5)])
+    acidic, alkaline = soil_rules.feature_bands(X).tolist()
+    
+    assert soil_rules.recommendations(acidic, 'Low')['fertilizers'] == ['Dolomitic Lime']
+    assert soil_rules.recommendations(alkaline, 'Low')['fertilizers'] == ['Elemental Sulfur']
+
+def test_confidence_levels():
+    words = soil_rules.confidence_levels(np.array([0.5, 0.8, 0.85, 0.9, 0.95]))
+    assert [soil_rules.CONFIDENCE_WORDS[w] for w in words] == [
+        'moderate', 'moderate', 'high', 'high', 'very high'
+    ]
+
+def test_rule_lookup_matches_direct_evaluation():
+    rng = np.random.default_rng(0)
+    X = rng.normal([30, 25, 150, 7, 3, 55, 22], [20, 12, 80, 1.5, 1.5, 25, 10], size=(2000, 7))
+    lookup = soil_rules.RuleLookup()
+    
+    assert lookup.rule_based_results(X) == soil_rules.rule_based_results(X)
+    
+    full_codes, scored_codes = lookup.codes(X)
+    for band_row, full_code, scored_code in zip(soil_rules.feature_bands(X).tolist(), full_codes, scored_codes):
+        assert list(lookup.ml_reasons[full_code]) == soil_rules.ml_reasons(band_row)
+        assert lookup.recommendations_for(scored_code, 'Medium') == soil_rules.recommendations(band_row, 'Medium')
+
+def test_rule_lookup_results_are_independent_copies():
+    lookup = soil_rules.RuleLookup()
+    X = soil_rules.feature_matrix([sample(nitrogen=5), sample(nitrogen=5)])
+    first, second = lookup.rule_based_results(X)
+    
+    first['recommendations']['fertilizers'].append('Something else')
+    assert 'Something else' not in second['recommendations']['fertilizers']
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import text
+from config import TestingConfig
+from models import db
+from storage import resolve_storage_profile
+
+@pytest.fixture
+def config_overrides(tmp_path):
+    # A file database, so the default profile for SQLite URIs applies in full
+    return {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'soilsense.db'}", 'STORAGE_PROFILE': None}
+
+def test_sqlite_profile_sets_pragmas_on_each_connection(app):
+    with db.engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        assert connection.execute(text('PRAGMA cache_size')).scalar() == -64000
+
+def test_profile_selection():
+    profiles = TestingConfig.STORAGE_PROFILES
+
+    assert resolve_storage_profile({'SQLALCHEMY_DATABASE_URI': 'sqlite:///x.db',
+                                    'STORAGE_PROFILES': profiles}) is profiles['sqlite']
+    server = resolve_storage_profile({'SQLALCHEMY_DATABASE_URI': 'postgresql://db/soilsense',
+                                      'STORAGE_PROFILES': profiles})
+    assert server['engine_options']['pool_recycle'] == 1800
+
+    with pytest.raises(ValueError):
+        resolve_storage_profile({'STORAGE_PROFILE': 'nope', 'STORAGE_PROFILES': profiles})
+
+@pytest.mark.parametrize('config_overrides', [
+    {'STORAGE_PROFILE': 'sqlite_durable', 'SQLALCHEMY_ENGINE_OPTIONS': {'echo': False}}
+])
+def test_explicit_engine_options_override_the_profile(app):
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {'echo': False}
+    with db.engine.connect() as connection:
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 2  # FULL
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from ml_model.synthetic_data import (
+    generate_synthetic_soil_data, iter_synthetic_soil_chunks, LOWER, UPPER, FEATURE_COLUMNS
+)
+
+def test_chunk_size_does_not_change_rows():
+    whole = generate_synthetic_soil_data(1000, seed=7, chunk_size=1000)
+    chunked = pd.concat(iter_synthetic_soil_chunks(1000, chunk_size=128, seed=7))
+    
+    pd.testing.assert_frame_equal(whole, chunked)
+
+def test_seed_controls_output():
+    first = generate_synthetic_soil_data(200, seed=1)
+    
+    pd.testing.assert_frame_equal(first, generate_synthetic_soil_data(200, seed=1))
+    assert not first.equals(generate_synthetic_soil_data(200, seed=2))
+
+def test_chunks_are_bounded():
+    sizes = [len(chunk) for chunk in iter_synthetic_soil_chunks(1050, chunk_size=500)]
+    
+    assert sizes == [500, 500, 50]
+
+def test_values_and_labels_follow_rules():
+    df = generate_synthetic_soil_data(5000)
+    X = df[FEATURE_COLUMNS].to_numpy()
+    
+    assert (X >= LOWER).all() and (X <= UPPER).all()
+    assert df['fertility_score'].between(0, 100).all()
+    
+    expected = np.where(df['fertility_score'] >= 75, 'High',
+                        np.where(df['fertility_score'] >= 50, 'Medium', 'Low'))
+    assert (df['fertility_level'].to_numpy() == expected).all()
+    assert set(df['fertility_level']) == {'High', 'Medium', 'Low'}
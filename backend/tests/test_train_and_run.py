@@ -0,0 +1,77 @@
+import sys
+import train_and_run
+from train_and_run import Step, run_pipeline
+
+def writer_step(tmp_path, name, source, output):
+    """A step that copies ``source`` to ``output`` and counts its runs"""
+    script = (
+        "import sys, shutil\n"
+        "shutil.copyfile(sys.argv[1], sys.argv[2])\n"
+        "open(sys.argv[3], 'a').write('x')\n"
+    )
+    return Step(name, name, [sys.executable, '-c', script, str(source), str(output), str(tmp_path / f'{name}.runs')],
+                files=[str(source)], outputs=[str(output)])
+
+def runs(tmp_path, name):
+    path = tmp_path / f'{name}.runs'
+    return len(path.read_text()) if path.exists() else 0
+
+def test_steps_rerun_only_when_inputs_or_outputs_change(tmp_path):
+    source = tmp_path / 'input.txt'
+    source.write_text('v1')
+    first = writer_step(tmp_path, 'first', source, tmp_path / 'middle.txt')
+    second = writer_step(tmp_path, 'second', tmp_path / 'middle.txt', tmp_path / 'final.txt')
+    state_path = str(tmp_path / 'state.json')
+
+    def run():
+        return run_pipeline([first, second], train_and_run.load_state(state_path), state_path=state_path)
+
+    assert run()
+    assert (runs(tmp_path, 'first'), runs(tmp_path, 'second')) == (1, 1)
+
+    # Nothing changed: both steps are skipped
+    assert run()
+    assert (runs(tmp_path, 'first'), runs(tmp_path, 'second')) == (1, 1)
+
+    # A new input reruns its step and, through the new output, the next one
+    source.write_text('v2')
+    assert run()
+    assert (runs(tmp_path, 'first'), runs(tmp_path, 'second')) == (2, 2)
+    assert (tmp_path / 'final.txt').read_text() == 'v2'
+
+    # A deleted output reruns only the step that produced it
+    (tmp_path / 'final.txt').unlink()
+    assert run()
+    assert (runs(tmp_path, 'first'), runs(tmp_path, 'second')) == (2, 3)
+
+def test_failed_step_is_not_recorded(tmp_path):
+    state_path = str(tmp_path / 'state.json')
+    failing = Step('fail', 'fail', [sys.executable, '-c', 'raise SystemExit(2)'], files=[])
+
+    assert not run_pipeline([failing], {}, state_path=state_path)
+    assert train_and_run.load_state(state_path) == {}
+
+def test_forced_step_reruns(tmp_path):
+    source = tmp_path / 'input.txt'
+    source.write_text('v1')
+    step = writer_step(tmp_path, 'only', source, tmp_path / 'out.txt')
+    state = {}
+    state_path = str(tmp_path / 'state.json')
+
+    run_pipeline([step], state, state_path=state_path)
+    run_pipeline([step], state, force={'only'}, state_path=state_path)
+
+    assert runs(tmp_path, 'only') == 2
+
+def test_hyperparameters_change_training_key(tmp_path):
+    base = train_and_run.build_steps(samples=100, seed=1)[1]
+
+    assert base.key() == train_and_run.build_steps(samples=100, seed=1)[1].key()
+    assert base.key() != train_and_run.build_steps(samples=200, seed=1)[1].key()
+
+def test_code_lists_follow_imports():
+    # Includes modules only reached through other backend modules, e.g. compiled_linear via model_bundle
+    assert {'compiled_linear.py', 'model_registry.py'} <= set(train_and_run.TRAINING_CODE)
+    assert {'prediction_cache.py', 'inference_scheduler.py', 'inference_pool.py',
+            'metrics.py', 'compiled_linear.py'} <= set(train_and_run.SERVING_CODE)
+    assert 'run.py' not in train_and_run.TRAINING_CODE + train_and_run.SERVING_CODE
@@ -0,0 +1,102 @@
+import pytest
+import json
+from conftest import user_id
+from models import db, SoilAnalysis, UserStatistics
+
+SAMPLES = [
+    {'nitrogen': 25, 'phosphorus': 20, 'potassium': 150, 'ph': 6.5,
+     'organic_matter': 3, 'moisture': 45, 'temperature': 22},
+    {'nitrogen': 10, 'phosphorus': 8, 'potassium': 80, 'ph': 5.2,
+     'organic_matter': 1.2, 'moisture': 30, 'temperature': 18},
+    {'nitrogen': 60, 'phosphorus': 35, 'potassium': 250, 'ph': 6.8,
+     'organic_matter': 4.5, 'moisture': 55, 'temperature': 24}
+]
+
+@pytest.fixture(params=[False, True], ids=['aggregate', 'table'])
+def config_overrides(request):
+    return {'USER_STATS_TABLE': request.param}
+
+def expected_statistics():
+    analyses = SoilAnalysis.query.filter_by(user_id=user_id()).all()
+    levels = [a.fertility_level for a in analyses]
+    return {
+        'total_analyses': len(analyses),
+        'fertility_distribution': {
+            'high': levels.count('High'),
+            'medium': levels.count('Medium'),
+            'low': levels.count('Low')
+        },
+        'average_score': round(sum(a.score for a in analyses) / len(analyses), 1) if analyses else 0
+    }
+
+def test_statistics_track_single_and_batch_inserts(app, client, headers):
+    response = client.get('/api/soil/statistics', headers=headers)
+    assert json.loads(response.data) == expected_statistics()
+
+    for sample in SAMPLES:
+        client.post('/api/soil/analyze', data=json.dumps(sample),
+                    content_type='application/json', headers=headers)
+    client.post('/api/soil/analyze/batch', data=json.dumps({'samples': SAMPLES}),
+                content_type='application/json', headers=headers)
+
+    response = client.get('/api/soil/statistics', headers=headers)
+    assert response.status_code == 200
+    assert json.loads(response.data) == expected_statistics()
+    assert json.loads(response.data)['total_analyses'] == 6
+
+    row = db.session.get(UserStatistics, user_id())
+    if app.config['USER_STATS_TABLE']:
+        assert row.total_analyses == 6
+    else:
+        assert row is None
+
+def test_statistics_row_is_backfilled_from_existing_analyses(app, client, headers):
+    # Rows written before the table was enabled
+    db.session.add(SoilAnalysis(
+        user_id=user_id(), nitrogen=20, phosphorus=20, potassium=150, ph=6.5, organic_matter=3,
+        moisture=45, temperature=22, fertility_level='High', score=90, reasons='[]', recommendations='{}'
+    ))
+    db.session.commit()
+
+    client.post('/api/soil/analyze', data=json.dumps(SAMPLES[0]),
+                content_type='application/json', headers=headers)
+
+    data = json.loads(client.get('/api/soil/statistics', headers=headers).data)
+    assert data == expected_statistics()
+    assert data['total_analyses'] == 2
+
+def test_concurrent_first_write_adds_to_the_existing_row(app, monkeypatch):
+    import user_statistics
+    from sqlalchemy import insert
+    aggregate_counts = user_statistics.aggregate_counts
+
+    def racing_aggregate_counts(uid):
+        # Another request creates the row after this one's UPDATE missed it
+        db.session.execute(insert(UserStatistics).values(
+            user_id=uid, total_analyses=1, high_count=1, medium_count=0, low_count=0, score_sum=90
+        ))
+        return aggregate_counts(uid)
+
+    monkeypatch.setattr(user_statistics, 'aggregate_counts', racing_aggregate_counts)
+    user_statistics.record_analyses(user_id(), [('Low', 20), ('Low', 30)])
+    db.session.commit()
+
+    row = db.session.get(UserStatistics, user_id())
+    assert (row.total_analyses, row.high_count, row.low_count, row.score_sum) == (3, 1, 2, 140)
+
+def test_rebuild_recomputes_rows_left_stale_while_disabled(app, client, headers):
+    client.post('/api/soil/analyze', data=json.dumps(SAMPLES[0]),
+                content_type='application/json', headers=headers)
+    app.config['USER_STATS_TABLE'] = False
+    for sample in SAMPLES:
+        client.post('/api/soil/analyze', data=json.dumps(sample),
+                    content_type='application/json', headers=headers)
+
+    result = app.test_cli_runner().invoke(args=['rebuild-user-stats'])
+    assert result.exit_code == 0
+    app.config['USER_STATS_TABLE'] = True
+
+    data = json.loads(client.get('/api/soil/statistics', headers=headers).data)
+    assert data == expected_statistics()
+    assert data['total_analyses'] == 4
+    assert db.session.get(UserStatistics, user_id()).total_analyses == 4
@@ -1,67 +1,240 @@
 #!/usr/bin/env python3
 """
 Complete training and deployment script for soil fertility ML model
+
+    python train_and_run.py                  # install, train, test, serve
+    python train_and_run.py --no-serve       # stop after the model test
+    python train_and_run.py --force train    # rerun training even if up to date
+
+Each step is keyed by a SHA-256 of its inputs: file contents plus its
+parameters. After a step succeeds, the key and a hash of each output file
+are recorded in ``.pipeline/state.json``. A step is skipped while its key
+matches and its outputs are still on disk unchanged, so a rerun after
+editing only ``routes/`` goes straight to the server, while changing
+``requirements.txt``, the training code, the dataset parameters or the
+hyperparameters reruns exactly the steps that depend on them.
 """
 
+import argparse
+import ast
+import hashlib
+import json
 import os
-import sys
 import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+STATE_PATH = '.pipeline/state.json'
+MODEL_PATH = 'models/soil_fertility_model.npz'
+DATASET_PATH = 'data/soil_dataset'
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def local_sources(script: str) -> List[str]:
+    """
+    ``script`` plus every backend module it imports, directly or indirectly
+
+    Imports anywhere in a file count, including ones inside functions, and
+    are resolved to files under the backend directory; third-party modules
+    are left to ``requirements.txt``.
+    """
+    found = set()
+    pending = [script]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(os.path.join(BACKEND_DIR, path)) as f:
+            tree = ast.parse(f.read(), path)
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # "from package import module" names a module too
+                modules = [node.module] + [f'{node.module}.{alias.name}' for alias in node.names]
+            else:
+                continue
+            for module in modules:
+                candidate = module.replace('.', '/') + '.py'
+                if os.path.isfile(os.path.join(BACKEND_DIR, candidate)):
+                    pending.append(candidate)
+    return sorted(found)
+
+# Source files whose contents determine the trained model
+TRAINING_CODE = local_sources('ml_model/train_model.py')
+
+# Source files whose contents determine the model test's result
+SERVING_CODE = local_sources('ml_model/test_model.py')
+
+def file_digest(path: str) -> Optional[str]:
+    """
+    SHA-256 of a file's contents, or None if it does not exist
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+def input_key(files: List[str], params: Dict[str, Any]) -> str:
+    """
+    Content address of a step: its input files' hashes plus its parameters
+    """
+    payload = {
+        'files': {path: file_digest(path) for path in sorted(files)},
+        'params': params
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class Step:
+    """
+    One pipeline step: a command, the inputs it is keyed by and the files it produces
+    """
+
+    def __init__(self, name: str, description: str, command: List[str], files: List[str],
+                 params: Dict[str, Any] = None, outputs: List[str] = ()):
+        self.name = name
+        self.description = description
+        self.command = command
+        self.files = files
+        self.params = params or {}
+        self.outputs = list(outputs)
+
+    def key(self) -> str:
+        # Computed when the step is reached, so outputs of earlier steps are hashed as written
+        return input_key(self.files, self.params)
+
+    def output_digests(self) -> Dict[str, Optional[str]]:
+        return {path: file_digest(path) for path in self.outputs}
 
-def run_command(command, description):
-    """Run a command and handle errors"""
+    def up_to_date(self, record: Optional[Dict[str, Any]]) -> bool:
+        """
+        True if the last successful run had the same key and its outputs are untouched
+        """
+        if not record or record.get('key') != self.key():
+            return False
+        digests = self.output_digests()
+        return None not in digests.values() and digests == record.get('outputs')
+
+def load_state(path: str = STATE_PATH) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_state(state: Dict[str, Any], path: str = STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def build_steps(samples: int = 5000, seed: int = 42) -> List[Step]:
+    python = sys.executable
+    return [
+        Step('install', 'Installing Python dependencies',
+             [python, '-m', 'pip', 'install', '-r', 'requirements.txt'],
+             files=['requirements.txt'],
+             params={'python': python, 'version': sys.version}),
+        Step('train', 'Training ML model',
+             [python, 'ml_model/train_model.py', '--dataset', DATASET_PATH,
+              '--samples', str(samples), '--seed', str(seed)],
+             # train_model.py holds DEFAULT_MODEL_PARAMS, so hyperparameter
+             # changes alter its hash; requirements pin the sklearn version
+             files=TRAINING_CODE + ['requirements.txt'],
+             params={'dataset': DATASET_PATH, 'samples': samples, 'seed': seed},
+             outputs=[MODEL_PATH, os.path.join(DATASET_PATH, 'meta.json')]),
+        Step('test', 'Testing trained ML model',
+             [python, 'ml_model/test_model.py'],
+             files=SERVING_CODE + [MODEL_PATH])
+    ]
+
+def run_step(step: Step) -> bool:
+    """Run a step's command, streaming its output"""
     print(f"\n{'='*50}")
-    print(f"{description}")
+    print(f"{step.description}")
     print(f"{'='*50}")
-    
+
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print(result.stdout)
-        if result.stderr:
-            print("Warnings:", result.stderr)
+        subprocess.run(step.command, check=True)
         return True
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"Error: {e}")
-        print(f"Output: {e.stdout}")
-        print(f"Error: {e.stderr}")
         return False
 
-def main():
+def run_pipeline(steps: List[Step], state: Dict[str, Any], force=(), state_path: str = STATE_PATH) -> bool:
+    """
+    Run the steps in order, skipping those that are up to date; False on the first failure
+    """
+    for step in steps:
+        if step.name not in force and step.up_to_date(state.get(step.name)):
+            print(f"✅ {step.description}: up to date, skipped")
+            continue
+
+        # Key the run by the inputs it started from, so edits made while it
+        # runs are picked up next time
+        key = step.key()
+        if not run_step(step):
+            print(f"❌ {step.description} failed")
+            return False
+
+        state[step.name] = {'key': key, 'outputs': step.output_digests()}
+        save_state(state, state_path)
+    return True
+
+def main(argv=None):
     """Main training and deployment pipeline"""
+    parser = argparse.ArgumentParser(description='Incrementally install, train, test and serve')
+    parser.add_argument('--samples', type=int, default=5000, help='Synthetic training rows')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', nargs='*', metavar='STEP',
+                        help='Rerun these steps (all steps if none are named)')
+    parser.add_argument('--no-serve', action='store_true', help='Do not start the Flask server')
+    args = parser.parse_args(argv)
+
     print("🌱 Soil Fertility ML Model Training & Deployment Pipeline")
     print("=" * 60)
-    
+
     # Check if we're in the backend directory
     if not os.path.exists('requirements.txt'):
         print("Please run this script from the backend directory")
-        sys.exit(1)
-    
-    # Step 1: Install dependencies
-    if not run_command("pip install -r requirements.txt", "Installing Python dependencies"):
-        print("❌ Failed to install dependencies")
-        sys.exit(1)
-    
-    # Step 2: Train the ML model
-    if not run_command("python ml_model/train_model.py", "Training ML model"):
-        print("❌ Failed to train ML model")
-        sys.exit(1)
-    
-    # Step 3: Test the trained model
-    if not run_command("python ml_model/test_model.py", "Testing trained ML model"):
-        print("❌ Failed to test ML model")
-        sys.exit(1)
-    
-    # Step 4: Start the Flask server
+        return 1
+
+    steps = build_steps(args.samples, args.seed)
+    if args.force is not None:
+        force = set(args.force) or {step.name for step in steps}
+        unknown = force - {step.name for step in steps}
+        if unknown:
+            parser.error(f"unknown step(s): {', '.join(sorted(unknown))}")
+    else:
+        force = set()
+
+    if not run_pipeline(steps, load_state(), force):
+        return 1
+
+    if args.no_serve:
+        return 0
+
+    # Start the Flask server
     print("\n🚀 Starting Flask server with trained ML model...")
     print("The server will run on http://localhost:5000")
     print("Press Ctrl+C to stop the server")
     print("-" * 50)
-    
+
     try:
-        subprocess.run("python run.py", shell=True, check=True)
+        subprocess.run([sys.executable, 'run.py'], check=True)
     except KeyboardInterrupt:
         print("\n👋 Server stopped by user")
     except subprocess.CalledProcessError as e:
         print(f"❌ Server error: {e}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
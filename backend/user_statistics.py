@@ -0,0 +1,135 @@
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Tuple
+
+import click
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, SoilAnalysis, UserStatistics
+
+# Fertility level -> UserStatistics count column
+LEVEL_COLUMNS = {'High': 'high_count', 'Medium': 'medium_count', 'Low': 'low_count'}
+
+def aggregate_counts(user_id) -> Dict[str, int]:
+    """
+    Counts and score sum for a user's analyses from one grouped query
+    """
+    rows = db.session.execute(
+        select(SoilAnalysis.fertility_level, func.count(), func.coalesce(func.sum(SoilAnalysis.score), 0))
+        .where(SoilAnalysis.user_id == user_id)
+        .group_by(SoilAnalysis.fertility_level)
+    )
+
+    counts = {column: 0 for column in LEVEL_COLUMNS.values()}
+    counts.update(total_analyses=0, score_sum=0)
+    for level, count, score_sum in rows:
+        if level in LEVEL_COLUMNS:
+            counts[LEVEL_COLUMNS[level]] += count
+        counts['total_analyses'] += count
+        counts['score_sum'] += int(score_sum)
+    return counts
+
+def record_analyses(user_id, results: Iterable[Tuple[str, int]]):
+    """
+    Add newly inserted analyses, as (fertility_level, score) pairs, to the user's row
+
+    Runs in the caller's transaction, after the analyses have been added to
+    the session, so the counts commit or roll back together with them. A
+    user without a row yet gets one built from all of their analyses,
+    which include the new ones once the session flushes. Two first writes
+    racing to create that row are resolved by the database: the loser adds
+    its own analyses to the winner's row instead.
+    """
+    results = list(results)
+    levels = Counter(level for level, _ in results)
+    increments = {column: getattr(UserStatistics, column) + levels[level]
+                  for level, column in LEVEL_COLUMNS.items() if levels[level]}
+    increments.update(
+        total_analyses=UserStatistics.total_analyses + len(results),
+        score_sum=UserStatistics.score_sum + sum(score for _, score in results),
+        updated_at=datetime.utcnow()
+    )
+
+    updated = db.session.execute(
+        update(UserStatistics).where(UserStatistics.user_id == user_id).values(**increments)
+    )
+    if updated.rowcount:
+        return
+
+    db.session.flush()
+    row = dict(aggregate_counts(user_id), user_id=user_id, updated_at=datetime.utcnow())
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        module = __import__(f'sqlalchemy.dialects.{dialect}', fromlist=['insert'])
+        statement = module.insert(UserStatistics).values(**row)
+        db.session.execute(statement.on_conflict_do_update(index_elements=['user_id'], set_=increments))
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(UserStatistics).values(**row))
+    except IntegrityError:
+        db.session.execute(
+            update(UserStatistics).where(UserStatistics.user_id == user_id).values(**increments)
+        )
+
+def rebuild_statistics() -> int:
+    """
+    Recompute every user's row from soil_analyses; returns the number of users
+
+    Needed after running with USER_STATS_TABLE off, which leaves existing
+    rows behind the analyses written meanwhile.
+    """
+    rows = {}
+    for user_id, level, count, score_sum in db.session.execute(
+        select(SoilAnalysis.user_id, SoilAnalysis.fertility_level, func.count(),
+               func.coalesce(func.sum(SoilAnalysis.score), 0))
+        .group_by(SoilAnalysis.user_id, SoilAnalysis.fertility_level)
+    ):
+        counts = rows.setdefault(user_id, dict(
+            {column: 0 for column in LEVEL_COLUMNS.values()},
+            user_id=user_id, total_analyses=0, score_sum=0, updated_at=datetime.utcnow()
+        ))
+        if level in LEVEL_COLUMNS:
+            counts[LEVEL_COLUMNS[level]] += count
+        counts['total_analyses'] += count
+        counts['score_sum'] += int(score_sum)
+
+    db.session.execute(delete(UserStatistics))
+    if rows:
+        db.session.execute(insert(UserStatistics), list(rows.values()))
+    db.session.commit()
+    return len(rows)
+
+def statistics_response(counts: Dict[str, int]) -> Dict[str, Any]:
+    total = counts['total_analyses']
+    return {
+        'total_analyses': total,
+        'fertility_distribution': {
+            'high': counts['high_count'],
+            'medium': counts['medium_count'],
+            'low': counts['low_count']
+        },
+        'average_score': round(counts['score_sum'] / total, 1) if total else 0
+    }
+
+def user_statistics(user_id, use_table: bool = False) -> Dict[str, Any]:
+    """
+    Dashboard statistics: the precomputed row if enabled and present, else one aggregate query
+    """
+    if use_table:
+        row = db.session.get(UserStatistics, user_id)
+        if row is not None:
+            return statistics_response({column: getattr(row, column) for column in (
+                'total_analyses', 'high_count', 'medium_count', 'low_count', 'score_sum'
+            )})
+    return statistics_response(aggregate_counts(user_id))
+
+def init_app(app):
+    @app.cli.command('rebuild-user-stats')
+    def rebuild_user_stats_command():
+        """
+        Recompute user_statistics from soil_analyses
+        """
+        click.echo(f'Rebuilt statistics for {rebuild_statistics()} user(s)')
@@ -0,0 +1,292 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import click
+from flask import current_app
+
+from metrics import timed, register_stats, WRITE_BEHIND_FIELDS
+from models import db
+
+# off: each request commits its own rows
+# group: requests wait for the batch commit holding their rows (durable on response)
+# async: requests return once their rows are queued; a crash loses at most the queue
+DURABILITY_MODES = ('off', 'group', 'async')
+
+class _PendingWrite:
+    __slots__ = ('model', 'rows', 'future', 'detached')
+
+    def __init__(self, model, rows: List[Dict[str, Any]], detached: bool = False):
+        self.model = model
+        self.rows = rows
+        self.future = Future()
+        # Nobody waits on the result (async mode), so a failure must not drop the rows
+        self.detached = detached
+
+class WriteBehindQueue:
+    """
+    Background flusher bulk-inserting queued rows in shared transactions
+
+    Requests hand over column dicts with ``submit``; a worker thread collects
+    them until ``max_batch_size`` rows are pending or ``max_delay_ms`` has
+    passed since the first one, then inserts each model's rows with one
+    executemany and commits the lot, so many requests share one disk sync.
+    In group mode, where requests block until the commit, a batch also
+    closes once no new rows arrive for ``max_idle_ms``.
+    The queue holds at most ``max_pending`` submissions; when it is full the
+    caller writes its own rows inline instead of waiting.
+
+    A failed insert raises in the request waiting on it. Rows queued in async
+    mode have no such caller, so they are appended to ``dead_letter_path``
+    (one JSON record per submission) for ``replay_dead_letters`` to retry.
+
+    Models can be registered with a ``prepare`` hook, applied to each row in
+    the flusher's transaction before the insert, and an ``after_insert`` hook
+    that receives the submitted rows within that same transaction, with the
+    primary key and column defaults the insert filled in.
+    """
+
+    def __init__(self, app, durability: str = 'group', max_batch_size: int = 256,
+                 max_delay_ms: float = 20.0, max_idle_ms: float = 1.0, max_pending: int = 10000,
+                 dead_letter_path: str = 'data/write_behind_dead_letters.jsonl'):
+        if durability not in DURABILITY_MODES[1:]:
+            raise ValueError(f'Unknown write-behind durability mode: {durability!r}')
+        self.app = app
+        self.durability = durability
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_idle = min(max_idle_ms, max_delay_ms) / 1000.0
+        self.dead_letter_path = dead_letter_path
+
+        self.batches = 0
+        self.flushed_rows = 0
+        self.inline_writes = 0
+        self.failed_rows = 0
+        self.dead_lettered_rows = 0
+
+        self._hooks: Dict[Any, tuple] = {}
+        self._queue: 'queue.Queue[Optional[_PendingWrite]]' = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def register(self, model, prepare: Callable[[Dict[str, Any]], Dict[str, Any]] = None,
+                 after_insert: Callable[[List[Dict[str, Any]]], None] = None):
+        self._hooks[model] = (prepare, after_insert)
+
+    def submit(self, model, rows: List[Dict[str, Any]]):
+        """
+        Queue rows for insertion; in group mode, block until they are committed
+        """
+        pending = _PendingWrite(model, rows, detached=self.durability == 'async')
+        try:
+            if self._closed:
+                raise queue.Full
+            self._queue.put_nowait(pending)
+        except queue.Full:
+            self.inline_writes += 1
+            pending.detached = False
+            self._write([pending])
+            pending.future.result()
+            return
+
+        if self.durability == 'group':
+            pending.future.result()
+
+    def flush(self):
+        """
+        Block until everything submitted so far has been written
+        """
+        barrier = _PendingWrite(None, [])
+        if self._closed:
+            return
+        self._queue.put(barrier)
+        barrier.future.result()
+
+    def close(self):
+        """
+        Write out whatever is still queued and stop the worker
+        """
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+
+        self._queue.put(None)
+        self._worker.join()
+
+    def stats(self) -> dict:
+        return {
+            'durability': self.durability,
+            'batches': self.batches,
+            'flushed_rows': self.flushed_rows,
+            'inline_writes': self.inline_writes,
+            'failed_rows': self.failed_rows,
+            'dead_lettered_rows': self.dead_lettered_rows,
+            'pending': self._queue.qsize()
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            rows = len(first.rows)
+            deadline = time.perf_counter() + self.max_delay
+            while rows < self.max_batch_size and first.model is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    if self.durability == 'group':
+                        remaining = min(remaining, self.max_idle)
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+                if pending.model is None:
+                    break  # Someone is waiting on a flush
+                rows += len(pending.rows)
+
+            self._write(batch)
+
+        # Submissions that raced close() still get written
+        leftovers = []
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is not None:
+                leftovers.append(pending)
+        if leftovers:
+            self._write(leftovers)
+
+    def _write(self, batch: List[_PendingWrite]):
+        writes = [pending for pending in batch if pending.model is not None]
+        if writes:
+            try:
+                with self.app.app_context(), timed('write_behind_flush'):
+                    self._insert(writes)
+                self.batches += 1
+                self.flushed_rows += sum(len(pending.rows) for pending in writes)
+            except Exception as e:
+                if len(writes) > 1:
+                    # Retry one by one so a bad row only fails its own request
+                    for pending in writes:
+                        self._write([pending])
+                else:
+                    pending = writes[0]
+                    self.failed_rows += len(pending.rows)
+                    self.app.logger.error('Write-behind insert of %d %s row(s) failed: %s',
+                                          len(pending.rows), pending.model.__name__, e)
+                    if pending.detached:
+                        self._dead_letter(pending, e)
+                    pending.future.set_exception(e)
+
+        for pending in batch:
+            if not pending.future.done():
+                pending.future.set_result(None)
+
+    def _insert(self, writes: List[_PendingWrite]):
+        by_model: Dict[Any, List[Dict[str, Any]]] = {}
+        for pending in writes:
+            by_model.setdefault(pending.model, []).extend(pending.rows)
+
+        for model, rows in by_model.items():
+            prepare, after_insert = self._hooks.get(model, (None, None))
+            prepared = [prepare(row) for row in rows] if prepare is not None else rows
+            if after_insert is None:
+                db.session.execute(db.insert(model), prepared)
+                continue
+            generated = [column for column in model.__table__.columns
+                         if column.primary_key or column.default is not None or column.server_default is not None]
+            inserted = db.session.execute(
+                db.insert(model).returning(*generated, sort_by_parameter_order=True), prepared
+            ).mappings()
+            after_insert([dict(row, **filled) for row, filled in zip(rows, inserted)])
+        db.session.commit()
+
+    def _dead_letter(self, pending: _PendingWrite, error: Exception):
+        record = {
+            'table': pending.model.__tablename__,
+            'rows': pending.rows,
+            'error': str(error),
+            'failed_at': datetime.utcnow().isoformat()
+        }
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or '.', exist_ok=True)
+            with open(self.dead_letter_path, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+        except Exception:
+            # Last resort: the rows survive in the log
+            self.app.logger.exception('Could not dead-letter write-behind rows: %r', record)
+            return
+        self.dead_lettered_rows += len(pending.rows)
+
+    def replay_dead_letters(self) -> int:
+        """
+        Insert dead-lettered rows again; rows that still fail are dead-lettered anew
+
+        Returns the number of rows written.
+        """
+        if not os.path.exists(self.dead_letter_path):
+            return 0
+        replay_path = self.dead_letter_path + '.replay'
+        os.replace(self.dead_letter_path, replay_path)
+
+        models = {mapper.class_.__tablename__: mapper.class_ for mapper in db.Model.registry.mappers}
+        written = self.flushed_rows
+        with open(replay_path) as f:
+            for line in f:
+                record = json.loads(line)
+                self._write([_PendingWrite(models[record['table']], record['rows'], detached=True)])
+        os.remove(replay_path)
+        return self.flushed_rows - written
+
+def init_app(app):
+    """
+    Start a write-behind queue when WRITE_BEHIND_MODE is not 'off', and publish its counts
+    """
+    @app.cli.command('replay-write-behind')
+    def replay_write_behind_command():
+        """
+        Retry rows the write-behind queue dead-lettered
+        """
+        writer = app.extensions.get('write_behind')
+        if writer is None:
+            raise click.ClickException('WRITE_BEHIND_MODE is off')
+        click.echo(f'Replayed {writer.replay_dead_letters()} row(s)')
+
+    mode = app.config.get('WRITE_BEHIND_MODE', 'off')
+    if mode == 'off':
+        register_stats('write_behind', lambda: None, WRITE_BEHIND_FIELDS)
+        return
+    writer = app.extensions['write_behind'] = WriteBehindQueue(
+        app,
+        durability=mode,
+        max_batch_size=app.config.get('WRITE_BEHIND_BATCH_SIZE', 256),
+        max_delay_ms=app.config.get('WRITE_BEHIND_MAX_DELAY_MS', 20.0),
+        max_pending=app.config.get('WRITE_BEHIND_MAX_PENDING', 10000),
+        dead_letter_path=app.config.get('WRITE_BEHIND_DEAD_LETTER_PATH', 'data/write_behind_dead_letters.jsonl')
+    )
+    register_stats('write_behind', writer.stats, WRITE_BEHIND_FIELDS)
+
+def get_writer() -> Optional[WriteBehindQueue]:
+    """
+    The app's write-behind queue, or None when requests commit their own rows
+    """
+    return current_app.extensions.get('write_behind')